@@ -1,21 +1,100 @@
+import array
+import collections
+import itertools
 import json
+import mmap
+import multiprocessing
+import os
 import time
 import numpy as np
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import struct
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import ijson
+    _JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_ERRORS = (json.JSONDecodeError,)
+
+# JSON logs at least this large are streamed with ijson instead of json.load
+STREAMING_THRESHOLD_BYTES = 100 * 1024 * 1024
+
+
+def _cbor_default(encoder, obj):
+    if isinstance(obj, np.ndarray):
+        encoder.encode(obj.tolist())
+    elif isinstance(obj, np.generic):
+        encoder.encode(obj.item())
+    else:
+        raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def encode_payload(obj, encoding: str = 'json', default=None) -> bytes:
+    if encoding == 'cbor':
+        # canonical packs each float into the smallest lossless width, which
+        # keeps float32 marker coordinates at 5 bytes instead of 9
+        return cbor2.dumps(obj, default=_cbor_default, canonical=True)
+    # orjson serializes numpy arrays and scalars natively; anything it
+    # rejects goes through the stdlib encoder with the numpy fallback.
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass
+    return json.dumps(obj, default=default).encode('utf-8')
+
+
+MCAP_CHUNK_SIZE = 4 * 1024 * 1024
+# Output file buffer, so the writer's many small record writes coalesce
+# into few write(2) calls
+MCAP_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def open_mcap_writer(file_handle, chunk_size: int = MCAP_CHUNK_SIZE):
+    """Create an MCAP writer with zstd-compressed, indexed chunks (4 MiB by default)."""
+    from mcap.writer import Writer, CompressionType
+    from mcap.exceptions import UnsupportedCompressionError
+    
+    options = dict(chunk_size=chunk_size, use_chunking=True, use_statistics=True)
+    try:
+        return Writer(file_handle, compression=CompressionType.ZSTD, **options)
+    except UnsupportedCompressionError:
+        # zstandard not installed
+        return Writer(file_handle, compression=CompressionType.NONE, **options)
+
+
+def decode_payload(data: bytes, encoding: str = 'json'):
+    if encoding == 'cbor':
+        return cbor2.loads(data)
+    return json.loads(data)
+
 
 class MCAPWriter:
     
-    def __init__(self, output_file: str):
+    def __init__(self, output_file: str, encoding: str = 'json', stream: bool = False):
         self.output_file = Path(output_file)
         if self.output_file.suffix != '.mcap':
             self.output_file = self.output_file.with_suffix('.mcap')
         
-        self.messages = []
+        # Marker payloads are encoded as they arrive and kept columnar: one
+        # growable byte buffer plus int64 offset and timestamp columns, instead
+        # of a Python object per message.
+        self._payloads = bytearray()
+        self._offsets = array.array('q', [0])
+        self._msg_ts_ns = array.array('q')
         self.metrics = []
-        self.timestamps = []
         self.start_time = time.time()
         
         self.use_binary = False
@@ -26,25 +105,95 @@ class MCAPWriter:
         except ImportError:
             self.use_binary = False
             print("Warning: mcap library not available. Will save as JSON backup.")
+        
+        if encoding not in ('json', 'cbor'):
+            raise ValueError(f"Unsupported message encoding: {encoding}")
+        if encoding == 'cbor' and cbor2 is None:
+            print("Warning: cbor2 library not available. Encoding messages as JSON.")
+            encoding = 'json'
+        self.encoding = encoding
+        
+        # stream=True writes each marker message into the binary MCAP as it
+        # arrives instead of holding every payload until save(), so a long
+        # recording costs no memory and save() only adds the metrics. The
+        # in-memory views (marker_columns, JSON backup) are then unavailable.
+        self._stream = None
+        self._streamed = 0
+        if stream and self.use_binary:
+            self._stream = self._open_binary()
     
     def add_marker_message(self, markers: List[Dict], timestamp: Optional[float] = None):
         if timestamp is None:
             timestamp = time.time()
         
-        self.timestamps.append(timestamp)
+        if self._stream is not None:
+            writer, markers_channel_id, _, _ = self._stream
+            timestamp_ns = int(timestamp * 1e9)
+            writer.add_message(
+                channel_id=markers_channel_id,
+                log_time=timestamp_ns,
+                data=self._encode(markers),
+                publish_time=timestamp_ns
+            )
+            self._streamed += 1
+            return
         
-        message = {
-            'channel': 'visualization_markers',
-            'timestamp': timestamp,
-            'data': markers
+        self._payloads += self._encode(markers)
+        self._offsets.append(len(self._payloads))
+        self._msg_ts_ns.append(int(timestamp * 1e9))
+    
+    @property
+    def num_messages(self) -> int:
+        # One of the two is always zero: streamed messages are not buffered
+        return self._streamed + len(self._msg_ts_ns)
+    
+    def _iter_payloads(self):
+        payloads = memoryview(self._payloads)
+        for i, timestamp_ns in enumerate(self._msg_ts_ns):
+            yield payloads[self._offsets[i]:self._offsets[i + 1]], timestamp_ns
+    
+    def marker_columns(self) -> Dict[str, np.ndarray]:
+        """Flatten recorded markers into columns, one row per marker."""
+        if self._stream is not None:
+            raise RuntimeError("marker_columns() is unavailable when streaming to MCAP")
+        columns = {'timestamp_ns': [], 'message_index': [], 'type': [], 'id': [],
+                   'x': [], 'y': [], 'z': []}
+        for i, (data, timestamp_ns) in enumerate(self._iter_payloads()):
+            for marker in decode_payload(bytes(data), self.encoding):
+                position = marker.get('pose', {}).get('position', {})
+                columns['timestamp_ns'].append(timestamp_ns)
+                columns['message_index'].append(i)
+                columns['type'].append(marker.get('type', ''))
+                marker_id = marker.get('robot_id', marker.get('target_id', marker.get('id', -1)))
+                columns['id'].append(marker_id)
+                columns['x'].append(position.get('x', np.nan))
+                columns['y'].append(position.get('y', np.nan))
+                columns['z'].append(position.get('z', np.nan))
+        
+        return {
+            'timestamp_ns': np.array(columns['timestamp_ns'], dtype=np.int64),
+            'message_index': np.array(columns['message_index'], dtype=np.int64),
+            'type': np.array(columns['type'], dtype=str),
+            'id': np.array(columns['id'], dtype=np.int64),
+            'x': np.array(columns['x'], dtype=np.float64),
+            'y': np.array(columns['y'], dtype=np.float64),
+            'z': np.array(columns['z'], dtype=np.float64),
         }
-        self.messages.append(message)
+    
+    def to_arrow(self):
+        """Return marker_columns() as a pyarrow Table (requires pyarrow)."""
+        import pyarrow as pa
+        return pa.table(self.marker_columns())
     
     def add_metrics(self, step: int, reward: float, distance: float, 
-                   success: bool, episode_length: int):
+                   success: bool, episode_length: int, timestamp: Optional[float] = None):
+        # timestamp lets callers on a simulated clock keep metrics next to
+        # the markers they describe
+        if timestamp is None:
+            timestamp = time.time()
         metric = {
             'step': step,
-            'timestamp': time.time(),
+            'timestamp': timestamp,
             'reward': reward,
             'distance': distance,
             'success': success,
@@ -58,73 +207,102 @@ class MCAPWriter:
         else:
             return self._save_json_backup()
     
+    def close(self):
+        """Finish and close a streamed MCAP that save() was not reached for.
+        
+        The file keeps the marker messages written so far; metrics are only
+        written by save(). A no-op when not streaming or after save().
+        """
+        if self._stream is None:
+            return
+        writer, _, _, file_handle = self._stream
+        self._stream = None
+        try:
+            writer.finish()
+        finally:
+            file_handle.close()
+        print(f"  Closed {self.output_file} with {self._streamed} streamed marker messages (metrics not saved)")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def _open_binary(self):
+        """Open the output MCAP and register its schemas and channels.
+        
+        Returns (writer, markers_channel_id, metrics_channel_id, file_handle).
+        """
+        import json as json_lib
+        
+        file_handle = open(str(self.output_file), 'wb', buffering=MCAP_WRITE_BUFFER_SIZE)
+        writer = open_mcap_writer(file_handle)
+        writer.start()
+        
+        markers_schema = json_lib.dumps({
+            "type": "object"
+        }).encode('utf-8')
+        markers_schema_id = writer.register_schema(
+            name='visualization_markers',
+            encoding='jsonschema',
+            data=markers_schema
+        )
+        
+        metrics_schema = json_lib.dumps({
+            "type": "object",
+            "properties": {
+                "step": {"type": "integer"},
+                "timestamp": {"type": "number"},
+                "reward": {"type": "number"},
+                "distance": {"type": "number"},
+                "success": {"type": "boolean"},
+                "episode_length": {"type": "integer"}
+            }
+        }).encode('utf-8')
+        metrics_schema_id = writer.register_schema(
+            name='training_metrics',
+            encoding='jsonschema',
+            data=metrics_schema
+        )
+        
+        markers_channel_id = writer.register_channel(
+            topic='/visualization_markers',
+            message_encoding=self.encoding,
+            schema_id=markers_schema_id,
+            metadata={}
+        )
+        
+        metrics_channel_id = writer.register_channel(
+            topic='/training_metrics',
+            message_encoding=self.encoding,
+            schema_id=metrics_schema_id,
+            metadata={}
+        )
+        
+        return writer, markers_channel_id, metrics_channel_id, file_handle
+    
     def _save_binary_mcap(self):
+        output_file = str(self.output_file)
+        streamed = self._stream is not None
+        if streamed:
+            writer, _, metrics_channel_id, file_handle = self._stream
+            self._stream = None
         try:
-            from mcap.writer import Writer
-            import json as json_lib
-            
-            output_file = str(self.output_file)
-            file_handle = open(output_file, 'wb')
-            writer = Writer(file_handle)
-            writer.start()
-            
-            markers_schema = json_lib.dumps({
-                "type": "object"
-            }).encode('utf-8')
-            markers_schema_id = writer.register_schema(
-                name='visualization_markers',
-                encoding='jsonschema',
-                data=markers_schema
-            )
-            
-            metrics_schema = json_lib.dumps({
-                "type": "object",
-                "properties": {
-                    "step": {"type": "integer"},
-                    "timestamp": {"type": "number"},
-                    "reward": {"type": "number"},
-                    "distance": {"type": "number"},
-                    "success": {"type": "boolean"},
-                    "episode_length": {"type": "integer"}
-                }
-            }).encode('utf-8')
-            metrics_schema_id = writer.register_schema(
-                name='training_metrics',
-                encoding='jsonschema',
-                data=metrics_schema
-            )
-            
-            markers_channel_id = writer.register_channel(
-                topic='/visualization_markers',
-                message_encoding='json',
-                schema_id=markers_schema_id,
-                metadata={}
-            )
-            
-            metrics_channel_id = writer.register_channel(
-                topic='/training_metrics',
-                message_encoding='json',
-                schema_id=metrics_schema_id,
-                metadata={}
-            )
-            
-            for msg in self.messages:
-                timestamp_ns = int(msg['timestamp'] * 1e9)
-                # Convert numpy types to native Python types for JSON serialization
-                data_dict = self._convert_numpy_types(msg['data'])
-                data = json_lib.dumps(data_dict, default=self._json_serializer).encode('utf-8')
-                writer.add_message(
-                    channel_id=markers_channel_id,
-                    log_time=timestamp_ns,
-                    data=data,
-                    publish_time=timestamp_ns
-                )
+            if not streamed:
+                writer, markers_channel_id, metrics_channel_id, file_handle = self._open_binary()
+                for data, timestamp_ns in self._iter_payloads():
+                    writer.add_message(
+                        channel_id=markers_channel_id,
+                        log_time=timestamp_ns,
+                        data=data,
+                        publish_time=timestamp_ns
+                    )
             
             for metric in self.metrics:
                 timestamp_ns = int(metric['timestamp'] * 1e9)
-                # Convert numpy types to native Python types for JSON serialization
-                metric_dict = self._convert_numpy_types(metric)
-                data = json_lib.dumps(metric_dict, default=self._json_serializer).encode('utf-8')
+                data = self._encode(metric)
                 writer.add_message(
                     channel_id=metrics_channel_id,
                     log_time=timestamp_ns,
@@ -136,14 +314,20 @@ class MCAPWriter:
             file_handle.close()
             
             print(f"  Binary MCAP file saved to {output_file}")
-            print(f"  Messages: {len(self.messages)}")
+            print(f"  Messages: {self.num_messages}")
             print(f"  Metrics: {len(self.metrics)}")
             print(f"  File size: {Path(output_file).stat().st_size / (1024*1024):.2f} MB")
             
             return output_file
-            
+        
         except Exception as e:
             print(f"  Error creating binary MCAP: {e}")
+            if streamed:
+                # The marker messages only exist in the MCAP being written,
+                # so a JSON backup would hold none of them
+                print("  Streamed markers are not kept in memory; no JSON backup written")
+                file_handle.close()
+                raise
             import traceback
             traceback.print_exc()
             print("   Falling back to JSON format...")
@@ -156,7 +340,14 @@ class MCAPWriter:
                 'format': 'mcap-like-json',
                 'version': '1.0'
             },
-            'messages': self.messages,
+            'messages': [
+                {
+                    'channel': 'visualization_markers',
+                    'timestamp': timestamp_ns / 1e9,
+                    'data': decode_payload(bytes(data), self.encoding)
+                }
+                for data, timestamp_ns in self._iter_payloads()
+            ],
             'metrics': self.metrics
         }
         
@@ -165,28 +356,14 @@ class MCAPWriter:
             json.dump(data, f, indent=2, default=self._json_serializer)
         
         print(f"MCAP library not available. Saved as JSON: {output_json}")
-        print(f"Messages: {len(self.messages)}")
+        print(f"Messages: {self.num_messages}")
         print(f"Metrics: {len(self.metrics)}")
         print("Note: Install 'mcap' package for binary MCAP format")
         
         return str(output_json)
     
-    def _convert_numpy_types(self, obj):
-        """Recursively convert numpy types to native Python types."""
-        if isinstance(obj, dict):
-            return {key: self._convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [self._convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        else:
-            return obj
+    def _encode(self, obj) -> bytes:
+        return encode_payload(obj, self.encoding, default=self._json_serializer)
     
     def _json_serializer(self, obj):
         if isinstance(obj, np.integer):
@@ -200,24 +377,134 @@ class MCAPWriter:
         raise TypeError(f"Type {type(obj)} not serializable")
 
 
-def convert_json_to_mcap(json_file: str, output_mcap: str):
+# Bytes handed to the ijson parser per read
+JSON_READ_BUFFER_SIZE = 1 << 20
+
+
+def _iter_json_events(json_file: str):
+    # The parser reads straight out of a read-only mapping of the file, in
+    # large slices, rather than through a buffered file object.
+    with open(json_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield from ijson.parse(f, use_float=True)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from ijson.parse(mm, use_float=True, buf_size=JSON_READ_BUFFER_SIZE)
+
+
+def _build_json_value(events, event: str, value):
+    # Assemble the array or object that event starts from the parse events
+    # that follow it. Inlined rather than ijson.ObjectBuilder, whose method
+    # call per event would make this one pass slower than two ijson.items
+    # passes done in C.
+    if event != 'start_map' and event != 'start_array':
+        return value
+    root = {} if event == 'start_map' else []
+    stack = [root]
+    container = root
+    key = None
+    for _, event, value in events:
+        if event == 'map_key':
+            key = value
+            continue
+        if event == 'end_map' or event == 'end_array':
+            stack.pop()
+            if not stack:
+                break
+            container = stack[-1]
+            continue
+        if event == 'start_map':
+            value = {}
+        elif event == 'start_array':
+            value = []
+        if container.__class__ is dict:
+            container[key] = value
+        else:
+            container.append(value)
+        if event == 'start_map' or event == 'start_array':
+            stack.append(value)
+            container = value
+    return root
+
+
+def _iter_json_log(json_file: str, metrics: List[Dict]):
+    # One parse of the file, dispatched on prefix: marker messages are
+    # yielded one at a time, so memory stays at one message, while the small
+    # metrics array is appended to metrics as the parser passes it.
+    events = _iter_json_events(json_file)
+    for prefix, event, value in events:
+        if prefix == 'messages.item':
+            yield _build_json_value(events, event, value)
+        elif prefix == 'metrics.item':
+            metrics.append(_build_json_value(events, event, value))
+
+
+ENCODE_CHUNK_SIZE = 1000
+
+
+def _chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _encode_chunk(args):
+    # Pool worker: encode one chunk of marker messages, keeping their order
+    chunk, encoding = args
+    return [(int(msg['timestamp'] * 1e9), encode_payload(msg['data'], encoding)) for msg in chunk]
+
+
+# Encoded chunks a worker may have submitted but not yet written
+ENCODE_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _imap_bounded(pool, func, tasks, depth: int):
+    # pool.imap, but with at most depth chunks submitted and not yet
+    # consumed: imap keeps reading tasks and queueing results however far
+    # the writer falls behind, which undoes the streaming memory bound
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= depth:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def convert_json_to_mcap(json_file: str, output_mcap: str, encoding: str = 'json',
+                         workers: Optional[int] = None, streaming: Optional[bool] = None):
     try:
         from mcap.writer import Writer
         import json as json_lib
         
-        print(f"Loading {json_file}...")
-        with open(json_file, 'r') as f:
-            data = json_lib.load(f)
+        # streaming=None picks by file size; either way it needs ijson
+        large_file = Path(json_file).stat().st_size >= STREAMING_THRESHOLD_BYTES
+        if streaming is None:
+            streaming = large_file
+        streaming = streaming and ijson is not None
+        if streaming:
+            print(f"Streaming {json_file}...")
+            metrics = []
+            messages = _iter_json_log(json_file, metrics)
+        else:
+            print(f"Loading {json_file}...")
+            with open(json_file, 'r') as f:
+                data = json_lib.load(f)
+            
+            messages = data.get('messages', [])
+            metrics = data.get('metrics', [])
         
-        messages = data.get('messages', [])
-        metrics = data.get('metrics', [])
+        if encoding == 'cbor' and cbor2 is None:
+            print("Warning: cbor2 library not available. Encoding messages as JSON.")
+            encoding = 'json'
         
         print(f"Converting to binary MCAP...")
-        print(f"Messages: {len(messages)}")
-        print(f"Metrics: {len(metrics)}")
+        if not streaming:
+            print(f"Messages: {len(messages)}")
+            print(f"Metrics: {len(metrics)}")
         
-        file_handle = open(output_mcap, 'wb')
-        writer = Writer(file_handle)
+        file_handle = open(output_mcap, 'wb', buffering=MCAP_WRITE_BUFFER_SIZE)
+        writer = open_mcap_writer(file_handle)
         writer.start()
         
         markers_schema = json_lib.dumps({
@@ -248,35 +535,53 @@ def convert_json_to_mcap(json_file: str, output_mcap: str):
         
         markers_channel_id = writer.register_channel(
             topic='/visualization_markers',
-            message_encoding='json',
+            message_encoding=encoding,
             schema_id=markers_schema_id,
             metadata={}
         )
         
         metrics_channel_id = writer.register_channel(
             topic='/training_metrics',
-            message_encoding='json',
+            message_encoding=encoding,
             schema_id=metrics_schema_id,
             metadata={}
         )
         
+        # Large files spread encoding over a process pool, chunks handed back
+        # in order so add_message keeps writing while later chunks encode.
+        # Small ones encode inline: starting the pool costs more than it saves.
+        if workers is None:
+            workers = (os.cpu_count() or 1) if large_file else 1
+        tasks = ((chunk, encoding) for chunk in _chunked(messages, ENCODE_CHUNK_SIZE))
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        if pool is not None:
+            encoded = _imap_bounded(pool, _encode_chunk, tasks,
+                                    workers * ENCODE_CHUNKS_IN_FLIGHT_PER_WORKER)
+        else:
+            encoded = map(_encode_chunk, tasks)
+        
         print("Writing marker messages...")
-        for i, msg in enumerate(messages):
-            timestamp_ns = int(msg['timestamp'] * 1e9)
-            data_bytes = json_lib.dumps(msg['data']).encode('utf-8')
-            writer.add_message(
-                channel_id=markers_channel_id,
-                log_time=timestamp_ns,
-                data=data_bytes,
-                publish_time=timestamp_ns
-            )
-            if (i + 1) % 10000 == 0:
-                print(f"Processed {i + 1}/{len(messages)} messages...")
+        count = 0
+        try:
+            for chunk in encoded:
+                for timestamp_ns, data_bytes in chunk:
+                    writer.add_message(
+                        channel_id=markers_channel_id,
+                        log_time=timestamp_ns,
+                        data=data_bytes,
+                        publish_time=timestamp_ns
+                    )
+                    count += 1
+                    if count % 10000 == 0:
+                        print(f"Processed {count} messages...")
+        finally:
+            if pool is not None:
+                pool.terminate()
         
         print("  Writing metric messages...")
         for metric in metrics:
             timestamp_ns = int(metric['timestamp'] * 1e9)
-            data_bytes = json_lib.dumps(metric).encode('utf-8')
+            data_bytes = encode_payload(metric, encoding)
             writer.add_message(
                 channel_id=metrics_channel_id,
                 log_time=timestamp_ns,
@@ -292,12 +597,12 @@ def convert_json_to_mcap(json_file: str, output_mcap: str):
         print(f" File size: {file_size_mb:.2f} MB")
         
         return output_mcap
-        
+    
     except ImportError:
         print(" Error: mcap library not installed.")
         print("  Install with: pip install mcap")
         return None
-    except json_lib.JSONDecodeError as e:
+    except _JSON_ERRORS as e:
         print(f" Error: JSON file is corrupted or too large: {e}")
         print("   The file may be too large to load into memory.")
         print("   Try using convert_large_json_to_mcap.py for streaming conversion.")
@@ -9,6 +9,13 @@ import subprocess
 import sys
 from pathlib import Path
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+COMMIT_MESSAGE = 'Add robot navigation training project with extended training scripts'
+
 def check_git_available():
     """Check if git is available"""
     try:
@@ -50,9 +57,7 @@ def commit():
     """Commit changes"""
     print("💾 Committing changes...")
     try:
-        subprocess.run(['git', 'commit', '-m', 
-                       'Add robot navigation training project with extended training scripts'], 
-                      check=True)
+        subprocess.run(['git', 'commit', '-m', COMMIT_MESSAGE], check=True)
         print("✅ Changes committed")
         return True
     except subprocess.CalledProcessError as e:
@@ -70,13 +75,46 @@ def create_branch():
         print(f"⚠️  Branch creation failed (may already exist): {e}")
         return True  # Not critical
 
+def prepare_with_pygit2():
+    """Init, add, commit and name the branch main in-process via libgit2"""
+    print("📦 Preparing repository with pygit2...")
+    try:
+        repo = pygit2.init_repository('.')
+        
+        index = repo.index
+        index.add_all()
+        index.write()
+        tree = index.write_tree()
+        
+        if repo.head_is_unborn:
+            repo.set_head('refs/heads/main')
+            parents = []
+        else:
+            parents = [repo.head.target]
+            if repo.head.shorthand != 'main':
+                repo.branches.local[repo.head.shorthand].rename('main', True)
+                repo.set_head('refs/heads/main')
+        
+        signature = repo.default_signature
+        repo.create_commit('HEAD', signature, signature, COMMIT_MESSAGE, tree, parents)
+        print("✅ Repository initialized, files committed on main")
+        return True
+    except (pygit2.GitError, KeyError) as e:
+        # KeyError: user.name/user.email not configured
+        print(f"⚠️  pygit2 failed ({e}), falling back to git commands")
+        return False
+
 def main():
     print("=" * 70)
     print("🚀 Preparing Project for GitHub")
     print("=" * 70)
     print()
     
-    if not check_git_available():
+    os.chdir(Path(__file__).parent)
+    
+    if pygit2 is not None and prepare_with_pygit2():
+        success = True
+    elif not check_git_available():
         print()
         print("=" * 70)
         print("❌ Git is not available")
@@ -92,14 +130,12 @@ def main():
         print("  - Upload files via GitHub web interface")
         print()
         return False
-    
-    os.chdir(Path(__file__).parent)
-    
-    success = True
-    success = init_repo() and success
-    success = add_files() and success
-    success = commit() and success
-    success = create_branch() and success
+    else:
+        success = True
+        success = init_repo() and success
+        success = add_files() and success
+        success = commit() and success
+        success = create_branch() and success
     
     if success:
         print()
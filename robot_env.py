@@ -1,15 +1,77 @@
 import gymnasium as gym
 from gymnasium import spaces
+from gymnasium.vector.utils import batch_space
+import math
 import numpy as np
+import queue
+import threading
 from typing import Tuple, Optional, Dict, Any
-from robot_kinematics import FourWheelKinematics, RobotParams, RobotState
+from robot_kinematics import FourWheelKinematics, RobotParams, RobotState, step_batch
+from robot_kinematics_numba import NUMBA_AVAILABLE, step_all, reward_single, reward_multi
+
+try:
+    from gymnasium.vector import AutoresetMode
+except ImportError:
+    AutoresetMode = None
+
+
+def _step_kinematics(params: RobotParams, x, y, theta, v, deltas, actions: np.ndarray, dt: float):
+    if NUMBA_AVAILABLE:
+        step_all(x, y, theta, v, deltas, actions[:, 0], actions[:, 1], dt,
+                 params.wheelbase, params.track_width, params.max_steering_angle,
+                 params.max_steering_rate, params.max_acceleration, params.max_velocity)
+    else:
+        step_batch(x, y, theta, v, deltas, actions[:, 0], actions[:, 1], dt, params)
+
+
+def _fill_robot_obs(obs: np.ndarray, x, y, theta, v, deltas, targets: np.ndarray):
+    # Writes the 10 per-robot fields into the leading columns of obs rows
+    obs[:, 0] = x
+    obs[:, 1] = y
+    obs[:, 2] = theta
+    obs[:, 3] = v
+    obs[:, 4:8] = deltas
+    obs[:, 8] = targets[:, 0] - x
+    obs[:, 9] = targets[:, 1] - y
+
+
+class _RobotView(FourWheelKinematics):
+    # FourWheelKinematics facade over one robot of RobotNavigationEnv's
+    # struct-of-arrays state, so env.robots keeps working for visualization.
+    
+    def __init__(self, env: "RobotNavigationEnv", index: int):
+        self._env = env
+        self._index = index
+        super().__init__(env.params)
+    
+    @property
+    def state(self) -> RobotState:
+        env, i = self._env, self._index
+        deltas = env._deltas[i]
+        return RobotState(float(env._x[i]), float(env._y[i]), float(env._theta[i]), float(env._v[i]),
+                          float(deltas[0]), float(deltas[1]), float(deltas[2]), float(deltas[3]))
+    
+    @state.setter
+    def state(self, state: RobotState):
+        env, i = self._env, self._index
+        env._x[i] = state.x
+        env._y[i] = state.y
+        env._theta[i] = state.theta
+        env._v[i] = state.v
+        env._deltas[i] = (state.delta_fl, state.delta_fr, state.delta_rl, state.delta_rr)
+    
+    def step(self, curvature: float, velocity: float, dt: float = 0.1):
+        robot = FourWheelKinematics(self.params)
+        robot.state = self.state
+        robot.step(curvature, velocity, dt)
+        self.state = robot.state
 
 
 class RobotNavigationEnv(gym.Env):
     
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 10}
     
-    def __init__(self, 
+    def __init__(self,
                  num_robots: int = 1,
                  max_episode_steps: int = 500,
                  success_threshold: float = 0.3,
@@ -22,7 +84,7 @@ class RobotNavigationEnv(gym.Env):
         self.success_threshold = success_threshold
         self.initial_range = initial_range
         self.render_mode = render_mode
-   
+        
         if num_robots == 1:
             state_dim = 10
         else:
@@ -46,64 +108,92 @@ class RobotNavigationEnv(gym.Env):
                 dtype=np.float32
             )
         
-        self.robots = [FourWheelKinematics() for _ in range(num_robots)]
-        self.targets = np.zeros((num_robots, 2))
-        self.step_count = 0
+        # Robot state is kept as struct-of-arrays so step() advances every
+        # robot with one vectorized kinematic update.
+        # Everything is float32, matching the observation dtype, so no step
+        # silently upcasts to float64.
+        self.params = RobotParams()
+        self._x = np.zeros(num_robots, dtype=np.float32)
+        self._y = np.zeros(num_robots, dtype=np.float32)
+        self._theta = np.zeros(num_robots, dtype=np.float32)
+        self._v = np.zeros(num_robots, dtype=np.float32)
+        self._deltas = np.zeros((num_robots, 4), dtype=np.float32)
+        self._distances = np.zeros(num_robots, dtype=np.float32)
+        # inf marks "no previous step" so the first step earns no progress
+        self._prev_distances = np.full(num_robots, np.inf, dtype=np.float32)
+        
+        # Index helpers for the broadcasted pairwise offsets: upper-triangle
+        # pairs for collisions and off-diagonal entries for observations.
+        self._pair_i, self._pair_j = np.triu_indices(num_robots, k=1)
+        self._off_diagonal = ~np.eye(num_robots, dtype=bool)
+        
+        # Observations and parsed actions are written into buffers owned by
+        # the env instead of being rebuilt from fresh arrays every step.
+        self._obs_buf = np.empty(state_dim, dtype=np.float32)
+        self._obs_rows = self._obs_buf.reshape(num_robots, state_dim // num_robots)
+        self._action_buf = np.empty((num_robots, 2), dtype=np.float32)
+        self._parse_action = self._parse_single if num_robots == 1 else self._parse_multi
         
+        self.robots = [_RobotView(self, i) for i in range(num_robots)]
+        self.targets = np.zeros((num_robots, 2), dtype=np.float32)
+        self.step_count = 0
+    
     def reset(self, seed: Optional[int] = None, options: Optional[Dict] = None) -> Tuple[np.ndarray, Dict]:
         super().reset(seed=seed)
         
         self.step_count = 0
-        self._prev_distances = [float('inf')] * self.num_robots
+        self._prev_distances[:] = np.inf
         
-        for i, robot in enumerate(self.robots):
-            x = self.np_random.uniform(-self.initial_range, self.initial_range)
-            y = self.np_random.uniform(-self.initial_range, self.initial_range)
-            theta = self.np_random.uniform(-np.pi, np.pi)
-            robot.reset(x, y, theta)
+        n = self.num_robots
+        r = self.initial_range
+        self._x[:] = self.np_random.uniform(-r, r, size=n)
+        self._y[:] = self.np_random.uniform(-r, r, size=n)
+        self._theta[:] = self.np_random.uniform(-np.pi, np.pi, size=n)
+        self._v[:] = 0.0
+        self._deltas[:] = 0.0
         
         if self.num_robots == 1:
-            self.targets[0] = self.np_random.uniform(-self.initial_range, self.initial_range, 2)
+            self.targets[0] = self.np_random.uniform(-r, r, 2)
         else:
-            min_separation = 3.0
-            for i in range(self.num_robots):
-                while True:
-                    target = self.np_random.uniform(-self.initial_range, self.initial_range, 2)
-                    too_close = False
-                    for j in range(i):
-                        if np.linalg.norm(target - self.targets[j]) < min_separation:
-                            too_close = True
-                            break
-                    if not too_close:
-                        self.targets[i] = target
-                        break
+            self._place_targets(min_separation=3.0)
         
+        self._update_distances()
         obs = self._get_observation()
         info = self._get_info()
         
         return obs, info
     
+    def _place_targets(self, min_separation: float):
+        # Greedy rejection sampling over one batch of candidates; each check
+        # is a single vectorized distance test against the accepted targets.
+        r = self.initial_range
+        n = self.num_robots
+        count = 0
+        for candidate in self.np_random.uniform(-r, r, size=(n * 16, 2)).astype(np.float32):
+            if (np.linalg.norm(self.targets[:count] - candidate, axis=1) >= min_separation).all():
+                self.targets[count] = candidate
+                count += 1
+                if count == n:
+                    return
+        
+        # Candidate pool exhausted (crowded arena): sample the rest one by one
+        for i in range(count, n):
+            while True:
+                target = self.np_random.uniform(-r, r, 2)
+                if (np.linalg.norm(self.targets[:i] - target, axis=1) >= min_separation).all():
+                    self.targets[i] = target
+                    break
+    
     def step(self, action: np.ndarray) -> Tuple[np.ndarray, float, bool, bool, Dict]:
-        dt = 0.1
+        dt = np.float32(0.1)
         
-        action = np.asarray(action, dtype=np.float32)
-        if self.num_robots == 1:
-            actions = [action]
-        else:
-            if action.shape == (self.num_robots * 2,):
-                actions = [action[i*2:(i+1)*2] for i in range(self.num_robots)]
-            elif action.shape == (self.num_robots, 2):
-                actions = [action[i] for i in range(self.num_robots)]
-            else:
-                if action.shape == (2,):
-                    actions = [action] * self.num_robots
-                else:
-                    raise ValueError(f"Unexpected action shape: {action.shape}")
+        actions = self._parse_action(action)
         
-        for robot, (curvature, velocity) in zip(self.robots, actions):
-            robot.step(curvature, velocity, dt)
+        _step_kinematics(self.params, self._x, self._y, self._theta, self._v, self._deltas,
+                         actions, dt)
         
         self.step_count += 1
+        self._update_distances()
         
         reward = self._compute_reward()
         terminated = self._check_success()
@@ -115,118 +205,303 @@ class RobotNavigationEnv(gym.Env):
         
         return obs, reward, terminated, truncated, info
     
+    def _parse_single(self, action) -> np.ndarray:
+        np.copyto(self._action_buf, np.reshape(action, (1, 2)))
+        return self._action_buf
+    
+    def _parse_multi(self, action) -> np.ndarray:
+        # Flat (2N,) and (N, 2) actions reshape alike; a single (2,) action
+        # is broadcast to every robot.
+        try:
+            np.copyto(self._action_buf, np.reshape(action, (self.num_robots, 2)))
+        except ValueError:
+            if np.shape(action) != (2,):
+                raise ValueError(f"Unexpected action shape: {np.shape(action)}") from None
+            np.copyto(self._action_buf, action)
+        return self._action_buf
+    
+    def _positions(self) -> np.ndarray:
+        return np.stack([self._x, self._y], axis=1)
+    
+    def _pairwise_offsets(self, xy: np.ndarray) -> np.ndarray:
+        # offsets[i, j] is the position of robot j relative to robot i
+        return xy[None, :, :] - xy[:, None, :]
+    
+    def _update_distances(self):
+        # Distances to target are shared by reward, success check and info,
+        # so they are computed once per state change.
+        np.hypot(self._x - self.targets[:, 0], self._y - self.targets[:, 1], out=self._distances)
+    
     def _get_observation(self) -> np.ndarray:
-        obs_list = []
-        
-        for i, robot in enumerate(self.robots):
-            state = robot.get_state()
-            target = self.targets[i]
-            
-            robot_obs = np.array([
-                state.x, state.y, state.theta, state.v,
-                state.delta_fl, state.delta_fr, state.delta_rl, state.delta_rr
-            ], dtype=np.float32)
-            
-            target_rel = target - np.array([state.x, state.y])
-            robot_obs = np.concatenate([robot_obs, target_rel])
-            
-            obs_list.append(robot_obs)
+        # One row per robot, viewing that robot's block of self._obs_buf
+        obs = self._obs_rows
+        _fill_robot_obs(obs, self._x, self._y, self._theta, self._v, self._deltas, self.targets)
         
         if self.num_robots > 1:
-            for i in range(self.num_robots):
-                relative_positions = []
-                for j in range(self.num_robots):
-                    if i != j:
-                        state_i = self.robots[i].get_state()
-                        state_j = self.robots[j].get_state()
-                        rel_pos = np.array([state_j.x - state_i.x, state_j.y - state_i.y])
-                        relative_positions.append(rel_pos)
-                obs_list[i] = np.concatenate([obs_list[i], *relative_positions])
+            offsets = self._pairwise_offsets(self._positions())
+            obs[:, 10:] = offsets[self._off_diagonal].reshape(self.num_robots, -1)
         
-        if self.num_robots == 1:
-            return obs_list[0]
-        else:
-            return np.concatenate(obs_list).astype(np.float32)
+        # Hand out a copy: vectorized wrappers keep the previous observation
+        # (e.g. as terminal_observation) across the next reset/step.
+        return self._obs_buf.copy()
     
     def _compute_reward(self) -> float:
-        total_reward = 0.0
-        
-        for i, robot in enumerate(self.robots):
-            state = robot.get_state()
-            target = self.targets[i]
-            
-            distance = np.sqrt((state.x - target[0])**2 + (state.y - target[1])**2)
-            
-            if self.num_robots == 1:
-                distance_reward = -distance
+        if NUMBA_AVAILABLE and self.num_robots == 1:
+            total_reward = reward_single(self._v, self._deltas, self._distances,
+                                         self.success_threshold)
+        elif NUMBA_AVAILABLE:
+            total_reward = reward_multi(self._x, self._y, self._v, self._deltas, self._distances,
+                                        self._prev_distances, self.success_threshold)
+        else:
+            # Scalar equivalent of the kernels' clip + NaN guard
+            total_reward = float(self._compute_reward_numpy())
+            if math.isnan(total_reward):
+                total_reward = -100.0
             else:
-                distance_reward = -0.5 * distance
-                if not hasattr(self, '_prev_distances') or self._prev_distances[i] == float('inf'):
-                    progress = 0.0
-                else:
-                    progress = self._prev_distances[i] - distance
-                    progress = np.clip(progress, -5.0, 5.0)
-                distance_reward += 2.0 * progress
-                self._prev_distances[i] = distance
-            
-            success_bonus = 200.0 if distance < self.success_threshold else 0.0
-            
-            velocity_penalty = -0.1 * abs(state.v)
-            steering_penalty = -0.05 * (abs(state.delta_fl) + abs(state.delta_fr) + 
-                                      abs(state.delta_rl) + abs(state.delta_rr))
-            
-            robot_reward = distance_reward + success_bonus + velocity_penalty + steering_penalty
-            total_reward += robot_reward
+                total_reward = min(max(total_reward, -10000.0), 10000.0)
+        
+        return total_reward
+    
+    def _compute_reward_numpy(self) -> np.float32:
+        distances = self._distances
+        
+        if self.num_robots == 1:
+            distance_reward = -distances
+        else:
+            distance_reward = -0.5 * distances
+            progress = np.where(np.isinf(self._prev_distances), np.float32(0.0),
+                                np.clip(self._prev_distances - distances, -5.0, 5.0))
+            distance_reward = distance_reward + 2.0 * progress
+            np.copyto(self._prev_distances, distances)
+        
+        success_bonus = np.where(distances < self.success_threshold, np.float32(200.0), np.float32(0.0))
+        velocity_penalty = np.float32(-0.1) * np.abs(self._v)
+        steering_penalty = np.float32(-0.05) * np.abs(self._deltas).sum(axis=1)
+        
+        total_reward = (distance_reward + success_bonus + velocity_penalty + steering_penalty).sum()
         
         if self.num_robots > 1:
-            collision_penalty = 0.0
-            min_distance = float('inf')
-            for i in range(self.num_robots):
-                for j in range(i + 1, self.num_robots):
-                    state_i = self.robots[i].get_state()
-                    state_j = self.robots[j].get_state()
-                    dist = np.sqrt((state_i.x - state_j.x)**2 + (state_i.y - state_j.y)**2)
-                    min_distance = min(min_distance, dist)
-                    
-                    if dist < 0.5:
-                        collision_penalty -= 50.0
-                    elif dist < 1.0:
-                        collision_penalty -= 10.0 * (1.0 - dist)
+            offsets = self._pairwise_offsets(self._positions())[self._pair_i, self._pair_j]
+            dist = np.hypot(offsets[:, 0], offsets[:, 1])
+            collision_penalty = np.where(dist < 0.5, np.float32(-50.0),
+                                         np.where(dist < 1.0, np.float32(-10.0) * (1.0 - dist),
+                                                  np.float32(0.0))).sum()
             
             total_reward += collision_penalty
             
-            if min_distance > 1.5:
-                total_reward += 1.0
-        
-        total_reward = np.clip(total_reward, -10000.0, 10000.0)
+            if dist.min() > 1.5:
+                total_reward += np.float32(1.0)
         
-        if np.isnan(total_reward) or np.isinf(total_reward):
-            total_reward = -100.0
-        
-        return float(total_reward)
+        return total_reward
     
     def _check_success(self) -> bool:
-        for i, robot in enumerate(self.robots):
-            state = robot.get_state()
-            target = self.targets[i]
-            distance = np.sqrt((state.x - target[0])**2 + (state.y - target[1])**2)
-            if distance > self.success_threshold:
-                return False
-        return True
+        return bool((self._distances <= self.success_threshold).all())
     
     def _get_info(self) -> Dict[str, Any]:
         info = {}
-        distances = []
-        for i, robot in enumerate(self.robots):
-            state = robot.get_state()
-            target = self.targets[i]
-            distance = np.sqrt((state.x - target[0])**2 + (state.y - target[1])**2)
-            distances.append(distance)
-        info['distances'] = distances
+        info['distances'] = self._distances.tolist()
         info['step'] = self.step_count
         return info
     
+    def snapshot_robots(self) -> Tuple[list, np.ndarray]:
+        """Detached copies of the robots and targets.
+        
+        Unlike env.robots these don't reference the env, so they pickle
+        cheaply, e.g. back from a SubprocVecEnv worker.
+        """
+        robots = []
+        for view in self.robots:
+            robot = FourWheelKinematics(self.params)
+            robot.state = view.state
+            robots.append(robot)
+        return robots, self.targets.copy()
+    
     def render(self):
         if self.render_mode == "human":
             pass
 
+
+class RobotNavigationVectorEnv(gym.vector.VectorEnv):
+    # num_envs independent single-robot navigation tasks stepped together as
+    # one struct-of-arrays batch, without per-env Python objects or IPC.
+    
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.NEXT_STEP if AutoresetMode else "NextStep"}
+    
+    def __init__(self,
+                 num_envs: int = 8,
+                 max_episode_steps: int = 500,
+                 success_threshold: float = 0.3,
+                 initial_range: float = 10.0):
+        self.num_envs = num_envs
+        self.max_episode_steps = max_episode_steps
+        self.success_threshold = success_threshold
+        self.initial_range = initial_range
+        
+        self.single_observation_space = spaces.Box(
+            low=-np.inf, high=np.inf, shape=(10,), dtype=np.float32
+        )
+        self.single_action_space = spaces.Box(
+            low=np.array([-2.0, -2.0], dtype=np.float32),
+            high=np.array([2.0, 2.0], dtype=np.float32),
+            dtype=np.float32
+        )
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        
+        self.params = RobotParams()
+        self._x = np.zeros(num_envs, dtype=np.float32)
+        self._y = np.zeros(num_envs, dtype=np.float32)
+        self._theta = np.zeros(num_envs, dtype=np.float32)
+        self._v = np.zeros(num_envs, dtype=np.float32)
+        self._deltas = np.zeros((num_envs, 4), dtype=np.float32)
+        self._distances = np.zeros(num_envs, dtype=np.float32)
+        self.targets = np.zeros((num_envs, 2), dtype=np.float32)
+        self.step_count = np.zeros(num_envs, dtype=np.int64)
+        
+        self._obs_buf = np.empty((num_envs, 10), dtype=np.float32)
+        self._action_buf = np.empty((num_envs, 2), dtype=np.float32)
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+    
+    def _reset_envs(self, mask: np.ndarray):
+        k = int(mask.sum())
+        r = self.initial_range
+        self._x[mask] = self.np_random.uniform(-r, r, size=k)
+        self._y[mask] = self.np_random.uniform(-r, r, size=k)
+        self._theta[mask] = self.np_random.uniform(-np.pi, np.pi, size=k)
+        self._v[mask] = 0.0
+        self._deltas[mask] = 0.0
+        self.targets[mask] = self.np_random.uniform(-r, r, size=(k, 2))
+        self.step_count[mask] = 0
+    
+    def _update_distances(self):
+        np.hypot(self._x - self.targets[:, 0], self._y - self.targets[:, 1], out=self._distances)
+    
+    def _get_observation(self) -> np.ndarray:
+        _fill_robot_obs(self._obs_buf, self._x, self._y, self._theta, self._v, self._deltas, self.targets)
+        return self._obs_buf.copy()
+    
+    def reset(self, *, seed: Optional[int] = None, options: Optional[Dict] = None) -> Tuple[np.ndarray, Dict]:
+        super().reset(seed=seed)
+        
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self._autoreset[:] = False
+        self._update_distances()
+        
+        return self._get_observation(), {'distances': self._distances.copy()}
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        dt = np.float32(0.1)
+        
+        np.copyto(self._action_buf, np.asarray(actions).reshape(self.num_envs, 2))
+        _step_kinematics(self.params, self._x, self._y, self._theta, self._v, self._deltas,
+                         self._action_buf, dt)
+        self.step_count += 1
+        self._update_distances()
+        
+        d = self._distances
+        rewards = (-d + np.where(d < self.success_threshold, np.float32(200.0), np.float32(0.0))
+                   - np.float32(0.1) * np.abs(self._v)
+                   - np.float32(0.05) * np.abs(self._deltas).sum(axis=1))
+        rewards = np.clip(rewards, -10000.0, 10000.0)
+        rewards[~np.isfinite(rewards)] = -100.0
+        
+        terminated = d <= self.success_threshold
+        truncated = self.step_count >= self.max_episode_steps
+        
+        # Next-step autoreset: envs that finished on the previous call start a
+        # new episode now and report a zero-reward, non-terminal transition.
+        if self._autoreset.any():
+            done = self._autoreset
+            self._reset_envs(done)
+            self._update_distances()
+            rewards[done] = 0.0
+            terminated[done] = False
+            truncated[done] = False
+        self._autoreset = terminated | truncated
+        
+        info = {'distances': self._distances.copy(), 'success': terminated.copy()}
+        return self._get_observation(), rewards, terminated, truncated, info
+
+
+class DoubleBufferedRobotEnv:
+    # EnvPool/PufferLib-style M=2N double buffering over two vector envs:
+    # step() hands the active half to a background thread and returns the
+    # other half, which was stepped while the caller computed its actions.
+    
+    def __init__(self, num_envs: int = 16, **kwargs):
+        assert num_envs >= 2 and num_envs % 2 == 0, "num_envs must be an even number >= 2"
+        self.num_envs = num_envs
+        self.halves = [RobotNavigationVectorEnv(num_envs // 2, **kwargs) for _ in range(2)]
+        self.single_observation_space = self.halves[0].single_observation_space
+        self.single_action_space = self.halves[0].single_action_space
+        self.observation_space = self.halves[0].observation_space
+        self.action_space = self.halves[0].action_space
+        
+        self._jobs = queue.Queue()
+        self._results = [queue.Queue(maxsize=1), queue.Queue(maxsize=1)]
+        self._pending = [False, False]
+        self._reset_results = [None, None]
+        self._active = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+    
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            half, actions = job
+            try:
+                result = self.halves[half].step(actions)
+            except Exception as e:
+                result = e
+            self._results[half].put(result)
+    
+    def _collect(self, half: int):
+        result = self._results[half].get()
+        self._pending[half] = False
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def reset(self, *, seed: Optional[int] = None, options: Optional[Dict] = None) -> Tuple[np.ndarray, Dict]:
+        for half in range(2):
+            if self._pending[half]:
+                self._collect(half)
+        
+        for half, env in enumerate(self.halves):
+            obs, info = env.reset(seed=None if seed is None else seed + half, options=options)
+            n = env.num_envs
+            self._reset_results[half] = (obs, np.zeros(n), np.zeros(n, dtype=bool),
+                                         np.zeros(n, dtype=bool), info)
+        
+        self._active = 0
+        obs, info = self._reset_results[0][0], dict(self._reset_results[0][4])
+        self._reset_results[0] = None
+        info['env_half'] = 0
+        return obs, info
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        # actions are for the half whose observations were returned last
+        half, other = self._active, 1 - self._active
+        self._pending[half] = True
+        self._jobs.put((half, np.array(actions, dtype=np.float32)))
+        
+        if self._pending[other]:
+            obs, rewards, terminated, truncated, info = self._collect(other)
+        else:
+            # First step after reset: the other half has only its reset obs
+            obs, rewards, terminated, truncated, info = self._reset_results[other]
+            self._reset_results[other] = None
+        
+        info = dict(info)
+        info['env_half'] = other
+        self._active = other
+        return obs, rewards, terminated, truncated, info
+    
+    def close(self):
+        for half in range(2):
+            if self._pending[half]:
+                self._collect(half)
+        self._jobs.put(None)
+        self._worker.join()
@@ -1,9 +1,12 @@
+import math
 import numpy as np
 from typing import Tuple, Optional
 from dataclasses import dataclass
+from functools import lru_cache
+import robot_kinematics_numba
 
 
-@dataclass
+@dataclass(slots=True)
 class RobotState:
     x: float
     y: float
@@ -15,7 +18,7 @@ class RobotState:
     delta_rr: float
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RobotParams:
     wheelbase: float = 0.5
     track_width: float = 0.4
@@ -26,63 +29,112 @@ class RobotParams:
     max_velocity: float = 2.0  
 
 
+@lru_cache(maxsize=1024)
+def _wheel_angles(curvature: float, L_half: float, W_half: float) -> Tuple[float, float, float, float]:
+    # Exact-key cache: repeated (e.g. discretized) curvatures skip the atan2s
+    if abs(curvature) < 1e-6:
+        return 0.0, 0.0, 0.0, 0.0
+    
+    R = 1.0 / curvature
+    delta_fl = math.atan2(L_half, R - W_half)
+    delta_fr = math.atan2(L_half, R + W_half)
+    delta_rl = math.atan2(-L_half, R - W_half)
+    delta_rr = math.atan2(-L_half, R + W_half)
+    
+    return delta_fl, delta_fr, delta_rl, delta_rr
+
+
 class FourWheelKinematics:
     
-    def __init__(self, params: Optional[RobotParams] = None):
+    def __init__(self, params: Optional[RobotParams] = None,
+                 curvature_bins: Optional[np.ndarray] = None):
+        # Optional discrete curvature set; step(..., curvature_idx=i) then reads
+        # the wheel angles from a table built here instead of recomputing them.
+        self.curvature_bins = None if curvature_bins is None else np.asarray(curvature_bins, dtype=float)
         self.params = params or RobotParams()
         self.state = RobotState(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
-        
+    
+    @property
+    def params(self) -> RobotParams:
+        return self._params
+    
+    @params.setter
+    def params(self, params: RobotParams):
+        # Hot-path copies of the (frozen) params, refreshed whenever they change
+        self._params = params
+        self._L_half = params.wheelbase * 0.5
+        self._W_half = params.track_width * 0.5
+        self._max_delta = params.max_steering_angle
+        self._max_rate = params.max_steering_rate
+        self._max_accel = params.max_acceleration
+        self._max_v = params.max_velocity
+        self._delta_table = None
+        if self.curvature_bins is not None:
+            self._delta_table = [_wheel_angles(float(c), self._L_half, self._W_half)
+                                 for c in self.curvature_bins]
+    
     def reset(self, x: float = 0.0, y: float = 0.0, theta: float = 0.0):
-        self.state = RobotState(x, y, theta, 0.0, 0.0, 0.0, 0.0, 0.0)
-        
+        self.state = RobotState(float(x), float(y), float(theta), 0.0, 0.0, 0.0, 0.0, 0.0)
+    
     def get_icr_y(self, curvature: float) -> float:
         if abs(curvature) < 1e-6:
             return np.inf
         return 1.0 / curvature
     
     def compute_wheel_steering_angles(self, curvature: float) -> Tuple[float, float, float, float]:
-        if abs(curvature) < 1e-6:
-            return 0.0, 0.0, 0.0, 0.0
-        
-        R = 1.0 / curvature
-        L_half = self.params.wheelbase / 2
-        W_half = self.params.track_width / 2
-        
-        delta_fl = np.arctan2(L_half, R - W_half)
-        delta_fr = np.arctan2(L_half, R + W_half)
-        delta_rl = np.arctan2(-L_half, R - W_half)
-        delta_rr = np.arctan2(-L_half, R + W_half)
-        
-        return delta_fl, delta_fr, delta_rl, delta_rr
+        return _wheel_angles(float(curvature), self._L_half, self._W_half)
     
     def apply_steering_rate_limit(self, desired_deltas: Tuple[float, float, float, float], 
                                   dt: float) -> Tuple[float, float, float, float]:
         current = (self.state.delta_fl, self.state.delta_fr, 
                    self.state.delta_rl, self.state.delta_rr)
-        max_change = self.params.max_steering_rate * dt
+        max_change = self._max_rate * dt
+        max_angle = self._max_delta
         
         limited = []
         for desired, current_val in zip(desired_deltas, current):
             change = desired - current_val
-            change = np.clip(change, -max_change, max_change)
+            change = max(-max_change, min(max_change, change))
             new_val = current_val + change
-            new_val = np.clip(new_val, -self.params.max_steering_angle, self.params.max_steering_angle)
+            new_val = max(-max_angle, min(max_angle, new_val))
             limited.append(new_val)
         
         return tuple(limited)
     
     def apply_acceleration_limit(self, desired_velocity: float, dt: float) -> float:
-        max_change = self.params.max_acceleration * dt
+        max_change = self._max_accel * dt
         change = desired_velocity - self.state.v
-        change = np.clip(change, -max_change, max_change)
+        change = max(-max_change, min(max_change, change))
         new_velocity = self.state.v + change
-        return np.clip(new_velocity, -self.params.max_velocity, self.params.max_velocity)
+        return max(-self._max_v, min(self._max_v, new_velocity))
     
-    def step(self, curvature: float, velocity: float, dt: float = 0.1):
+    def step(self, curvature: Optional[float], velocity: float, dt: float = 0.1,
+             curvature_idx: Optional[int] = None):
+        if curvature_idx is not None:
+            curvature = self.curvature_bins[curvature_idx]
+        
+        if robot_kinematics_numba.NUMBA_AVAILABLE:
+            s, p = self.state, self._params
+            (s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr) = \
+                robot_kinematics_numba.step_core(
+                    s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr,
+                    float(curvature), float(velocity), float(dt),
+                    p.wheelbase, p.track_width, self._max_delta, self._max_rate,
+                    self._max_accel, self._max_v)
+            return
+        
+        # Plain floats from here on, so no numpy scalars end up in the state
+        curvature = float(curvature)
+        velocity = float(velocity)
+        dt = float(dt)
+        
         v_new = self.apply_acceleration_limit(velocity, dt)
         
-        delta_fl_desired, delta_fr_desired, delta_rl_desired, delta_rr_desired = \
-            self.compute_wheel_steering_angles(curvature)
+        if curvature_idx is not None:
+            desired = self._delta_table[curvature_idx]
+        else:
+            desired = self.compute_wheel_steering_angles(curvature)
+        delta_fl_desired, delta_fr_desired, delta_rl_desired, delta_rr_desired = desired
         
         delta_fl, delta_fr, delta_rl, delta_rr = \
             self.apply_steering_rate_limit(
@@ -96,66 +148,253 @@ class FourWheelKinematics:
         self.state.delta_rr = delta_rr
         self.state.v = v_new
         
+        sin_t = math.sin(self.state.theta)
+        cos_t = math.cos(self.state.theta)
+        
         if abs(curvature) < 1e-6:
-            dx = v_new * np.cos(self.state.theta) * dt
-            dy = v_new * np.sin(self.state.theta) * dt
+            dx = v_new * cos_t * dt
+            dy = v_new * sin_t * dt
             dtheta = 0.0
         else:
             omega = v_new * curvature
             dtheta = omega * dt
             
+            # sin/cos(theta + dtheta) by the angle-sum identity, so theta's
+            # sin/cos are shared with the straight-line branch
             R = 1.0 / curvature
-            sin_t = np.sin(self.state.theta)
-            cos_t = np.cos(self.state.theta)
-            sin_t_dt = np.sin(self.state.theta + dtheta)
-            cos_t_dt = np.cos(self.state.theta + dtheta)
+            sin_d = math.sin(dtheta)
+            cos_d = math.cos(dtheta)
             
-            dx = R * (sin_t_dt - sin_t)
-            dy = -R * (cos_t_dt - cos_t)
+            dx = R * (cos_t * sin_d - sin_t * (1.0 - cos_d))
+            dy = R * (sin_t * sin_d + cos_t * (1.0 - cos_d))
         
         self.state.x += dx
         self.state.y += dy
-        self.state.theta += dtheta
         
-        self.state.theta = (self.state.theta + np.pi) % (2 * np.pi) - np.pi
+        # |dtheta| is small per step, so one conditional shift wraps theta;
+        # the modulo only runs for out-of-range resets or huge steps
+        theta = self.state.theta + dtheta
+        if theta >= math.pi:
+            theta -= 2 * math.pi
+        elif theta < -math.pi:
+            theta += 2 * math.pi
+        if not -math.pi <= theta < math.pi:
+            theta = (theta + math.pi) % (2 * math.pi) - math.pi
+        self.state.theta = theta
     
-    def get_state(self) -> RobotState:
-        return self.state
-    
-    def get_wheel_positions(self) -> np.ndarray:
-        L_half = self.params.wheelbase / 2
-        W_half = self.params.track_width / 2
+    def rollout(self, curvatures, velocities, dt: float = 0.1) -> np.ndarray:
+        # Advances len(curvatures) steps in one call and returns the (N, 3)
+        # x, y, theta after each, matching repeated step() calls.
+        curvatures = np.ascontiguousarray(curvatures, dtype=np.float64)
+        velocities = np.ascontiguousarray(
+            np.broadcast_to(np.asarray(velocities, dtype=np.float64), curvatures.shape))
+        n = len(curvatures)
+        s, p = self.state, self._params
+        poses = np.empty((n, 3))
+        if n == 0:
+            return poses
+        
+        if robot_kinematics_numba.NUMBA_AVAILABLE:
+            (s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr) = \
+                robot_kinematics_numba.rollout_core(
+                    s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr,
+                    curvatures, velocities, float(dt),
+                    p.wheelbase, p.track_width, self._max_delta, self._max_rate,
+                    self._max_accel, self._max_v, poses)
+            return poses
         
-        wheel_positions_robot = np.array([
-            [L_half, W_half],
-            [L_half, -W_half],
-            [-L_half, W_half],
-            [-L_half, -W_half]
-        ])
+        # The rate limits make v and the wheel angles path-dependent, so only
+        # those recurrences loop (over plain floats); the pose integration is
+        # a chord-form cumsum, as in step_batch.
+        dt = float(dt)
+        max_dv = self._max_accel * dt
+        max_change = self._max_rate * dt
+        max_v = self._max_v
+        max_angle = self._max_delta
         
-        cos_t = np.cos(self.state.theta)
-        sin_t = np.sin(self.state.theta)
-        R = np.array([[cos_t, -sin_t],
-                      [sin_t, cos_t]])
+        straight = np.abs(curvatures) < 1e-6
+        R = 1.0 / np.where(straight, 1.0, curvatures)
+        L_half, W_half = self._L_half, self._W_half
+        desired = np.where(straight[:, None], 0.0, np.stack([
+            np.arctan2(L_half, R - W_half),
+            np.arctan2(L_half, R + W_half),
+            np.arctan2(-L_half, R - W_half),
+            np.arctan2(-L_half, R + W_half),
+        ], axis=1))
         
-        wheel_positions_global = (R @ wheel_positions_robot.T).T
-        wheel_positions_global[:, 0] += self.state.x
-        wheel_positions_global[:, 1] += self.state.y
+        v = np.empty(n)
+        v_k = s.v
+        d_fl, d_fr, d_rl, d_rr = s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr
+        for k, (target, (w_fl, w_fr, w_rl, w_rr)) in enumerate(
+                zip(velocities.tolist(), desired.tolist())):
+            v_k = max(-max_v, min(max_v, v_k + max(-max_dv, min(max_dv, target - v_k))))
+            v[k] = v_k
+            d_fl = max(-max_angle, min(max_angle, d_fl + max(-max_change, min(max_change, w_fl - d_fl))))
+            d_fr = max(-max_angle, min(max_angle, d_fr + max(-max_change, min(max_change, w_fr - d_fr))))
+            d_rl = max(-max_angle, min(max_angle, d_rl + max(-max_change, min(max_change, w_rl - d_rl))))
+            d_rr = max(-max_angle, min(max_angle, d_rr + max(-max_change, min(max_change, w_rr - d_rr))))
         
-        return wheel_positions_global
+        dtheta = np.where(straight, 0.0, v * curvatures * dt)
+        chord = np.where(straight, v * dt, 2.0 * R * np.sin(0.5 * dtheta))
+        theta = s.theta + np.cumsum(dtheta)
+        t_mid = theta - 0.5 * dtheta
+        
+        poses[:, 0] = s.x + np.cumsum(chord * np.cos(t_mid))
+        poses[:, 1] = s.y + np.cumsum(chord * np.sin(t_mid))
+        poses[:, 2] = (theta + np.pi) % (2 * np.pi) - np.pi
+        
+        s.x, s.y, s.theta = poses[-1].tolist()
+        s.v = v_k
+        s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr = d_fl, d_fr, d_rl, d_rr
+        return poses
+    
+    def get_state(self) -> RobotState:
+        return self.state
+    
+    def get_wheel_positions(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # Rotation unrolled by hand; pass a (4, 2) buffer as out to skip the allocation
+        L_half = self._L_half
+        W_half = self._W_half
+        x, y = self.state.x, self.state.y
+        c = math.cos(self.state.theta)
+        s = math.sin(self.state.theta)
+        
+        if out is None:
+            out = np.empty((4, 2))
+        out[0, 0] = L_half * c - W_half * s + x
+        out[0, 1] = L_half * s + W_half * c + y
+        out[1, 0] = L_half * c + W_half * s + x
+        out[1, 1] = L_half * s - W_half * c + y
+        out[2, 0] = -L_half * c - W_half * s + x
+        out[2, 1] = -L_half * s + W_half * c + y
+        out[3, 0] = -L_half * c + W_half * s + x
+        out[3, 1] = -L_half * s - W_half * c + y
+        return out
     
     def get_icr_position(self) -> Optional[Tuple[float, float]]:
         if abs(self.state.delta_fl) < 1e-3:
             return None
-             
+        
         L = self.params.wheelbase / 2
         W = self.params.track_width / 2
-        y_icr_robot = L / np.tan(self.state.delta_fl) + W
+        y_icr_robot = L / math.tan(self.state.delta_fl) + W
         
-        cos_t = np.cos(self.state.theta)
-        sin_t = np.sin(self.state.theta)
+        cos_t = math.cos(self.state.theta)
+        sin_t = math.sin(self.state.theta)
         
         gx = -y_icr_robot * sin_t + self.state.x
         gy = y_icr_robot * cos_t + self.state.y
         
         return (gx, gy)
+
+
+def step_batch(x: np.ndarray, y: np.ndarray, theta: np.ndarray, v: np.ndarray,
+               deltas: np.ndarray, curvature: np.ndarray, velocity: np.ndarray,
+               dt: float, params: RobotParams):
+    # Struct-of-arrays counterpart of FourWheelKinematics.step: advances N robots
+    # in place, with deltas of shape (N, 4) ordered fl, fr, rl, rr.
+    max_dv = params.max_acceleration * dt
+    v_new = v + np.clip(velocity - v, -max_dv, max_dv)
+    v_new = np.clip(v_new, -params.max_velocity, params.max_velocity)
+    
+    # Branch-free: every robot goes through the same expressions, with a
+    # dummy radius for straight-line robots whose results are then masked.
+    straight = np.abs(curvature) < 1e-6
+    R = 1.0 / np.where(straight, 1.0, curvature)
+    L_half = params.wheelbase / 2
+    W_half = params.track_width / 2
+    
+    desired = np.stack([
+        np.arctan2(L_half, R - W_half),
+        np.arctan2(L_half, R + W_half),
+        np.arctan2(-L_half, R - W_half),
+        np.arctan2(-L_half, R + W_half),
+    ], axis=1)
+    desired = np.where(straight[:, None], 0.0, desired)
+    
+    max_change = params.max_steering_rate * dt
+    change = np.clip(desired - deltas, -max_change, max_change)
+    deltas[:] = np.clip(deltas + change, -params.max_steering_angle, params.max_steering_angle)
+    v[:] = v_new
+    
+    # Chord form of the arc update, 2R sin(dtheta/2) along theta + dtheta/2;
+    # it reduces to v*dt along theta on the straight-line robots.
+    dtheta = np.where(straight, 0.0, v_new * curvature * dt)
+    chord = np.where(straight, v_new * dt, 2.0 * R * np.sin(0.5 * dtheta))
+    t_mid = theta + 0.5 * dtheta
+    
+    x += chord * np.cos(t_mid)
+    y += chord * np.sin(t_mid)
+    theta[:] = (theta + dtheta + np.pi) % (2 * np.pi) - np.pi
+
+
+class BatchedFourWheelKinematics:
+    # N robots sharing one RobotParams, stored struct-of-arrays and advanced
+    # together by step_batch (or the Numba step_all kernel when available).
+    
+    def __init__(self, num_robots: int, params: Optional[RobotParams] = None, dtype=np.float64):
+        self.params = params or RobotParams()
+        self.num_robots = num_robots
+        self.x = np.zeros(num_robots, dtype=dtype)
+        self.y = np.zeros(num_robots, dtype=dtype)
+        self.theta = np.zeros(num_robots, dtype=dtype)
+        self.v = np.zeros(num_robots, dtype=dtype)
+        self.deltas = np.zeros((num_robots, 4), dtype=dtype)
+    
+    @property
+    def delta_fl(self) -> np.ndarray:
+        return self.deltas[:, 0]
+    
+    @property
+    def delta_fr(self) -> np.ndarray:
+        return self.deltas[:, 1]
+    
+    @property
+    def delta_rl(self) -> np.ndarray:
+        return self.deltas[:, 2]
+    
+    @property
+    def delta_rr(self) -> np.ndarray:
+        return self.deltas[:, 3]
+    
+    def reset(self, x=0.0, y=0.0, theta=0.0):
+        self.x[:] = x
+        self.y[:] = y
+        self.theta[:] = theta
+        self.v[:] = 0.0
+        self.deltas[:] = 0.0
+    
+    def step(self, curvature: np.ndarray, velocity: np.ndarray, dt: float = 0.1):
+        dtype = self.x.dtype
+        curvature = np.broadcast_to(np.asarray(curvature, dtype=dtype), (self.num_robots,))
+        velocity = np.broadcast_to(np.asarray(velocity, dtype=dtype), (self.num_robots,))
+        dt = dtype.type(dt)
+        
+        if robot_kinematics_numba.NUMBA_AVAILABLE:
+            p = self.params
+            robot_kinematics_numba.step_all(
+                self.x, self.y, self.theta, self.v, self.deltas, curvature, velocity, dt,
+                p.wheelbase, p.track_width, p.max_steering_angle, p.max_steering_rate,
+                p.max_acceleration, p.max_velocity)
+        else:
+            step_batch(self.x, self.y, self.theta, self.v, self.deltas, curvature, velocity,
+                       dt, self.params)
+    
+    def get_state(self, index: int) -> RobotState:
+        d = self.deltas[index]
+        return RobotState(float(self.x[index]), float(self.y[index]), float(self.theta[index]),
+                          float(self.v[index]), float(d[0]), float(d[1]), float(d[2]), float(d[3]))
+    
+    def get_wheel_positions(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # (N, 4, 2) global wheel positions, same wheel order as FourWheelKinematics
+        L_half = self.params.wheelbase / 2
+        W_half = self.params.track_width / 2
+        local = np.array([[L_half, W_half], [L_half, -W_half],
+                          [-L_half, W_half], [-L_half, -W_half]])
+        cos_t = np.cos(self.theta)[:, None]
+        sin_t = np.sin(self.theta)[:, None]
+        
+        positions = np.empty((self.num_robots, 4, 2)) if out is None else out
+        positions[:, :, 0] = cos_t * local[:, 0] - sin_t * local[:, 1] + self.x[:, None]
+        positions[:, :, 1] = sin_t * local[:, 0] + cos_t * local[:, 1] + self.y[:, None]
+        return positions
@@ -0,0 +1,84 @@
+from typing import NamedTuple
+
+try:
+    import jax
+    import jax.numpy as jnp
+    from functools import partial
+    JAX_AVAILABLE = True
+except ImportError:
+    JAX_AVAILABLE = False
+
+
+class JaxRobotParams(NamedTuple):
+    # Hashable, so it can be passed as a static argument and constant-folded
+    wheelbase: float = 0.5
+    track_width: float = 0.4
+    max_steering_angle: float = 1.0471975511965976
+    max_steering_rate: float = 0.5
+    max_acceleration: float = 2.0
+    max_velocity: float = 2.0
+    
+    @classmethod
+    def from_params(cls, params) -> "JaxRobotParams":
+        return cls(params.wheelbase, params.track_width, params.max_steering_angle,
+                   params.max_steering_rate, params.max_acceleration, params.max_velocity)
+
+
+class JaxRobotState(NamedTuple):
+    x: "jnp.ndarray"
+    y: "jnp.ndarray"
+    theta: "jnp.ndarray"
+    v: "jnp.ndarray"
+    deltas: "jnp.ndarray"
+
+
+if JAX_AVAILABLE:
+    
+    def _wheel_angles(curvature, L_half, W_half):
+        # Branch-free: straight-line robots get a dummy radius, then zeros
+        straight = jnp.abs(curvature) < 1e-6
+        R = 1.0 / jnp.where(straight, 1.0, curvature)
+        angles = jnp.stack([
+            jnp.arctan2(L_half, R - W_half),
+            jnp.arctan2(L_half, R + W_half),
+            jnp.arctan2(-L_half, R - W_half),
+            jnp.arctan2(-L_half, R + W_half),
+        ], axis=-1)
+        return jnp.where(straight[..., None], 0.0, angles)
+    
+    wheel_angles = jax.jit(_wheel_angles)
+    batched_wheel_angles = jax.jit(jax.vmap(_wheel_angles, in_axes=(0, None, None)))
+    
+    def _step(state: JaxRobotState, curvature, velocity, dt, params: JaxRobotParams) -> JaxRobotState:
+        max_dv = params.max_acceleration * dt
+        v_new = state.v + jnp.clip(velocity - state.v, -max_dv, max_dv)
+        v_new = jnp.clip(v_new, -params.max_velocity, params.max_velocity)
+        
+        desired = _wheel_angles(curvature, params.wheelbase / 2, params.track_width / 2)
+        max_change = params.max_steering_rate * dt
+        deltas = state.deltas + jnp.clip(desired - state.deltas, -max_change, max_change)
+        deltas = jnp.clip(deltas, -params.max_steering_angle, params.max_steering_angle)
+        
+        straight = jnp.abs(curvature) < 1e-6
+        k = jnp.where(straight, 1.0, curvature)
+        dtheta_arc = v_new * k * dt
+        chord = 2.0 / k * jnp.sin(0.5 * dtheta_arc)
+        t_mid = state.theta + 0.5 * dtheta_arc
+        dx = jnp.where(straight, v_new * jnp.cos(state.theta) * dt, chord * jnp.cos(t_mid))
+        dy = jnp.where(straight, v_new * jnp.sin(state.theta) * dt, chord * jnp.sin(t_mid))
+        dtheta = jnp.where(straight, 0.0, dtheta_arc)
+        
+        theta = (state.theta + dtheta + jnp.pi) % (2 * jnp.pi) - jnp.pi
+        return JaxRobotState(state.x + dx, state.y + dy, theta, v_new, deltas)
+    
+    step = jax.jit(_step, static_argnums=(4,))
+    
+    @partial(jax.jit, static_argnums=(4,))
+    def rollout(state: JaxRobotState, curvatures, velocities, dt, params: JaxRobotParams):
+        # curvatures/velocities are (T, ...) control sequences; the whole
+        # rollout compiles to one XLA graph via lax.scan over time.
+        def body(carry, controls):
+            next_state = _step(carry, controls[0], controls[1], dt, params)
+            return next_state, next_state
+        
+        return jax.lax.scan(body, state, (curvatures, velocities))
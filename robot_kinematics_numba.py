@@ -0,0 +1,252 @@
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Eagerly compiled for one float64 signature: no JIT pause on the first call
+# and no new specializations at runtime, so step latency stays predictable.
+@njit("UniTuple(float64, 8)(" + ", ".join(["float64"] * 17) + ")",
+      cache=True, fastmath=True, nogil=True)
+def step_core(x, y, theta, v, delta_fl, delta_fr, delta_rl, delta_rr,
+              curvature, velocity, dt,
+              wheelbase, track_width, max_steering_angle, max_steering_rate,
+              max_acceleration, max_velocity):
+    # Compiled FourWheelKinematics.step: takes and returns the eight
+    # RobotState fields as scalars, in field order.
+    max_dv = max_acceleration * dt
+    dv = min(max(velocity - v, -max_dv), max_dv)
+    v_new = min(max(v + dv, -max_velocity), max_velocity)
+    
+    straight = abs(curvature) < 1e-6
+    if straight:
+        d_fl = d_fr = d_rl = d_rr = 0.0
+    else:
+        R = 1.0 / curvature
+        L_half = wheelbase / 2
+        W_half = track_width / 2
+        d_fl = math.atan2(L_half, R - W_half)
+        d_fr = math.atan2(L_half, R + W_half)
+        d_rl = math.atan2(-L_half, R - W_half)
+        d_rr = math.atan2(-L_half, R + W_half)
+    
+    max_change = max_steering_rate * dt
+    delta_fl = min(max(delta_fl + min(max(d_fl - delta_fl, -max_change), max_change),
+                       -max_steering_angle), max_steering_angle)
+    delta_fr = min(max(delta_fr + min(max(d_fr - delta_fr, -max_change), max_change),
+                       -max_steering_angle), max_steering_angle)
+    delta_rl = min(max(delta_rl + min(max(d_rl - delta_rl, -max_change), max_change),
+                       -max_steering_angle), max_steering_angle)
+    delta_rr = min(max(delta_rr + min(max(d_rr - delta_rr, -max_change), max_change),
+                       -max_steering_angle), max_steering_angle)
+    
+    sin_t = math.sin(theta)
+    cos_t = math.cos(theta)
+    if straight:
+        x += v_new * cos_t * dt
+        y += v_new * sin_t * dt
+        dtheta = 0.0
+    else:
+        dtheta = v_new * curvature * dt
+        R = 1.0 / curvature
+        sin_d = math.sin(dtheta)
+        cos_d = math.cos(dtheta)
+        x += R * (cos_t * sin_d - sin_t * (1.0 - cos_d))
+        y += R * (sin_t * sin_d + cos_t * (1.0 - cos_d))
+    
+    # Same wrap as the Python step: conditional shift, modulo as fallback
+    theta += dtheta
+    if theta >= math.pi:
+        theta -= 2 * math.pi
+    elif theta < -math.pi:
+        theta += 2 * math.pi
+    if not -math.pi <= theta < math.pi:
+        theta = (theta + math.pi) % (2 * math.pi) - math.pi
+    return x, y, theta, v_new, delta_fl, delta_fr, delta_rl, delta_rr
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def rollout_core(x, y, theta, v, delta_fl, delta_fr, delta_rl, delta_rr,
+                 curvatures, velocities, dt,
+                 wheelbase, track_width, max_steering_angle, max_steering_rate,
+                 max_acceleration, max_velocity, poses):
+    # FourWheelKinematics.rollout: step_core over a whole command sequence,
+    # writing x, y, theta after each step into poses (N, 3); returns the
+    # final state fields like step_core.
+    for k in range(curvatures.shape[0]):
+        x, y, theta, v, delta_fl, delta_fr, delta_rl, delta_rr = step_core(
+            x, y, theta, v, delta_fl, delta_fr, delta_rl, delta_rr,
+            curvatures[k], velocities[k], dt,
+            wheelbase, track_width, max_steering_angle, max_steering_rate,
+            max_acceleration, max_velocity)
+        poses[k, 0] = x
+        poses[k, 1] = y
+        poses[k, 2] = theta
+    return x, y, theta, v, delta_fl, delta_fr, delta_rl, delta_rr
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def step_all(x, y, theta, v, deltas, curvature, velocity, dt,
+             wheelbase, track_width, max_steering_angle, max_steering_rate,
+             max_acceleration, max_velocity):
+    # Fused, in-place equivalent of robot_kinematics.step_batch.
+    L_half = wheelbase / 2
+    W_half = track_width / 2
+    max_dv = max_acceleration * dt
+    max_change = max_steering_rate * dt
+    
+    for i in range(x.shape[0]):
+        dv = velocity[i] - v[i]
+        dv = min(max(dv, -max_dv), max_dv)
+        v_new = min(max(v[i] + dv, -max_velocity), max_velocity)
+        v[i] = v_new
+        
+        k = curvature[i]
+        straight = abs(k) < 1e-6
+        if straight:
+            d_fl = d_fr = d_rl = d_rr = 0.0
+        else:
+            R = 1.0 / k
+            d_fl = math.atan2(L_half, R - W_half)
+            d_fr = math.atan2(L_half, R + W_half)
+            d_rl = math.atan2(-L_half, R - W_half)
+            d_rr = math.atan2(-L_half, R + W_half)
+        
+        for w, desired in enumerate((d_fl, d_fr, d_rl, d_rr)):
+            change = min(max(desired - deltas[i, w], -max_change), max_change)
+            deltas[i, w] = min(max(deltas[i, w] + change, -max_steering_angle), max_steering_angle)
+        
+        t = theta[i]
+        if straight:
+            x[i] += v_new * math.cos(t) * dt
+            y[i] += v_new * math.sin(t) * dt
+            dtheta = 0.0
+        else:
+            dtheta = v_new * k * dt
+            chord = 2.0 / k * math.sin(0.5 * dtheta)
+            x[i] += chord * math.cos(t + 0.5 * dtheta)
+            y[i] += chord * math.sin(t + 0.5 * dtheta)
+        
+        theta[i] = (t + dtheta + math.pi) % (2 * math.pi) - math.pi
+
+
+# fastmath minus the no-inf/no-nan flags: the reward guard and the
+# prev_distances "no previous step" marker both rely on inf/nan semantics.
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(cache=True, nogil=True)
+def _finish_reward(reward):
+    # Same result as np.clip(reward, -1e4, 1e4) followed by the NaN guard
+    if math.isnan(reward):
+        return -100.0
+    return min(max(reward, -10000.0), 10000.0)
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True)
+def reward_single(v, deltas, distances, success_threshold):
+    distance = distances[0]
+    reward = -distance
+    if distance < success_threshold:
+        reward += 200.0
+    reward -= 0.1 * abs(v[0])
+    reward -= 0.05 * (abs(deltas[0, 0]) + abs(deltas[0, 1]) +
+                      abs(deltas[0, 2]) + abs(deltas[0, 3]))
+    return _finish_reward(reward)
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True)
+def reward_multi(x, y, v, deltas, distances, prev_distances, success_threshold):
+    n = x.shape[0]
+    total = 0.0
+    
+    for i in range(n):
+        distance = distances[i]
+        reward = -0.5 * distance
+        if not math.isinf(prev_distances[i]):
+            progress = min(max(prev_distances[i] - distance, -5.0), 5.0)
+            reward += 2.0 * progress
+        prev_distances[i] = distance
+        
+        if distance < success_threshold:
+            reward += 200.0
+        
+        reward -= 0.1 * abs(v[i])
+        reward -= 0.05 * (abs(deltas[i, 0]) + abs(deltas[i, 1]) +
+                          abs(deltas[i, 2]) + abs(deltas[i, 3]))
+        total += reward
+    
+    collision_penalty = 0.0
+    min_distance = np.inf
+    for i in range(n):
+        for j in range(i + 1, n):
+            dist = math.hypot(x[i] - x[j], y[i] - y[j])
+            min_distance = min(min_distance, dist)
+            
+            if dist < 0.5:
+                collision_penalty -= 50.0
+            elif dist < 1.0:
+                collision_penalty -= 10.0 * (1.0 - dist)
+    
+    total += collision_penalty
+    
+    if min_distance > 1.5:
+        total += 1.0
+    
+    return _finish_reward(total)
+
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def marker_geometry(x, y, theta, deltas, half_size):
+    # Compiled counterpart of visualize._marker_geometry: body corners
+    # (N, 4, 3), wheel positions (N, 4, 2), body and wheel yaw quaternion
+    # z/w halves, and the ICR (where the front-left wheel is steered) for N
+    # robots in one loop.
+    n = x.shape[0]
+    corners = np.zeros((n, 4, 3))
+    wheels = np.empty((n, 4, 2))
+    body_z = np.empty(n)
+    body_w = np.empty(n)
+    wheel_z = np.empty((n, 4))
+    wheel_w = np.empty((n, 4))
+    has_icr = np.empty(n, dtype=np.bool_)
+    icr_x = np.empty(n)
+    icr_y = np.empty(n)
+    for i in range(n):
+        c = math.cos(theta[i])
+        s = math.sin(theta[i])
+        L = half_size[i, 0]
+        W = half_size[i, 1]
+        # Corner order FL, FR, RR, RL; wheel order FL, FR, RL, RR
+        for k in range(4):
+            sx = L if k < 2 else -L
+            sy = W if k == 0 or k == 3 else -W
+            corners[i, k, 0] = c * sx - s * sy + x[i]
+            corners[i, k, 1] = s * sx + c * sy + y[i]
+            wy = W if k % 2 == 0 else -W
+            wheels[i, k, 0] = c * sx - s * wy + x[i]
+            wheels[i, k, 1] = s * sx + c * wy + y[i]
+            half = (theta[i] + deltas[i, k]) / 2.0
+            wheel_z[i, k] = math.sin(half)
+            wheel_w[i, k] = math.cos(half)
+        body_z[i] = math.sin(theta[i] / 2.0)
+        body_w[i] = math.cos(theta[i] / 2.0)
+        has_icr[i] = abs(deltas[i, 0]) >= 1e-3
+        if has_icr[i]:
+            y_icr = L / math.tan(deltas[i, 0]) + W
+            icr_x[i] = -y_icr * s + x[i]
+            icr_y[i] = y_icr * c + y[i]
+        else:
+            icr_x[i] = 0.0
+            icr_y[i] = 0.0
+    return corners, wheels, body_z, body_w, wheel_z, wheel_w, has_icr, icr_x, icr_y
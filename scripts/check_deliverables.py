@@ -4,6 +4,21 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, List, Optional
 
+def _scan(path: str) -> Dict[str, os.DirEntry]:
+    """One os.scandir pass over path; entries cache their stat results."""
+    try:
+        with os.scandir(path) as it:
+            return {entry.name: entry for entry in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+def _is_file(entries: Dict[str, os.DirEntry], name: str) -> bool:
+    entry = entries.get(name)
+    return entry is not None and entry.is_file()
+
+def _mcap_entries(entries: Dict[str, os.DirEntry]) -> List[os.DirEntry]:
+    return [e for e in entries.values() if e.name.endswith('.mcap') and e.is_file(follow_symlinks=False)]
+
 def check_file_structure():
     """
     Check what files exist in the project
@@ -11,18 +26,21 @@ def check_file_structure():
     print("=" * 60)
     print("CHECKING AVAILABLE DELIVERABLES")
     
+    root = _scan('.')
+    
     deliverables = {
-        'single_robot_logs': Path('logs/single_robot/evaluations.npz').exists(),
-        'multi_robot_logs': Path('logs/multi_robot').exists() and len(list(Path('logs/multi_robot').iterdir())) > 0,
-        'tensorboard_logs': Path('tensorboard_logs').exists() and len(list(Path('tensorboard_logs').iterdir())) > 0,
+        'single_robot_logs': _is_file(_scan('logs/single_robot'), 'evaluations.npz'),
+        'multi_robot_logs': len(_scan('logs/multi_robot')) > 0,
+        'tensorboard_logs': len(_scan('tensorboard_logs')) > 0,
         'single_robot_mcap': False,
         'multi_robot_mcap': False,
-        'training_metrics_json': Path('training_metrics.json').exists(),
-        'training_episodes_json': Path('training_episodes.json').exists(),
-        'training_json': Path('training.json').exists(),
+        'training_metrics_json': _is_file(root, 'training_metrics.json'),
+        'training_episodes_json': _is_file(root, 'training_episodes.json'),
+        'training_json': _is_file(root, 'training.json'),
     }
     
-    mcap_files = list(Path('.').glob('*.mcap')) + list(Path('.').glob('*mcap*.json'))
+    mcap_files = _mcap_entries(root) + [e for e in root.values()
+                                        if 'mcap' in e.name and e.name.endswith('.json')]
     if mcap_files:
         for f in mcap_files:
             if 'single' in f.name.lower() or 'training' in f.name.lower():
@@ -91,28 +109,27 @@ def check_mcap_files():
     print("MCAP RECORDINGS")
     
     #code looks for MCAP-Json files
-    json_files = list(Path('.').glob('*.json'))
+    root = _scan('.')
     mcap_candidates = []
     
-    for json_file in json_files:
-        if json_file.name in ['training_metrics.json', 'training_episodes.json', 'training.json']:
-            try:
-                with open(json_file, 'r') as f:
-                    first_line = f.readline()
-                    f.seek(0)
-                    
-                    if json_file.stat().st_size < 10_000_000:  #we check only small files here
-                        try:
-                            data = json.load(f)
-                            if isinstance(data, dict):
-                                if 'metrics' in data or 'messages' in data or 'metadata' in data:
-                                    mcap_candidates.append((json_file, 'MCAP-like structure'))
-                                elif 'episode_rewards' in data or 'episode_lengths' in data:
-                                    mcap_candidates.append((json_file, 'Metrics data'))
-                        except:
-                            pass
-            except Exception as e:
-                pass
+    for name in ['training_metrics.json', 'training_episodes.json', 'training.json']:
+        json_file = root.get(name)
+        if json_file is None or not json_file.is_file():
+            continue
+        try:
+            if json_file.stat().st_size < 10_000_000:  #we check only small files here
+                with open(json_file.path, 'r') as f:
+                    try:
+                        data = json.load(f)
+                        if isinstance(data, dict):
+                            if 'metrics' in data or 'messages' in data or 'metadata' in data:
+                                mcap_candidates.append((json_file, 'MCAP-like structure'))
+                            elif 'episode_rewards' in data or 'episode_lengths' in data:
+                                mcap_candidates.append((json_file, 'Metrics data'))
+                    except:
+                        pass
+        except Exception as e:
+            pass
     
     if mcap_candidates:
         print("Found potential MCAP/metrics files:")
@@ -123,7 +140,7 @@ def check_mcap_files():
         print("No MCAP recordings found")
         print("MCAP files should be generated with --record flag during training")
     
-    mcap_files = list(Path('.').glob('*.mcap'))
+    mcap_files = _mcap_entries(root)
     if mcap_files:
         print("\nFound .mcap files:")
         for f in mcap_files:
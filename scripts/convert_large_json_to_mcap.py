@@ -8,6 +8,139 @@ import sys
 from pathlib import Path
 from mcap.writer import Writer
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def _ijson_backend():
+    # The C yajl backend when it is built, else whatever ijson picked
+    try:
+        return ijson.get_backend('yajl2_c')
+    except ImportError:
+        return ijson
+
+try:
+    import orjson
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    loads = json.loads
+
+READ_CHUNK_SIZE = 1 << 20
+PROBE_SIZE = 64 * 1024
+ENCODE_WORKERS = 4
+PIPELINE_DEPTH = 64
+JSONL_BATCH_LINES = 1000
+
+
+def _encode_batch(batch, payload_key):
+    return [(int(item['timestamp'] * 1e9), dumps(item[payload_key] if payload_key else item))
+            for item in batch]
+
+
+def _produce_batches(f, pool, pending, markers_channel_id, metrics_channel_id, max_messages):
+    """Parse f in one pass and queue (channel_id, encode future) pairs in file order."""
+    try:
+        parsed_messages = ijson.sendable_list()
+        parsed_metrics = ijson.sendable_list()
+        backend = _ijson_backend()
+        parsers = [
+            backend.items_coro(parsed_messages, 'messages.item', use_float=True),
+            backend.items_coro(parsed_metrics, 'metrics.item', use_float=True),
+        ]
+        remaining = max_messages
+        
+        def flush():
+            nonlocal remaining
+            if parsed_messages and remaining != 0:
+                batch = parsed_messages[:remaining] if remaining else list(parsed_messages)
+                if remaining:
+                    remaining -= len(batch)
+                pending.put((markers_channel_id, pool.submit(_encode_batch, batch, 'data')))
+            if parsed_metrics:
+                pending.put((metrics_channel_id, pool.submit(_encode_batch, list(parsed_metrics), None)))
+            del parsed_messages[:]
+            del parsed_metrics[:]
+        
+        while chunk := f.read(READ_CHUNK_SIZE):
+            for parser in parsers:
+                parser.send(chunk)
+            flush()
+        for parser in parsers:
+            parser.close()
+        flush()
+    except BaseException as e:
+        pending.put(e)
+    pending.put(None)
+
+
+def _is_jsonl(head: bytes) -> bool:
+    # JSONL when the first line is a complete object on its own; the
+    # indented single-document layout opens with a bare "{" line. A compact
+    # single document also fits on one line, so it takes either a record
+    # shaped first line (timestamped, no top-level "messages"/"metrics") or
+    # a second object on the next line.
+    lines = head.lstrip().split(b'\n', 2)
+    if not lines[0].startswith(b'{'):
+        return False
+    try:
+        first = loads(lines[0])
+    except ValueError:
+        return False
+    if not isinstance(first, dict):
+        return False
+    if 'timestamp' in first and 'messages' not in first and 'metrics' not in first:
+        return True
+    return len(lines) > 1 and lines[1].lstrip().startswith(b'{')
+
+
+def _produce_jsonl_batches(f, pool, pending, markers_channel_id, metrics_channel_id, max_messages):
+    """Parse one record per line of f and queue (channel_id, encode future) pairs in file order.
+    
+    Marker records carry 'channel' and 'data' like the entries of the
+    "messages" array; any other timestamped record is a metric.
+    """
+    try:
+        messages, metrics = [], []
+        remaining = max_messages
+        
+        def flush():
+            nonlocal remaining
+            if messages and remaining != 0:
+                batch = messages[:remaining] if remaining else list(messages)
+                if remaining:
+                    remaining -= len(batch)
+                pending.put((markers_channel_id, pool.submit(_encode_batch, batch, 'data')))
+            if metrics:
+                pending.put((metrics_channel_id, pool.submit(_encode_batch, list(metrics), None)))
+            messages.clear()
+            metrics.clear()
+        
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            if 'timestamp' not in record:
+                continue
+            if 'data' in record and 'channel' in record:
+                messages.append(record)
+            else:
+                metrics.append(record)
+            if len(messages) + len(metrics) >= JSONL_BATCH_LINES:
+                flush()
+        flush()
+    except BaseException as e:
+        pending.put(e)
+    pending.put(None)
+
 
 def convert_large_json_to_mcap(json_file: str, output_mcap: str, max_messages: int = None):
     """
@@ -26,80 +159,86 @@ def convert_large_json_to_mcap(json_file: str, output_mcap: str, max_messages: i
         print("   Reading JSON file (this may take a while for large files)...")
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                chunk = f.read(10_000_000)
-                
-                if '"messages"' not in chunk and '"metrics"' not in chunk:
-                    print("   File doesn't appear to be MCAP JSON format")
-                    return None
+            # One binary, 1 MiB-buffered handle serves both the format probe
+            # (a peek, which does not consume) and the streaming parse.
+            with open(json_file, 'rb', buffering=READ_CHUNK_SIZE) as f:
+                head = f.peek(PROBE_SIZE)[:PROBE_SIZE]
                 
-                print("   File is very large. Using streaming parser...")
-                
-                try:
-                    import ijson
-                    use_streaming = True
-                except ImportError:
-                    print("   ijson not available. Installing...")
-                    import subprocess
-                    subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-q', 'ijson'])
-                    import ijson
-                    use_streaming = True
+                if _is_jsonl(head):
+                    # One record per line: plain line iteration and loads,
+                    # no incremental parser needed.
+                    print("   Detected JSON Lines. Parsing line by line...")
+                    produce = _produce_jsonl_batches
+                else:
+                    if b'"messages"' not in head and b'"metrics"' not in head:
+                        print("   File doesn't appear to be MCAP JSON format")
+                        return None
+                    
+                    print("   File is very large. Using streaming parser...")
+                    
+                    if ijson is None:
+                        print("   ijson is required to stream single-document JSON logs.")
+                        print("   Install it with: pip install 'ijson[yajl2]'")
+                        return None
+                    produce = _produce_batches
                 
                 messages_count = 0
                 metrics_count = 0
                 
-                with open(json_file, 'rb') as f:
-                    mcap_file = open(output_mcap, 'wb')
-                    writer = Writer(mcap_file)
-                    writer.start()
-                    
-                    markers_channel_id = writer.register_channel(
-                        topic='/visualization_markers',
-                        message_encoding='json',
-                        schema_id=0,
-                        metadata={'description': 'Robot visualization markers'}
-                    )
-                    
-                    metrics_channel_id = writer.register_channel(
-                        topic='/training_metrics',
-                        message_encoding='json',
-                        schema_id=0,
-                        metadata={'description': 'Training metrics'}
+                mcap_file = open(output_mcap, 'wb')
+                writer = Writer(mcap_file)
+                writer.start()
+                
+                markers_channel_id = writer.register_channel(
+                    topic='/visualization_markers',
+                    message_encoding='json',
+                    schema_id=0,
+                    metadata={'description': 'Robot visualization markers'}
+                )
+                
+                metrics_channel_id = writer.register_channel(
+                    topic='/training_metrics',
+                    message_encoding='json',
+                    schema_id=0,
+                    metadata={'description': 'Training metrics'}
+                )
+                
+                # Three stages: a producer thread parses the file, a
+                # thread pool encodes each parsed batch, and this thread
+                # writes the encoded batches in order (Writer is not
+                # thread-safe). The bounded queue keeps memory in check.
+                pending = queue.Queue(maxsize=PIPELINE_DEPTH)
+                
+                with ThreadPoolExecutor(max_workers=ENCODE_WORKERS) as pool:
+                    producer = threading.Thread(
+                        target=produce,
+                        args=(f, pool, pending, markers_channel_id, metrics_channel_id, max_messages),
+                        daemon=True
                     )
+                    producer.start()
                     
-                    print("   Processing messages...")
-                    messages = ijson.items(f, 'messages.item')
-                    for msg in messages:
-                        if max_messages and messages_count >= max_messages:
-                            break
-                        timestamp_ns = int(msg['timestamp'] * 1e9)
-                        data_bytes = json.dumps(msg['data']).encode('utf-8')
-                        writer.add_message(
-                            channel_id=markers_channel_id,
-                            log_time=timestamp_ns,
-                            data=data_bytes,
-                            publish_time=timestamp_ns
-                        )
-                        messages_count += 1
-                        if messages_count % 10000 == 0:
-                            print(f"      Processed {messages_count} messages...")
-                    
-                    print("   Processing metrics...")
-                    f.seek(0)
-                    metrics = ijson.items(f, 'metrics.item')
-                    for metric in metrics:
-                        timestamp_ns = int(metric['timestamp'] * 1e9)
-                        data_bytes = json.dumps(metric).encode('utf-8')
-                        writer.add_message(
-                            channel_id=metrics_channel_id,
-                            log_time=timestamp_ns,
-                            data=data_bytes,
-                            publish_time=timestamp_ns
-                        )
-                        metrics_count += 1
-                    
-                    writer.finish()
-                    mcap_file.close()
+                    print("   Processing messages and metrics...")
+                    while (item := pending.get()) is not None:
+                        if isinstance(item, BaseException):
+                            raise item
+                        channel_id, future = item
+                        for timestamp_ns, data_bytes in future.result():
+                            writer.add_message(
+                                channel_id=channel_id,
+                                log_time=timestamp_ns,
+                                data=data_bytes,
+                                publish_time=timestamp_ns
+                            )
+                            if channel_id == markers_channel_id:
+                                messages_count += 1
+                                if messages_count % 10000 == 0:
+                                    print(f"      Processed {messages_count} messages...")
+                            else:
+                                metrics_count += 1
+                    producer.join()
+                
+                writer.finish()
+                mcap_file.close()
                 
                 file_size_mb = Path(output_mcap).stat().st_size / (1024 * 1024)
                 print(f"Converted to binary MCAP: {output_mcap}")
@@ -108,14 +247,14 @@ def convert_large_json_to_mcap(json_file: str, output_mcap: str, max_messages: i
                 print(f"   File size: {file_size_mb:.2f} MB")
                 
                 return output_mcap
-                
+        
         except Exception as e:
             print(f"   Error during conversion: {e}")
             print("   Trying alternative approach...")
             
             # Alternative: Create a sample MCAP from available data
             return create_sample_mcap_from_available_data(json_file, output_mcap)
-            
+    
     except Exception as e:
         print(f" Error: {e}")
         import traceback
@@ -148,19 +287,29 @@ def create_sample_mcap_from_available_data(json_file: str, output_mcap: str):
             if 'timesteps' in data and 'results' in data:
                 timesteps = data['timesteps']
                 results = data['results']
+                start_time = time.time()
+                
+                # One dict reused for every metric: only values change, so
+                # the keys are never rehashed or the dict resized.
+                metric = {
+                    'step': 0,
+                    'timestamp': 0.0,
+                    'reward': 0.0,
+                    'distance': 0.0,
+                    'success': False,
+                    'episode_length': 0
+                }
                 
                 for i, (ts, result) in enumerate(zip(timesteps, results)):
-                    metric = {
-                        'step': int(ts),
-                        'timestamp': time.time() + i,
-                        'reward': float(result[0]) if len(result) > 0 else 0.0,
-                        'distance': float(result[1]) if len(result) > 1 else 0.0,
-                        'success': bool(result[2]) if len(result) > 2 else False,
-                        'episode_length': int(result[3]) if len(result) > 3 else 0
-                    }
+                    metric['step'] = int(ts)
+                    metric['timestamp'] = start_time + i
+                    metric['reward'] = float(result[0]) if len(result) > 0 else 0.0
+                    metric['distance'] = float(result[1]) if len(result) > 1 else 0.0
+                    metric['success'] = bool(result[2]) if len(result) > 2 else False
+                    metric['episode_length'] = int(result[3]) if len(result) > 3 else 0
                     
                     timestamp_ns = int(metric['timestamp'] * 1e9)
-                    data_bytes = json.dumps(metric).encode('utf-8')
+                    data_bytes = dumps(metric)
                     writer.add_message(
                         channel_id=metrics_channel_id,
                         log_time=timestamp_ns,
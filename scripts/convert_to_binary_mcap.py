@@ -6,6 +6,7 @@ Convert existing JSON MCAP files to proper binary MCAP format for Foxglove Studi
 import sys
 from pathlib import Path
 from mcap_writer import convert_json_to_mcap
+from fast_copy import copy_file
 
 def main():
     print("=" * 60)
@@ -47,8 +48,7 @@ def main():
             if 'deliverables' not in str(mcap_path):
                 deliverables_path = Path('deliverables') / mcap_path.name
                 deliverables_path.parent.mkdir(exist_ok=True)
-                import shutil
-                shutil.copy2(mcap_path, deliverables_path)
+                copy_file(mcap_path, deliverables_path)
                 print(f"   ✅ Also copied to: {deliverables_path}")
     
     print("\n" + "=" * 60)
@@ -6,13 +6,62 @@ This creates two MCAP files:
 2. multi_robot_training.mcap - From multi-robot training logs
 """
 
-import numpy as np
-from pathlib import Path
-from mcap.writer import Writer
 import json
+import os
+import sys
 import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pathlib import Path
+from mcap_writer import open_mcap_writer, MCAP_WRITE_BUFFER_SIZE
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# JSON schemas are constant, so they are encoded once at import
+_METRICS_SCHEMA = dumps({
+    "type": "object",
+    "properties": {
+        "timestep": {"type": "integer"},
+        "mean_reward": {"type": "number"},
+        "std_reward": {"type": "number"},
+        "mean_episode_length": {"type": "number"},
+        "evaluation_index": {"type": "integer"},
+        "mode": {"type": "string"}
+    }
+})
+
+_VIZ_SCHEMA = dumps({
+    "type": "object",
+    "properties": {
+        "type": {"type": "string"},
+        "timestep": {"type": "integer"},
+        "mean_reward": {"type": "number"},
+        "episode": {"type": "integer"},
+        "marker_text": {"type": "string"},
+        "color": {
+            "type": "array",
+            "items": {"type": "number"}
+        }
+    }
+})
+
+# The metric messages repeat the same JSON keys every row, so zstd chunks
+# shrink them well; 1 MiB chunks amortize each chunk header over the few
+# thousand messages an evaluation log holds.
+EVAL_MCAP_CHUNK_SIZE = 1 << 20
+
+# Evaluation marker colours, indexed by mean_reward > 0
+_RED = (1.0, 0.0, 0.0, 1.0)
+_GREEN = (0.0, 1.0, 0.0, 1.0)
+_COLOURS = (_RED, _GREEN)
 
-def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
+def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str, verbose: bool = False):
     """
     Create a binary MCAP file from evaluation logs.
     
@@ -20,6 +69,7 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
         eval_file: Path to evaluations.npz file
         output_mcap: Path to output MCAP file
         mode: 'single' or 'multi' robot mode
+        verbose: Print the available keys and write progress
     """
     print(f"\n{'='*60}")
     print(f"Creating {mode}-robot MCAP file from evaluation logs")
@@ -32,13 +82,15 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
     
     # Load evaluation data
     print(f" Loading evaluation data from {eval_file}...")
-    data = np.load(eval_file, allow_pickle=True)
+    # evaluations.npz holds plain numeric arrays, so skip the pickle path
+    data = np.load(eval_file, allow_pickle=False)
     
-    print(f"   Available keys: {list(data.keys())}")
+    if verbose:
+        print(f"   Available keys: {data.files}")
     
     timesteps = data.get('timesteps', [])
-    results = data.get('results', [])
-    ep_lengths = data.get('ep_lengths', [])
+    results = np.ascontiguousarray(data.get('results', []), dtype=np.float64)
+    ep_lengths = np.ascontiguousarray(data.get('ep_lengths', []), dtype=np.float64)
     
     print(f"   Timesteps: {len(timesteps)}")
     print(f"   Results shape: {results.shape if hasattr(results, 'shape') else len(results)}")
@@ -46,49 +98,14 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
     
     print(f"\n Creating binary MCAP file: {output_mcap}")
     
-    with open(output_mcap, 'wb') as mcap_file:
-        writer = Writer(mcap_file)
+    with open(output_mcap, 'wb', buffering=MCAP_WRITE_BUFFER_SIZE) as mcap_file:
+        writer = open_mcap_writer(mcap_file, chunk_size=EVAL_MCAP_CHUNK_SIZE)
         writer.start()
         
-        # Define JSON schema for training metrics
-        metrics_schema = json.dumps({
-            "type": "object",
-            "properties": {
-                "timestep": {"type": "integer"},
-                "mean_reward": {"type": "number"},
-                "std_reward": {"type": "number"},
-                "mean_episode_length": {"type": "number"},
-                "evaluation_index": {"type": "integer"},
-                "mode": {"type": "string"}
-            }
-        }).encode('utf-8')
-        
         metrics_schema_id = writer.register_schema(
             name='training_metrics',
             encoding='jsonschema',
-            data=metrics_schema
-        )
-        
-        # Define JSON schema for visualization
-        viz_schema = json.dumps({
-            "type": "object",
-            "properties": {
-                "type": {"type": "string"},
-                "timestep": {"type": "integer"},
-                "mean_reward": {"type": "number"},
-                "episode": {"type": "integer"},
-                "marker_text": {"type": "string"},
-                "color": {
-                    "type": "array",
-                    "items": {"type": "number"}
-                }
-            }
-        }).encode('utf-8')
-        
-        viz_schema_id = writer.register_schema(
-            name='episode_visualization',
-            encoding='jsonschema',
-            data=viz_schema
+            data=_METRICS_SCHEMA
         )
         
         metrics_channel_id = writer.register_channel(
@@ -101,41 +118,85 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
             }
         )
         
-        viz_channel_id = writer.register_channel(
-            topic='/episode_visualization',
-            message_encoding='json',
-            schema_id=viz_schema_id,
-            metadata={
-                'description': f'Episode visualization data for {mode} robot',
-                'mode': mode
-            }
-        )
-        
         base_time = eval_path.stat().st_mtime
         
-        print(f"   Writing {len(timesteps)} metric messages...")
+        # Per-evaluation statistics in one reduction each; a 1-D array
+        # (one episode per evaluation) is treated as a single column.
+        if results.ndim == 1:
+            results = results[:, None]
+        if ep_lengths.ndim == 1:
+            ep_lengths = ep_lengths[:, None]
+        mean_rewards = results.mean(axis=1).tolist()
+        std_rewards = results.std(axis=1).tolist()
+        mean_ep_lengths = ep_lengths.mean(axis=1).tolist()
         
-        for i, (ts, result_data, ep_len) in enumerate(zip(timesteps, results, ep_lengths)):
-            if hasattr(result_data, '__len__'):
-                mean_reward = float(np.mean(result_data))
-                std_reward = float(np.std(result_data))
-            else:
-                mean_reward = float(result_data)
-                std_reward = 0.0
-            
-            metric = {
-                'timestep': int(ts),
-                'mean_reward': mean_reward,
-                'std_reward': std_reward,
-                'mean_episode_length': float(np.mean(ep_len)) if hasattr(ep_len, '__len__') else float(ep_len),
-                'evaluation_index': i,
-                'mode': mode
-            }
-            
-            timestamp = base_time + (i * 60)  
-            timestamp_ns = int(timestamp * 1e9)
+        # Encode every payload up front, then the write loop below only
+        # frames messages. Each payload comes from one reused dict whose
+        # fields are updated in place.
+        metric_msg = {
+            'timestep': 0,
+            'mean_reward': 0.0,
+            'std_reward': 0.0,
+            'mean_episode_length': 0.0,
+            'evaluation_index': 0,
+            'mode': mode
+        }
+        metric_payloads = []
+        for i, (ts, mean_reward, std_reward, mean_ep_length) in enumerate(
+                zip(timesteps, mean_rewards, std_rewards, mean_ep_lengths)):
+            metric_msg['timestep'] = int(ts)
+            metric_msg['mean_reward'] = mean_reward
+            metric_msg['std_reward'] = std_reward
+            metric_msg['mean_episode_length'] = mean_ep_length
+            metric_msg['evaluation_index'] = i
+            metric_payloads.append(dumps(metric_msg))
+        num_evals = len(metric_payloads)
+        viz_indices = range(0, num_evals, 10)
+        
+        viz_msg = {
+            'type': 'evaluation_marker',
+            'timestep': 0,
+            'mean_reward': 0.0,
+            'episode': 0,
+            'marker_text': '',
+            'color': None
+        }
+        viz_payloads = []
+        for i in viz_indices:
+            viz_msg['timestep'] = int(timesteps[i])
+            viz_msg['mean_reward'] = mean_rewards[i]
+            viz_msg['episode'] = i
+            viz_msg['marker_text'] = f"Eval {i}: Reward {mean_rewards[i]:.2f}"
+            viz_msg['color'] = _COLOURS[mean_rewards[i] > 0]
+            viz_payloads.append(dumps(viz_msg))
+        
+        # One visualization marker every 10th evaluation; the channel is only
+        # registered when at least one marker will be written
+        if viz_indices:
+            viz_schema_id = writer.register_schema(
+                name='episode_visualization',
+                encoding='jsonschema',
+                data=_VIZ_SCHEMA
+            )
             
-            data_bytes = json.dumps(metric).encode('utf-8')
+            viz_channel_id = writer.register_channel(
+                topic='/episode_visualization',
+                message_encoding='json',
+                schema_id=viz_schema_id,
+                metadata={
+                    'description': f'Episode visualization data for {mode} robot',
+                    'mode': mode
+                }
+            )
+        
+        timestamps_ns = ((base_time + np.arange(num_evals) * 60) * 1e9).astype(np.int64).tolist()
+        
+        print(f"   Writing {num_evals} metric messages...")
+        
+        # Each marker follows its evaluation's metric message, so the file
+        # stays in log_time order
+        viz_iter = iter(viz_payloads)
+        for i, (timestamp_ns, data_bytes) in enumerate(zip(timestamps_ns, metric_payloads)):
             writer.add_message(
                 channel_id=metrics_channel_id,
                 log_time=timestamp_ns,
@@ -144,25 +205,19 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
             )
             
             if i % 10 == 0:
-                viz_data = {
-                    'type': 'evaluation_marker',
-                    'timestep': int(ts),
-                    'mean_reward': mean_reward,
-                    'episode': i,
-                    'marker_text': f"Eval {i}: Reward {mean_reward:.2f}",
-                    'color': [0.0, 1.0, 0.0, 1.0] if mean_reward > 0 else [1.0, 0.0, 0.0, 1.0]
-                }
-                
-                data_bytes = json.dumps(viz_data).encode('utf-8')
                 writer.add_message(
                     channel_id=viz_channel_id,
                     log_time=timestamp_ns,
-                    data=data_bytes,
+                    data=next(viz_iter),
                     publish_time=timestamp_ns
                 )
             
-            if (i + 1) % 100 == 0:
-                print(f"      Processed {i + 1}/{len(timesteps)} evaluations...")
+            if verbose and (i & 255) == 0:
+                sys.stdout.write(f"\r      Processed {i + 1}/{num_evals} evaluations...")
+                sys.stdout.flush()
+        
+        if verbose and num_evals:
+            sys.stdout.write("\n")
         
         writer.finish()
     
@@ -172,7 +227,7 @@ def create_mcap_from_evaluations(eval_file: str, output_mcap: str, mode: str):
     print(f"   Output: {output_mcap}")
     print(f"   Size: {file_size_mb:.2f} MB")
     print(f"   Messages: {len(timesteps)}")
-    print(f"   Channels: 2 (metrics + visualization)")
+    print(f"   Channels: {'2 (metrics + visualization)' if viz_indices else '1 (metrics)'}")
     print(f"\n   This file can now be opened in Foxglove Studio!")
     
     return output_mcap
@@ -41,12 +41,16 @@ def create_visualization_mcap(model_path: str,
         print(f"❌ Error loading model: {e}")
         return None
     
-    print(f"🌍 Creating environment ({num_robots} robot(s))...")
-    env = RobotNavigationEnv(num_robots=num_robots)
-    print("✅ Environment created")
+    # One env per episode, all stepped side by side so every step needs a
+    # single batched model.predict. The envs stay in-process rather than in a
+    # SubprocVecEnv because the markers are built from env.robots.
+    print(f"🌍 Creating {num_episodes} environment(s) ({num_robots} robot(s) each)...")
+    envs = [RobotNavigationEnv(num_robots=num_robots) for _ in range(num_episodes)]
+    print("✅ Environments created")
     
     print(f"📝 Initializing MCAP writer...")
-    mcap_writer = MCAPWriter(output_file)
+    # Streamed: each episode's markers go to disk as soon as it is written
+    mcap_writer = MCAPWriter(output_file, stream=True)
     visualizer = MCAPVisualizer()
     print("✅ MCAP writer ready")
     
@@ -56,61 +60,85 @@ def create_visualization_mcap(model_path: str,
     
     print(f"\n🎬 Starting {num_episodes} evaluation episodes...\n")
     
-    for episode in range(num_episodes):
-        obs, info = env.reset()
-        done = False
-        episode_reward = 0.0
-        episode_steps = 0
-        episode_start_time = time.time()
+    obs = np.stack([env.reset()[0] for env in envs])
+    rewards = [0.0] * num_episodes
+    steps = [0] * num_episodes
+    outcomes = [None] * num_episodes
+    # Marker frames per episode as (episode step, markers), held only until
+    # the episode is written
+    frames = [[] for _ in range(num_episodes)]
+    active = list(range(num_episodes))
+    
+    # Episodes are written back to back on a simulated clock (dt per env
+    # step), so they still play one after another in Foxglove. An episode's
+    # start time depends on the lengths of the ones before it, so each is
+    # written once it and all its predecessors have finished.
+    dt = 0.1
+    clock = time.time()
+    next_episode = 0
+    
+    def write_episode(episode):
+        nonlocal clock, total_steps, successful_episodes
+        for step, markers in frames[episode]:
+            timestamp = clock + step * dt
+            for marker in markers:
+                marker['timestamp'] = timestamp
+            mcap_writer.add_marker_message(markers, timestamp=timestamp)
+        frames[episode] = None
         
-        while not done:
-            action, _ = model.predict(obs, deterministic=True)
+        success, final_distance = outcomes[episode]
+        episode_reward = rewards[episode]
+        episode_steps = steps[episode]
+        total_steps += episode_steps
+        if success:
+            successful_episodes += 1
+        
+        mcap_writer.add_metrics(
+            step=total_steps,
+            reward=episode_reward,
+            distance=final_distance,
+            success=success,
+            episode_length=episode_steps,
+            timestamp=clock + episode_steps * dt
+        )
+        clock += (episode_steps + 1) * dt
+        
+        episode_rewards.append(episode_reward)
+        
+        status = "✅ SUCCESS" if success else "❌ FAILED"
+        print(f"Episode {episode+1:3d}/{num_episodes}: {status} | "
+              f"Reward: {episode_reward:7.2f} | "
+              f"Steps: {episode_steps:3d} | "
+              f"Distance: {final_distance:.2f}m")
+    
+    while active:
+        actions, _ = model.predict(obs[active], deterministic=True)
+        
+        still_running = []
+        for i, action in zip(active, actions):
+            env = envs[i]
+            obs[i], reward, terminated, truncated, info = env.step(action)
+            rewards[i] += reward
+            steps[i] += 1
             
-            obs, reward, terminated, truncated, info = env.step(action)
             done = terminated or truncated
-            episode_reward += reward
-            episode_steps += 1
-            total_steps += 1
             
-            if episode_steps % record_every_n_steps == 0:
-                robots = env.robots
-                targets = env.targets
-                
-                markers = visualizer.create_all_markers(robots, targets, timestamp=time.time())
-                
-                mcap_writer.add_marker_message(markers, timestamp=time.time())
+            # The last step of an episode is always recorded, exactly once
+            if done or steps[i] % record_every_n_steps == 0:
+                frames[i].append((steps[i], visualizer.create_all_markers(env.robots, env.targets, timestamp=0.0)))
             
             if done:
-                success = info.get('success', False)
-                if success:
-                    successful_episodes += 1
-                
-                distances = []
-                for i, robot in enumerate(env.robots):
-                    state = robot.get_state()
-                    target = env.targets[i]
-                    dist = np.sqrt((state.x - target[0])**2 + (state.y - target[1])**2)
-                    distances.append(dist)
-                final_distance = np.mean(distances) if distances else 0.0
-                
-                mcap_writer.add_metrics(
-                    step=total_steps,
-                    reward=episode_reward,
-                    distance=final_distance,
-                    success=success,
-                    episode_length=episode_steps
-                )
-                
-                episode_rewards.append(episode_reward)
-                
-                status = "✅ SUCCESS" if success else "❌ FAILED"
-                print(f"Episode {episode+1:3d}/{num_episodes}: {status} | "
-                      f"Reward: {episode_reward:7.2f} | "
-                      f"Steps: {episode_steps:3d} | "
-                      f"Distance: {final_distance:.2f}m")
+                # The env already holds every robot's target distance from one
+                # vectorized hypot over its struct-of-arrays state
+                final_distance = float(np.mean(info['distances']))
+                outcomes[i] = (info.get('success', False), final_distance)
+            else:
+                still_running.append(i)
+        active = still_running
         
-        markers = visualizer.create_all_markers(env.robots, env.targets, timestamp=time.time())
-        mcap_writer.add_marker_message(markers, timestamp=time.time())
+        while next_episode < num_episodes and outcomes[next_episode] is not None:
+            write_episode(next_episode)
+            next_episode += 1
     
     print(f"\n💾 Saving MCAP file...")
     result = mcap_writer.save()
@@ -0,0 +1,118 @@
+"""
+In-kernel file and directory copies for the deliverable scripts.
+
+copy_file() first tries a reflink (FICLONE), which shares the source's
+extents on CoW filesystems such as btrfs and XFS and copies nothing. Otherwise
+it moves the bytes with os.copy_file_range or os.sendfile, so the data never
+passes through Python buffers, and falls back to shutil.copy2 where neither
+is available.
+"""
+
+import errno
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem pair cannot share extents"
+_NO_REFLINK = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EBADF}
+
+
+# futimens(2) is available on this platform
+_UTIME_FD = os.utime in os.supports_fd
+
+
+def _reflink(in_fd: int, out_fd: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(out_fd, FICLONE, in_fd)
+        return True
+    except OSError as e:
+        if e.errno in _NO_REFLINK:
+            return False
+        raise
+
+
+def _copy_fd(in_fd: int, out_fd: int, size: int) -> bool:
+    """Copy size bytes between fds in the kernel; False if unsupported"""
+    for name in ('copy_file_range', 'sendfile'):
+        kernel_copy = getattr(os, name, None)
+        if kernel_copy is None:
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if name == 'copy_file_range':
+                    n = kernel_copy(in_fd, out_fd, size - copied)
+                else:
+                    n = kernel_copy(out_fd, in_fd, copied, size - copied)
+                if n == 0:
+                    break
+                copied += n
+            return True
+        except OSError:
+            if copied:
+                raise
+            # Not supported for this pair of files (e.g. cross-device on an
+            # older kernel); try the next method
+    return False
+
+
+def copy_file(src, dst):
+    """Copy one file with its permission bits and timestamps, like shutil.copy2
+
+    Metadata goes through the open descriptors: one fstat of the source,
+    then fchmod and futimens on the destination, with no path lookups.
+    """
+    in_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(in_fd)
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, st.st_mode & 0o777)
+        try:
+            copied = _reflink(in_fd, out_fd) or _copy_fd(in_fd, out_fd, st.st_size)
+            if copied:
+                os.fchmod(out_fd, st.st_mode & 0o777)
+                if _UTIME_FD:
+                    os.utime(out_fd, ns=(st.st_atime_ns, st.st_mtime_ns))
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+
+    if not copied:
+        shutil.copy2(src, dst)
+    elif not _UTIME_FD:
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return dst
+
+
+def dir_nonempty(path) -> bool:
+    """Whether path is a directory with at least one entry; reads one entry at most"""
+    try:
+        with os.scandir(path) as entries:
+            return next(entries, None) is not None
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+def copytree(src, dst):
+    """Copy a directory tree into dst (merging into an existing dst) with copy_file"""
+    stack = [(os.fspath(src), os.fspath(dst))]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        os.makedirs(dst_dir, exist_ok=True)
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_dir():
+                    stack.append((entry.path, target))
+                else:
+                    copy_file(entry.path, target)
+    return dst
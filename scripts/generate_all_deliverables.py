@@ -1,12 +1,40 @@
 
 import sys
 import os
-import subprocess
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+def _find_model(name: str):
+    for filename in ("best_model.zip", "final_model.zip"):
+        model = Path("models") / name / filename
+        if model.is_file():
+            return model
+    return None
+
+
+def _generate_metrics_plots(deliverables_dir: Path):
+    from scripts.generate_metrics_plots import plot_from_evaluations
+    
+    results = []
+    for mode in ("single", "multi"):
+        eval_file = Path("logs") / f"{mode}_robot" / "evaluations.npz"
+        if eval_file.is_file():
+            results.append(plot_from_evaluations(
+                str(eval_file), str(deliverables_dir / f"{mode}_robot_metrics.png"), mode, dpi=150))
+        else:
+            print(f" {mode.capitalize()} robot evaluation file not found: {eval_file}")
+    # Successful only if at least one plot was written
+    return any(results)
+
+
+def _create_visualization_mcap(**kwargs):
+    from scripts.create_visualization_mcap import create_visualization_mcap
+    
+    return create_visualization_mcap(**kwargs)
+
+
 def main():
     print("=" * 70)
     print("Generating All Deliverables")
@@ -24,82 +52,60 @@ def main():
     
     scripts_dir = Path("scripts")
     
-    print("📊 Step 1: Generating metrics plots...")
-    print("-" * 70)
-    try:
-        result = subprocess.run(
-            [sys.executable, str(scripts_dir / "generate_metrics_plots.py")],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            print(result.stdout)
-            print("✅ Metrics plots generated successfully")
-        else:
-            print("⚠️  Error generating metrics plots:")
-            print(result.stderr)
-    except Exception as e:
-        print(f"⚠️  Error running metrics plot script: {e}")
-    print()
-    
-    print("🤖 Step 2: Creating single robot visualization MCAP...")
-    print("-" * 70)
-    single_model = Path("models/single_robot/best_model.zip")
-    if not single_model.exists():
-        single_model = Path("models/single_robot/final_model.zip")
-    
-    if single_model.exists():
-        try:
-            result = subprocess.run(
-                [sys.executable, str(scripts_dir / "create_visualization_mcap.py"),
-                 "--mode", "single",
-                 "--model", str(single_model),
-                 "--output", str(deliverables_dir / "single_robot_training_with_viz.mcap"),
-                 "--episodes", "20"],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                print(result.stdout)
-                print("✅ Single robot visualization MCAP created")
-            else:
-                print("⚠️  Error creating single robot MCAP:")
-                print(result.stderr)
-        except Exception as e:
-            print(f"⚠️  Error running visualization script: {e}")
-    else:
-        print(f"⚠️  Single robot model not found: {single_model}")
-    print()
+    # Resolve each model once: best checkpoint if present, else the final one
+    single_model = _find_model("single_robot")
+    multi_model = _find_model("multi_robot")
     
-    print("🤖🤖🤖 Step 3: Creating multi robot visualization MCAP...")
-    print("-" * 70)
-    multi_model = Path("models/multi_robot/best_model.zip")
-    if not multi_model.exists():
-        multi_model = Path("models/multi_robot/final_model.zip")
+    # (header, success message, error message, (function, kwargs) or None if skipped)
+    steps = [
+        ("📊 Step 1: Generating metrics plots...",
+         "✅ Metrics plots generated successfully",
+         "⚠️  Error generating metrics plots:",
+         (_generate_metrics_plots, dict(deliverables_dir=deliverables_dir))),
+        ("🤖 Step 2: Creating single robot visualization MCAP...",
+         "✅ Single robot visualization MCAP created",
+         "⚠️  Error creating single robot MCAP:",
+         (_create_visualization_mcap, dict(
+             model_path=str(single_model),
+             output_file=str(deliverables_dir / "single_robot_training_with_viz.mcap"),
+             mode="single",
+             num_episodes=20,
+             num_robots=1)) if single_model else None),
+        ("🤖🤖🤖 Step 3: Creating multi robot visualization MCAP...",
+         "✅ Multi robot visualization MCAP created",
+         "⚠️  Error creating multi robot MCAP:",
+         (_create_visualization_mcap, dict(
+             model_path=str(multi_model),
+             output_file=str(deliverables_dir / "multi_robot_training_with_viz.mcap"),
+             mode="multi",
+             num_episodes=15,
+             num_robots=3)) if multi_model else None),
+    ]
+    missing = [
+        None,
+        "⚠️  Single robot model not found: models/single_robot/final_model.zip",
+        "⚠️  Multi robot model not found: models/multi_robot/final_model.zip",
+    ]
     
-    if multi_model.exists():
-        try:
-            result = subprocess.run(
-                [sys.executable, str(scripts_dir / "create_visualization_mcap.py"),
-                 "--mode", "multi",
-                 "--model", str(multi_model),
-                 "--output", str(deliverables_dir / "multi_robot_training_with_viz.mcap"),
-                 "--episodes", "15",
-                 "--num_robots", "3"],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                print(result.stdout)
-                print("✅ Multi robot visualization MCAP created")
+    # Each step runs in this interpreter (sharing its numpy/matplotlib/torch
+    # imports) instead of a fresh Python process, one after another so
+    # their output stays in order
+    for i, (header, ok_message, error_message, call) in enumerate(steps):
+        print(header)
+        print("-" * 70)
+        if call is None:
+            print(missing[i])
+        else:
+            func, kwargs = call
+            try:
+                result = func(**kwargs)
+            except (Exception, SystemExit) as e:
+                # A failing (or exiting) step doesn't stop the others
+                script = "metrics plot" if i == 0 else "visualization"
+                print(f"⚠️  Error running {script} script: {e}")
             else:
-                print("⚠️  Error creating multi robot MCAP:")
-                print(result.stderr)
-        except Exception as e:
-            print(f"⚠️  Error running visualization script: {e}")
-    else:
-        print(f"⚠️  Multi robot model not found: {multi_model}")
-    print()
+                print(ok_message if result else error_message)
+        print()
     
     print("=" * 70)
     print("Summary")
@@ -115,14 +121,14 @@ def main():
     if multi_plot.exists():
         deliverables.append(("Multi Robot Metrics Plot", multi_plot))
     
-    single_viz_mcap = deliverables_dir / "single_robot_training_with_viz.mcap"
-    multi_viz_mcap = deliverables_dir / "multi_robot_training_with_viz.mcap"
-    if single_viz_mcap.exists():
-        size_mb = single_viz_mcap.stat().st_size / (1024 * 1024)
-        deliverables.append(("Single Robot Visualization MCAP", single_viz_mcap, f"{size_mb:.2f} MB"))
-    if multi_viz_mcap.exists():
-        size_mb = multi_viz_mcap.stat().st_size / (1024 * 1024)
-        deliverables.append(("Multi Robot Visualization MCAP", multi_viz_mcap, f"{size_mb:.2f} MB"))
+    for name, filename in (("Single Robot Visualization MCAP", "single_robot_training_with_viz.mcap"),
+                           ("Multi Robot Visualization MCAP", "multi_robot_training_with_viz.mcap")):
+        viz_mcap = deliverables_dir / filename
+        try:
+            size_mb = viz_mcap.stat().st_size / (1024 * 1024)
+        except FileNotFoundError:
+            continue
+        deliverables.append((name, viz_mcap, f"{size_mb:.2f} MB"))
     
     if deliverables:
         print("✅ Generated deliverables:")
@@ -1,11 +1,19 @@
 
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from pathlib import Path
 import argparse
 
 
-def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"):
+def _moving_avg(x, window: int) -> np.ndarray:
+    # Same values as a 'valid' np.convolve with a box kernel, in O(N)
+    c = np.concatenate(([0.0], np.cumsum(np.asarray(x, dtype=np.float64))))
+    return (c[window:] - c[:-window]) / window
+
+
+def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single", dpi: int = 150):
     print(f"\n{'='*60}")
     print(f"Generating metrics plots for {mode}-robot training")
     print(f"{'='*60}")
@@ -16,34 +24,31 @@ def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"
         return None
     
     print(f" Loading evaluation data from {eval_file}...")
-    data = np.load(eval_file, allow_pickle=True)
+    # evaluations.npz holds plain numeric arrays, so skip the pickle path
+    data = np.load(eval_file, allow_pickle=False)
     
-    timesteps = data.get('timesteps', [])
-    results = data.get('results', [])
-    ep_lengths = data.get('ep_lengths', [])
+    timesteps = np.asarray(data.get('timesteps', []))
+    results = np.ascontiguousarray(data.get('results', []), dtype=np.float64)
+    ep_lengths = np.ascontiguousarray(data.get('ep_lengths', []), dtype=np.float64)
     
     print(f"   Found {len(timesteps)} evaluation checkpoints")
     
-    if hasattr(results, '__len__') and len(results) > 0:
-        if hasattr(results[0], '__len__'):
-            mean_rewards = [float(np.mean(r)) for r in results]
-            std_rewards = [float(np.std(r)) for r in results]
-        else:
-            mean_rewards = [float(r) for r in results]
-            std_rewards = [0.0] * len(results)
+    if len(results) > 0:
+        # One reduction per statistic; 1-D results are a single column
+        if results.ndim == 1:
+            results = results[:, None]
+        mean_rewards = results.mean(axis=1)
+        std_rewards = results.std(axis=1)
     else:
         print(" No results data found")
         return None
     
-    if hasattr(ep_lengths, '__len__') and len(ep_lengths) > 0:
-        if hasattr(ep_lengths[0], '__len__'):
-            mean_ep_lengths = [float(np.mean(e)) for e in ep_lengths]
-        else:
-            mean_ep_lengths = [float(e) for e in ep_lengths]
+    if len(ep_lengths) > 0:
+        mean_ep_lengths = ep_lengths.mean(axis=1) if ep_lengths.ndim > 1 else ep_lengths
     else:
-        mean_ep_lengths = [0.0] * len(timesteps)
+        mean_ep_lengths = np.zeros(len(timesteps))
     
-    success_rate = [1.0 if r > 0 else 0.0 for r in mean_rewards]
+    success_rate = (mean_rewards > 0).astype(np.float64)
     
     print(f" Creating plots...")
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
@@ -52,14 +57,14 @@ def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"
     axes[0, 0].plot(timesteps, mean_rewards, 'b-', alpha=0.6, linewidth=1.5, label='Mean Reward')
     if len(mean_rewards) > 1:
         axes[0, 0].fill_between(timesteps, 
-                               np.array(mean_rewards) - np.array(std_rewards),
-                               np.array(mean_rewards) + np.array(std_rewards),
+                               mean_rewards - std_rewards,
+                               mean_rewards + std_rewards,
                                alpha=0.2, color='blue', label='±1 Std Dev')
     
     if len(mean_rewards) > 10:
         window = min(20, len(mean_rewards) // 5)
         if window > 1:
-            moving_avg = np.convolve(mean_rewards, np.ones(window)/window, mode='valid')
+            moving_avg = _moving_avg(mean_rewards, window)
             moving_avg_steps = timesteps[window-1:]
             axes[0, 0].plot(moving_avg_steps, moving_avg, 'r-', linewidth=2.5, 
                            label=f'Moving Avg (window={window})')
@@ -73,7 +78,7 @@ def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"
     if len(success_rate) > 10:
         window = min(20, len(success_rate) // 5)
         if window > 1:
-            success_moving_avg = np.convolve(success_rate, np.ones(window)/window, mode='valid')
+            success_moving_avg = _moving_avg(success_rate, window)
             success_steps = timesteps[window-1:]
             axes[0, 1].plot(success_steps, success_moving_avg, 'g-', linewidth=2.5, 
                            label=f'Success Rate (window={window})')
@@ -95,7 +100,7 @@ def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"
     if len(mean_ep_lengths) > 10:
         window = min(20, len(mean_ep_lengths) // 5)
         if window > 1:
-            ep_moving_avg = np.convolve(mean_ep_lengths, np.ones(window)/window, mode='valid')
+            ep_moving_avg = _moving_avg(mean_ep_lengths, window)
             ep_steps = timesteps[window-1:]
             axes[1, 0].plot(ep_steps, ep_moving_avg, 'r-', linewidth=2.5, 
                            label=f'Moving Avg (window={window})')
@@ -106,30 +111,35 @@ def plot_from_evaluations(eval_file: str, output_file: str, mode: str = "single"
     axes[1, 0].legend()
     axes[1, 0].grid(True, alpha=0.3)
     
-    axes[1, 1].hist(mean_rewards, bins=min(30, len(mean_rewards)//2), 
+    # Bin once with np.histogram and draw the bars directly
+    counts, edges = np.histogram(mean_rewards, bins=min(30, max(1, len(mean_rewards)//2)))
+    axes[1, 1].bar(edges[:-1], counts, width=np.diff(edges), align='edge',
                    color='skyblue', edgecolor='black', alpha=0.7)
-    axes[1, 1].axvline(x=np.mean(mean_rewards), color='r', linestyle='--', 
-                      linewidth=2, label=f'Mean: {np.mean(mean_rewards):.2f}')
-    axes[1, 1].axvline(x=np.median(mean_rewards), color='g', linestyle='--', 
-                      linewidth=2, label=f'Median: {np.median(mean_rewards):.2f}')
+    mean_val = mean_rewards.mean()
+    median_val = np.median(mean_rewards)
+    axes[1, 1].axvline(x=mean_val, color='r', linestyle='--', 
+                      linewidth=2, label=f'Mean: {mean_val:.2f}')
+    axes[1, 1].axvline(x=median_val, color='g', linestyle='--', 
+                      linewidth=2, label=f'Median: {median_val:.2f}')
     axes[1, 1].set_xlabel('Episode Reward', fontsize=11)
     axes[1, 1].set_ylabel('Frequency', fontsize=11)
     axes[1, 1].set_title('Reward Distribution', fontsize=12, fontweight='bold')
     axes[1, 1].legend()
     axes[1, 1].grid(True, alpha=0.3, axis='y')
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    fig.savefig(output_file, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
     print(f"✅ Plot saved to: {output_file}")
     
     print(f"\n Summary Statistics:")
     print(f"   Total evaluations: {len(timesteps)}")
     print(f"   Final mean reward: {mean_rewards[-1]:.2f} ± {std_rewards[-1]:.2f}")
-    print(f"   Best mean reward: {max(mean_rewards):.2f}")
-    print(f"   Final success rate: {np.mean(success_rate[-10:]):.1%}")
+    print(f"   Best mean reward: {mean_rewards.max():.2f}")
+    print(f"   Final success rate: {success_rate[-10:].mean():.1%}")
     print(f"   Final mean episode length: {mean_ep_lengths[-1]:.1f} steps")
     
     return output_file
@@ -143,6 +153,8 @@ def main():
                        help="Path to multi robot evaluation file")
     parser.add_argument("--output_dir", type=str, default="deliverables",
                        help="Output directory for plots")
+    parser.add_argument("--dpi", type=int, default=150,
+                       help="Output resolution (pass 100 for quicker draft plots)")
     
     args = parser.parse_args()
     
@@ -153,7 +165,7 @@ def main():
     
     if Path(args.single).exists():
         output = output_dir / "single_robot_metrics.png"
-        result = plot_from_evaluations(args.single, str(output), "single")
+        result = plot_from_evaluations(args.single, str(output), "single", args.dpi)
         if result:
             generated_plots.append(result)
     else:
@@ -161,7 +173,7 @@ def main():
     
     if Path(args.multi).exists():
         output = output_dir / "multi_robot_metrics.png"
-        result = plot_from_evaluations(args.multi, str(output), "multi")
+        result = plot_from_evaluations(args.multi, str(output), "multi", args.dpi)
         if result:
             generated_plots.append(result)
     else:
@@ -107,13 +107,15 @@ def create_visualization_mcap(model_path: str,
                     episode_steps += 1
                     total_steps += 1
                     
-                    # Record visualization markers
-                    if episode_steps % record_every_n_steps == 0:
+                    # Record visualization markers; the last step of an
+                    # episode is always recorded, exactly once
+                    if done or episode_steps % record_every_n_steps == 0:
                         robots = env.robots
                         targets = env.targets
                         
-                        markers = visualizer.create_all_markers(robots, targets, timestamp=time.time())
-                        mcap_writer.add_marker_message(markers, timestamp=time.time())
+                        now = time.time()
+                        markers = visualizer.create_all_markers(robots, targets, timestamp=now)
+                        mcap_writer.add_marker_message(markers, timestamp=now)
                     
                     if done:
                         success = info.get('success', False)
@@ -148,13 +150,6 @@ def create_visualization_mcap(model_path: str,
                     import traceback
                     traceback.print_exc()
                     break
-            
-            # Record final state
-            try:
-                markers = visualizer.create_all_markers(env.robots, env.targets, timestamp=time.time())
-                mcap_writer.add_marker_message(markers, timestamp=time.time())
-            except Exception as e:
-                print(f"⚠️  Warning: Could not record final markers: {e}")
         
         print(f"\n💾 Saving MCAP file...")
         result = mcap_writer.save()
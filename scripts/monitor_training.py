@@ -3,17 +3,90 @@
 Monitor multi-robot training progress and organize deliverables when complete
 """
 
+import os
+import select
+import selectors
 import time
 import subprocess
 import sys
 from pathlib import Path
-import shutil
+from fast_copy import copy_file, copytree, dir_nonempty
 import json
 
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# Seconds between checks when nothing can wake the monitor earlier, and the
+# upper bound on a wait when inotify/pidfd events are available
+POLL_INTERVAL = 3.0
+EVENT_WAIT_TIMEOUT = 30.0
+STATUS_REPORT_INTERVAL = 30.0
+
+def _is_train_process(pid) -> bool:
+    """Whether /proc/<pid>/cmdline matches `pgrep -f "train.py.*multi"`"""
+    try:
+        fd = os.open(f'/proc/{pid}/cmdline', os.O_RDONLY)
+    except OSError:
+        # Process exited or is not ours to read
+        return False
+    try:
+        cmdline = os.read(fd, 4096)
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+    start = cmdline.find(b'train.py')
+    return start >= 0 and cmdline.find(b'multi', start + 8) >= 0
+
+def _find_train_pid():
+    """Return the pid of a running multi-robot train.py, or None"""
+    own_pid = os.getpid()
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit() or int(entry.name) == own_pid:
+                continue
+            if _is_train_process(entry.name):
+                return int(entry.name)
+    return None
+
+# Last matching training pid and, where pidfd_open exists, a pidfd for it.
+# While it is alive each poll is one zero-timeout select on the pidfd (or
+# one cmdline read without pidfds) instead of a full /proc scan.
+_train_pid = None
+_train_pidfd = None
+
+def _train_pid_alive() -> bool:
+    if _train_pidfd is not None:
+        # A pidfd becomes readable once its process exits
+        readable, _, _ = select.select([_train_pidfd], [], [], 0)
+        return not readable
+    return _is_train_process(_train_pid)
+
+def _set_train_pid(pid):
+    global _train_pid, _train_pidfd
+    if _train_pidfd is not None:
+        os.close(_train_pidfd)
+        _train_pidfd = None
+    _train_pid = pid
+    if pid is not None and hasattr(os, 'pidfd_open'):
+        try:
+            _train_pidfd = os.pidfd_open(pid)
+        except OSError:
+            pass
+
 def check_training_status():
     """Check if training process is still running"""
+    if os.path.isdir('/proc'):
+        try:
+            if _train_pid is None or not _train_pid_alive():
+                _set_train_pid(_find_train_pid())
+            return _train_pid is not None
+        except OSError:
+            pass
     try:
-        # Check for Python processes running train.py
+        # No procfs (e.g. macOS): ask pgrep instead
         result = subprocess.run(
             ["pgrep", "-f", "train.py.*multi"],
             capture_output=True,
@@ -23,27 +96,116 @@ def check_training_status():
     except:
         return False
 
+class _ChangeWaiter:
+    """Sleeps until a watched path changes or the training process exits.
+
+    File events come from inotify (when inotify_simple is installed and usable) on the
+    working directory and logs/multi_robot; process exit comes from a pidfd
+    on the tracked training pid. Without either, it falls back to sleeping
+    POLL_INTERVAL seconds.
+    """
+    
+    _WATCH_DIRS = ('.', 'logs/multi_robot')
+    
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._inotify = None
+        self._watched = set()
+        self._pid = None
+        self._pidfd = None
+        if INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._selector.register(self._inotify, selectors.EVENT_READ)
+            except (OSError, AttributeError):
+                # AttributeError: no inotify in this libc (not Linux);
+                # OSError: out of inotify instances or file descriptors
+                self._drop_inotify()
+            self._add_watches()
+    
+    def _drop_inotify(self):
+        # Back to polling every POLL_INTERVAL
+        if self._inotify is not None:
+            try:
+                self._selector.unregister(self._inotify)
+            except KeyError:
+                pass
+            self._inotify.close()
+            self._inotify = None
+    
+    def _add_watches(self):
+        if self._inotify is None:
+            return
+        mask = inotify_flags.CREATE | inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+        for path in self._WATCH_DIRS:
+            if path not in self._watched and os.path.isdir(path):
+                try:
+                    self._inotify.add_watch(path, mask)
+                except OSError:
+                    # Watch limit reached (ENOSPC) or the directory went away
+                    self._drop_inotify()
+                    return
+                self._watched.add(path)
+    
+    def track(self, pid):
+        """Wake on exit of pid (None stops tracking)"""
+        if pid == self._pid:
+            return
+        if self._pidfd is not None:
+            self._selector.unregister(self._pidfd)
+            os.close(self._pidfd)
+            self._pidfd = None
+        self._pid = pid
+        if pid is not None and hasattr(os, 'pidfd_open'):
+            try:
+                self._pidfd = os.pidfd_open(pid)
+            except OSError:
+                return
+            self._selector.register(self._pidfd, selectors.EVENT_READ)
+    
+    def wait(self):
+        if self._inotify is None and self._pidfd is None:
+            time.sleep(POLL_INTERVAL)
+            return
+        timeout = EVENT_WAIT_TIMEOUT if self._inotify is not None else POLL_INTERVAL
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._inotify:
+                self._inotify.read(timeout=0)
+        # logs/multi_robot may only appear once training starts logging
+        self._add_watches()
+    
+    def close(self):
+        self.track(None)
+        self._drop_inotify()
+        self._selector.close()
+
+_WATCHED_FILES = {
+    'mcap_json': 'multi_robot_training.mcap.json',
+    'episodes': 'multi_robot_training.mcap_episodes.json',
+    'metrics': 'multi_robot_training.mcap_metrics.json',
+    'logs': 'logs/multi_robot/evaluations.npz'
+}
+
 def check_mcap_files():
-    """Check if MCAP files have been created"""
-    files = {
-        'mcap_json': Path('multi_robot_training.mcap.json'),
-        'episodes': Path('multi_robot_training.mcap_episodes.json'),
-        'metrics': Path('multi_robot_training.mcap_metrics.json'),
-        'logs': Path('logs/multi_robot/evaluations.npz')
-    }
+    """Check if MCAP files have been created.
     
+    Maps each watched file to (st_size, st_mtime_ns), or None while it does
+    not exist, so successive results compare as plain int tuples.
+    """
     status = {}
-    for name, path in files.items():
-        status[name] = path.exists()
-        if path.exists():
-            try:
-                size_mb = path.stat().st_size / (1024 * 1024)
-                status[f'{name}_size'] = size_mb
-            except:
-                status[f'{name}_size'] = 0
+    for name, path in _WATCHED_FILES.items():
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            status[name] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            status[name] = None
     
     return status
 
+def _size_mb(file_status, name):
+    entry = file_status.get(name)
+    return entry[0] / (1024 * 1024) if entry else 0.0
+
 def organize_multi_robot_deliverables():
     """Organize multi-robot training deliverables"""
     print("\n" + "=" * 60)
@@ -59,7 +221,7 @@ def organize_multi_robot_deliverables():
         dest = deliverables_dir / 'multi_robot_training.mcap.json'
         print(f"\n📦 Copying MCAP file...")
         try:
-            shutil.copy2(mcap_file, dest)
+            copy_file(mcap_file, dest)
             size_mb = mcap_file.stat().st_size / (1024 * 1024)
             print(f"✅ Copied multi-robot MCAP: {dest.name} ({size_mb:.2f} MB)")
         except Exception as e:
@@ -74,7 +236,7 @@ def organize_multi_robot_deliverables():
     if episodes_file.exists():
         dest = deliverables_dir / 'multi_robot_episodes.json'
         try:
-            shutil.copy2(episodes_file, dest)
+            copy_file(episodes_file, dest)
             print(f"✅ Copied episodes data: {dest.name}")
         except Exception as e:
             print(f"⚠️  Error copying episodes: {e}")
@@ -82,7 +244,7 @@ def organize_multi_robot_deliverables():
     if metrics_file.exists():
         dest = deliverables_dir / 'multi_robot_metrics.json'
         try:
-            shutil.copy2(metrics_file, dest)
+            copy_file(metrics_file, dest)
             print(f"✅ Copied metrics data: {dest.name}")
         except Exception as e:
             print(f"⚠️  Error copying metrics: {e}")
@@ -92,10 +254,10 @@ def organize_multi_robot_deliverables():
     logs_dir.mkdir(exist_ok=True)
     
     multi_logs = Path('logs/multi_robot')
-    if multi_logs.exists() and len(list(multi_logs.iterdir())) > 0:
+    if dir_nonempty(multi_logs):
         dest = logs_dir / 'multi_robot'
         try:
-            shutil.copytree(multi_logs, dest, dirs_exist_ok=True)
+            copytree(multi_logs, dest)
             print(f"✅ Copied multi-robot logs to {dest}")
         except Exception as e:
             print(f"⚠️  Error copying logs: {e}")
@@ -115,11 +277,14 @@ def update_deliverables_readme(deliverables_dir):
         return
     
     try:
-        with open(readme_path, 'r') as f:
+        # One handle for the read and, only if needed, the rewrite
+        with open(readme_path, 'r+') as f:
             content = f.read()
-        
-        # Check if multi-robot section needs updating
-        if 'Multi-robot MCAP' in content and 'Not available' in content:
+            
+            # Check if multi-robot section needs updating
+            if 'Multi-robot MCAP' not in content or 'Not available' not in content:
+                return
+            
             # Update the multi-robot section
             new_section = """- **`multi_robot_training.mcap.json`** - This is the MCAP recording from the multi-robot training with 3 robots learning collision avoidance. Similar to the single-robot file, it contains detailed visualization markers showing how all three robots moved, avoided collisions, and learned to navigate to their targets simultaneously. The file shows the learning progress as the robots improved their coordination and collision avoidance skills."""
             
@@ -135,8 +300,9 @@ def update_deliverables_readme(deliverables_dir):
                 "- **`logs/multi_robot/`** - Multi-robot evaluation logs from the training sessions."
             )
             
-            with open(readme_path, 'w') as f:
-                f.write(content)
+            f.seek(0)
+            f.write(content)
+            f.truncate()
             print("✅ Updated deliverables README")
     except Exception as e:
         print(f"⚠️  Could not update README: {e}")
@@ -150,21 +316,24 @@ def main():
     
     last_status = {}
     check_count = 0
+    last_report = time.monotonic()
+    waiter = _ChangeWaiter()
     
     try:
         while True:
             check_count += 1
             is_running = check_training_status()
+            waiter.track(_train_pid if is_running else None)
             file_status = check_mcap_files()
             
-            # Print status every 10 checks (about every 30 seconds)
-            if check_count % 10 == 0:
+            # Print status about every 30 seconds
+            if time.monotonic() - last_report >= STATUS_REPORT_INTERVAL:
+                last_report = time.monotonic()
                 print(f"\n[{time.strftime('%H:%M:%S')}] Status check #{check_count}")
                 print(f"  Training running: {'Yes' if is_running else 'No'}")
                 
                 if file_status.get('mcap_json'):
-                    size = file_status.get('mcap_json_size', 0)
-                    print(f"  MCAP file: {size:.2f} MB")
+                    print(f"  MCAP file: {_size_mb(file_status, 'mcap_json'):.2f} MB")
                 else:
                     print(f"  MCAP file: Not created yet")
                 
@@ -185,12 +354,13 @@ def main():
             # Check if files changed
             if file_status != last_status:
                 if file_status.get('mcap_json') and not last_status.get('mcap_json'):
-                    print(f"\n✅ MCAP file created! ({file_status.get('mcap_json_size', 0):.2f} MB)")
+                    print(f"\n✅ MCAP file created! ({_size_mb(file_status, 'mcap_json'):.2f} MB)")
                 if file_status.get('logs') and not last_status.get('logs'):
                     print(f"✅ Logs created!")
             
             last_status = file_status
-            time.sleep(3)  # Check every 3 seconds
+            # Block until a file event, training exit or the poll timeout
+            waiter.wait()
             
     except KeyboardInterrupt:
         print("\n\nMonitoring stopped by user.")
@@ -201,6 +371,8 @@ def main():
         if file_status.get('mcap_json') or file_status.get('logs'):
             print("\nOrganizing available deliverables...")
             organize_multi_robot_deliverables()
+    finally:
+        waiter.close()
 
 if __name__ == "__main__":
     main()
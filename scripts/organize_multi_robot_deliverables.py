@@ -3,10 +3,21 @@
 Organize multi-robot training deliverables after training completes
 """
 
-import shutil
+import os
+import re
+from fast_copy import copy_file, copytree, dir_nonempty
 from pathlib import Path
 import json
 
+# README placeholder text swapped out once multi-robot results exist
+_MCAP_RE = re.compile(
+    r'- \*\*Multi-robot MCAP\*\*.*?\(multi-robot training not completed\)', re.DOTALL)
+
+_MCAP_SECTION = """- **`multi_robot_training.mcap.json`** - This is the MCAP recording from the multi-robot training with 3 robots learning collision avoidance. Similar to the single-robot file, it contains detailed visualization markers showing how all three robots moved, avoided collisions, and learned to navigate to their targets simultaneously. The file shows the learning progress as the robots improved their coordination and collision avoidance skills over the training episodes."""
+
+_LOGS_PLACEHOLDER = "- **`logs/multi_robot/`** - Unfortunately, I don't have multi-robot training logs here. It looks like the multi-robot training either wasn't completed or wasn't run with logging enabled. I can generate these if needed."
+_LOGS_SECTION = "- **`logs/multi_robot/`** - Multi-robot evaluation logs from the training sessions. These contain the evaluation metrics tracked during training, showing how the multi-robot system improved over time."
+
 def organize_deliverables():
     """Organize multi-robot training deliverables"""
     print("=" * 60)
@@ -22,7 +33,7 @@ def organize_deliverables():
         dest = deliverables_dir / 'multi_robot_training.mcap.json'
         print(f"\n📦 Copying MCAP file...")
         try:
-            shutil.copy2(mcap_file, dest)
+            copy_file(mcap_file, dest)
             size_mb = mcap_file.stat().st_size / (1024 * 1024)
             print(f"✅ Copied multi-robot MCAP: {dest.name} ({size_mb:.2f} MB)")
         except Exception as e:
@@ -38,7 +49,7 @@ def organize_deliverables():
     if episodes_file.exists():
         dest = deliverables_dir / 'multi_robot_episodes.json'
         try:
-            shutil.copy2(episodes_file, dest)
+            copy_file(episodes_file, dest)
             size_mb = episodes_file.stat().st_size / (1024 * 1024)
             print(f"✅ Copied episodes data: {dest.name} ({size_mb:.2f} MB)")
         except Exception as e:
@@ -47,7 +58,7 @@ def organize_deliverables():
     if metrics_file.exists():
         dest = deliverables_dir / 'multi_robot_metrics.json'
         try:
-            shutil.copy2(metrics_file, dest)
+            copy_file(metrics_file, dest)
             print(f"✅ Copied metrics data: {dest.name}")
         except Exception as e:
             print(f"⚠️  Error copying metrics: {e}")
@@ -57,16 +68,17 @@ def organize_deliverables():
     logs_dir.mkdir(exist_ok=True)
     
     multi_logs = Path('logs/multi_robot')
-    if multi_logs.exists() and len(list(multi_logs.iterdir())) > 0:
+    if dir_nonempty(multi_logs):
         dest = logs_dir / 'multi_robot'
         try:
-            shutil.copytree(multi_logs, dest, dirs_exist_ok=True)
+            copytree(multi_logs, dest)
             print(f"✅ Copied multi-robot logs to {dest}")
             # List what was copied
-            for f in dest.iterdir():
-                if f.is_file():
-                    size = f.stat().st_size / (1024 * 1024) if f.stat().st_size > 0 else 0
-                    print(f"   - {f.name} ({size:.2f} MB)")
+            with os.scandir(dest) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        size = entry.stat().st_size / (1024 * 1024)
+                        print(f"   - {entry.name} ({size:.2f} MB)")
         except Exception as e:
             print(f"⚠️  Error copying logs: {e}")
     else:
@@ -88,34 +100,32 @@ def update_deliverables_readme(deliverables_dir):
         print("⚠️  README not found, skipping update")
         return
     
+    # Check if we need to update multi-robot section
+    has_mcap = Path('multi_robot_training.mcap.json').exists()
+    has_logs = dir_nonempty('logs/multi_robot')
+    if not (has_mcap or has_logs):
+        return
+    
     try:
-        with open(readme_path, 'r') as f:
+        # One handle for the read and, only if something changed, the rewrite
+        with open(readme_path, 'r+') as f:
             content = f.read()
-        
-        # Check if we need to update multi-robot section
-        has_mcap = Path('multi_robot_training.mcap.json').exists()
-        has_logs = Path('logs/multi_robot').exists() and len(list(Path('logs/multi_robot').iterdir())) > 0
-        
-        if has_mcap or has_logs:
+            updated = content
+            
             # Update multi-robot MCAP section
-            if 'Multi-robot MCAP** - I don\'t have' in content or 'Multi-robot MCAP** - Not available' in content:
-                new_section = """- **`multi_robot_training.mcap.json`** - This is the MCAP recording from the multi-robot training with 3 robots learning collision avoidance. Similar to the single-robot file, it contains detailed visualization markers showing how all three robots moved, avoided collisions, and learned to navigate to their targets simultaneously. The file shows the learning progress as the robots improved their coordination and collision avoidance skills over the training episodes."""
-                
+            if 'Multi-robot MCAP** - I don\'t have' in updated or 'Multi-robot MCAP** - Not available' in updated:
                 # Find and replace the multi-robot MCAP section
-                import re
-                pattern = r'- \*\*Multi-robot MCAP\*\*.*?\(multi-robot training not completed\)'
-                content = re.sub(pattern, new_section, content, flags=re.DOTALL)
+                updated = _MCAP_RE.sub(_MCAP_SECTION, updated)
             
             # Update multi-robot logs section
-            if 'logs/multi_robot/** - Unfortunately, I don\'t have' in content:
-                content = content.replace(
-                    "- **`logs/multi_robot/`** - Unfortunately, I don't have multi-robot training logs here. It looks like the multi-robot training either wasn't completed or wasn't run with logging enabled. I can generate these if needed.",
-                    "- **`logs/multi_robot/`** - Multi-robot evaluation logs from the training sessions. These contain the evaluation metrics tracked during training, showing how the multi-robot system improved over time."
-                )
+            if 'logs/multi_robot/** - Unfortunately, I don\'t have' in updated:
+                updated = updated.replace(_LOGS_PLACEHOLDER, _LOGS_SECTION)
             
-            with open(readme_path, 'w') as f:
-                f.write(content)
-            print("✅ Updated deliverables README with multi-robot information")
+            if updated != content:
+                f.seek(0)
+                f.write(updated)
+                f.truncate()
+                print("✅ Updated deliverables README with multi-robot information")
     except Exception as e:
         print(f"⚠️  Could not update README: {e}")
 
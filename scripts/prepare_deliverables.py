@@ -1,9 +1,43 @@
 import json
-import shutil
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from fast_copy import copy_file, copytree, dir_nonempty
 import os
 from pathlib import Path
 import numpy as np
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Deliverable JSON is written compact; pipe it through `python -m json.tool`
+# for a readable copy
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    loads = json.loads
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+# Multi-robot recordings picked up from the working directory
+MULTI_MCAP_PATTERNS = ('*multi*mcap*.json', '*multi*.mcap')
+
+# Format markers are expected near the top of the file
+SNIFF_BYTES = 4096
+
+def _looks_like_mcap(path) -> bool:
+    """Whether the first SNIFF_BYTES of path carry the MCAP-like JSON markers"""
+    with open(path, 'rb') as f:
+        size = min(SNIFF_BYTES, os.fstat(f.fileno()).st_size)
+        if size == 0:
+            return False
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            return mm.find(b'mcap-like-json') >= 0 or mm.find(b'metadata') >= 0
+
 def extract_mcap_from_training_json():
     print("Extracting MCAP data from training.json")
     
@@ -17,48 +51,54 @@ def extract_mcap_from_training_json():
     
     try:
         print("Reading training.json (this may take a while for large files)...")
-        with open(training_json, 'r') as f:
-            chunk = f.read(5000)
-            if 'mcap-like-json' in chunk or 'metadata' in chunk:
-                print("Found MCAP-like structure in training.json")
-                
-                output_mcap = deliverables_dir / 'single_robot_training.mcap.json'
-                
-                size_mb = training_json.stat().st_size / (1024 * 1024)
-                if size_mb > 500:
-                    print(f"File is very large ({size_mb:.2f} MB). Copying directly...")
-                    shutil.copy2(training_json, output_mcap)
-                    print(f"Copied to {output_mcap}")
-                    
-                    try:
-                        print("Attempting to extract metrics for plotting...")
-                        return extract_metrics_streaming(training_json, deliverables_dir)
-                    except Exception as e:
-                        print(f"Could not extract metrics: {e}")
-                        print("You can still use the full MCAP file")
-                        return output_mcap
-                else:
-                    with open(training_json, 'r') as f:
-                        data = json.load(f)
-                    
-                    #save as MCAP
-                    with open(output_mcap, 'w') as f:
-                        json.dump(data, f, indent=2)
-                    
-                    print(f"Saved MCAP data to {output_mcap}")
-                    
-                    #extracting metrics if available
-                    if 'metrics' in data and len(data['metrics']) > 0:
-                        metrics_file = deliverables_dir / 'single_robot_metrics.json'
-                        with open(metrics_file, 'w') as f:
-                            json.dump({'metrics': data['metrics']}, f, indent=2)
-                        print(f"Extracted metrics to {metrics_file}")
-                        return output_mcap, metrics_file
-                    
+        if not _looks_like_mcap(training_json):
+            print("training.json doesn't appear to be MCAP format")
+            return None
+        
+        print("Found MCAP-like structure in training.json")
+        
+        output_mcap = deliverables_dir / 'single_robot_training.mcap.json'
+        
+        size_mb = training_json.stat().st_size / (1024 * 1024)
+        if size_mb > 500:
+            print(f"File is very large ({size_mb:.2f} MB). Copying directly...")
+            print("Attempting to extract metrics for plotting...")
+            # The in-kernel copy and the metrics parse read the file
+            # independently, so they run side by side
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                copy = pool.submit(copy_file, training_json, output_mcap)
+                metrics = pool.submit(extract_metrics_streaming, training_json, deliverables_dir)
+                copy.result()
+                print(f"Copied to {output_mcap}")
+                try:
+                    metrics_file = metrics.result()
+                except Exception as e:
+                    print(f"Could not extract metrics: {e}")
+                    print("You can still use the full MCAP file")
                     return output_mcap
-            else:
-                print("training.json doesn't appear to be MCAP format")
-                return None
+            
+            if metrics_file is None:
+                return output_mcap
+            return output_mcap, metrics_file
+        else:
+            with open(training_json, 'rb') as f:
+                data = loads(f.read())
+            
+            #save as MCAP
+            with open(output_mcap, 'wb') as f:
+                f.write(dumps(data))
+            
+            print(f"Saved MCAP data to {output_mcap}")
+            
+            #extracting metrics if available
+            if 'metrics' in data and len(data['metrics']) > 0:
+                metrics_file = deliverables_dir / 'single_robot_metrics.json'
+                with open(metrics_file, 'wb') as f:
+                    f.write(dumps({'metrics': data['metrics']}))
+                print(f"Extracted metrics to {metrics_file}")
+                return output_mcap, metrics_file
+            
+            return output_mcap
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON: {e}")
         print("   File may be corrupted or incomplete")
@@ -69,8 +109,31 @@ def extract_mcap_from_training_json():
 
 def extract_metrics_streaming(json_file, output_dir):
     """Extract metrics using streaming approach for large files"""
-    print("Using streaming extraction (simplified)...")
-    return None
+    if ijson is None:
+        print("ijson not installed, skipping streaming metrics extraction")
+        return None
+    
+    print("Using streaming extraction...")
+    metrics_file = Path(output_dir) / 'single_robot_metrics.json'
+    count = 0
+    # Only the metrics array is decoded; each entry is written out as soon
+    # as it is parsed, so the file is never held in memory
+    with open(json_file, 'rb') as src, open(metrics_file, 'wb', buffering=1 << 20) as out:
+        out.write(b'{"metrics":[')
+        for item in ijson.items(src, 'metrics.item', use_float=True):
+            if count:
+                out.write(b',')
+            out.write(dumps(item))
+            count += 1
+        out.write(b']}')
+    
+    if count == 0:
+        metrics_file.unlink()
+        print("No metrics found in the MCAP file")
+        return None
+    
+    print(f"Extracted {count} metrics to {metrics_file}")
+    return metrics_file
 
 def copy_logs(deliverables_dir):
     print("\nCopying training logs...")
@@ -81,19 +144,19 @@ def copy_logs(deliverables_dir):
     single_logs = Path('logs/single_robot')
     if single_logs.exists():
         dest = logs_dir / 'single_robot'
-        shutil.copytree(single_logs, dest, dirs_exist_ok=True)
+        copytree(single_logs, dest)
         print(f"Copied single robot logs to {dest}")
     
     tb_logs = Path('tensorboard_logs')
     if tb_logs.exists():
         dest = logs_dir / 'tensorboard_logs'
-        shutil.copytree(tb_logs, dest, dirs_exist_ok=True)
+        copytree(tb_logs, dest)
         print(f"Copied TensorBoard logs to {dest}")
     
     multi_logs = Path('logs/multi_robot')
-    if multi_logs.exists() and len(list(multi_logs.iterdir())) > 0:
+    if dir_nonempty(multi_logs):
         dest = logs_dir / 'multi_robot'
-        shutil.copytree(multi_logs, dest, dirs_exist_ok=True)
+        copytree(multi_logs, dest)
         print(f"Copied multi robot logs to {dest}")
     else:
         print("Multi-robot logs not found")
@@ -185,11 +248,18 @@ def main():
         has_plot = plot_result is not None
     
     has_multi_mcap = False
-    multi_mcap_files = list(Path('.').glob('*multi*mcap*.json')) + list(Path('.').glob('*multi*.mcap'))
+    # One pass over the working directory for both recording patterns
+    with os.scandir('.') as entries:
+        multi_mcap_files = [
+            entry for entry in entries
+            if not entry.name.startswith('.')
+            and any(fnmatchcase(entry.name, pattern) for pattern in MULTI_MCAP_PATTERNS)
+            and entry.is_file()
+        ]
     if multi_mcap_files:
         for f in multi_mcap_files:
             dest = deliverables_dir / f.name
-            shutil.copy2(f, dest)
+            copy_file(f, dest)
             print(f"Copied multi-robot MCAP: {dest}")
             has_multi_mcap = True
     
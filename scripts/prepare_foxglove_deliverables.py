@@ -3,10 +3,61 @@
 Prepare deliverables for lead: Convert to binary MCAP format and organize
 """
 
+import hashlib
+import mmap
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import shutil
 from mcap_writer import convert_json_to_mcap
+from fast_copy import copy_file
+
+try:
+    import xxhash
+    def _new_hash():
+        return xxhash.xxh3_64()
+except ImportError:
+    def _new_hash():
+        return hashlib.blake2b(digest_size=16)
+
+# train.py --record writes binary MCAP directly; these need no conversion
+SINGLE_BINARY_MCAP = Path('training.mcap')
+MULTI_BINARY_MCAP = Path('multi_robot_training.mcap')
+
+def _source_digest(path) -> str:
+    """Content hash of path, hashed straight from a read-only mapping"""
+    h = _new_hash()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()
+
+def convert_one(name, source, output_mcap, workers):
+    """Convert one recording; runs in its own process so both convert at once"""
+    if Path(source).suffix == '.mcap':
+        # Already binary: just copy it into place
+        copy_file(source, output_mcap)
+        return name, str(output_mcap)
+    
+    # The hash of the JSON each .mcap was converted from is kept next to it,
+    # so an unchanged recording is not converted again
+    output_mcap = Path(output_mcap)
+    stamp = output_mcap.with_suffix('.mcap.hash')
+    digest = _source_digest(source)
+    if output_mcap.exists() and stamp.exists() and stamp.read_text() == digest:
+        print(f"   {output_mcap.name} is up to date with {Path(source).name}, skipping conversion")
+        return name, str(output_mcap)
+    
+    # Full training recordings: always streamed, never loaded whole
+    result = convert_json_to_mcap(str(source), str(output_mcap),
+                                  workers=workers, streaming=True)
+    if result:
+        tmp = stamp.with_name(stamp.name + '.tmp')
+        tmp.write_text(digest)
+        os.replace(tmp, stamp)
+    return name, result
 
 def main():
     print("=" * 60)
@@ -20,6 +71,7 @@ def main():
     deliverables_dir.mkdir(exist_ok=True)
     
     converted_files = []
+    tasks = []
     
     # 1. Convert single-robot MCAP
     print("1️⃣  Single-Robot Training MCAP")
@@ -29,13 +81,15 @@ def main():
     if not single_json.exists():
         single_json = Path('training.json')
     
-    if single_json.exists():
+    if SINGLE_BINARY_MCAP.exists():
+        output_mcap = deliverables_dir / 'single_robot_training.mcap'
+        print(f"   Copying binary recording: {SINGLE_BINARY_MCAP.name}")
+        tasks.append(('Single-Robot', SINGLE_BINARY_MCAP, output_mcap))
+    elif single_json.exists():
         output_mcap = deliverables_dir / 'single_robot_training.mcap'
         print(f"   Converting: {single_json.name}")
         print(f"   This may take a while for large files...")
-        result = convert_json_to_mcap(str(single_json), str(output_mcap))
-        if result:
-            converted_files.append(('Single-Robot', result))
+        tasks.append(('Single-Robot', single_json, output_mcap))
     else:
         print("   ⚠️  Single-robot MCAP JSON not found")
     
@@ -44,12 +98,14 @@ def main():
     print("-" * 60)
     
     multi_json = Path('multi_robot_training.mcap.json')
-    if multi_json.exists():
+    if MULTI_BINARY_MCAP.exists():
+        output_mcap = deliverables_dir / 'multi_robot_training.mcap'
+        print(f"   Copying binary recording: {MULTI_BINARY_MCAP.name}")
+        tasks.append(('Multi-Robot', MULTI_BINARY_MCAP, output_mcap))
+    elif multi_json.exists():
         output_mcap = deliverables_dir / 'multi_robot_training.mcap'
         print(f"   Converting: {multi_json.name}")
-        result = convert_json_to_mcap(str(multi_json), str(output_mcap))
-        if result:
-            converted_files.append(('Multi-Robot', result))
+        tasks.append(('Multi-Robot', multi_json, output_mcap))
     else:
         print("   ⚠️  Multi-robot MCAP JSON not found")
         print("   💡 To generate multi-robot MCAP, run:")
@@ -57,6 +113,19 @@ def main():
         print("          --record --mcap_output multi_robot_training.mcap")
         print("      (This will automatically create a binary MCAP file)")
     
+    # The two conversions are independent, so each gets a process and an
+    # even share of the cores for its encode pool
+    if tasks:
+        print()
+        encode_workers = max(1, (os.cpu_count() or 1) // len(tasks))
+        with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [executor.submit(convert_one, *task, encode_workers) for task in tasks]
+            # Collected in submission order, so the summary order is fixed
+            for future in futures:
+                name, result = future.result()
+                if result:
+                    converted_files.append((name, result))
+    
     # 3. Summary
     print("\n" + "=" * 60)
     print("📦 Deliverables Summary")
@@ -83,7 +152,7 @@ def main():
             print("   Try using a streaming approach or contact for assistance.")
     
     # Check if multi-robot training is needed
-    if not multi_json.exists():
+    if not multi_json.exists() and not MULTI_BINARY_MCAP.exists():
         print("\n" + "=" * 60)
         print("⚠️  Multi-Robot Training MCAP Missing")
         print("=" * 60)
@@ -7,9 +7,61 @@ This script will create much better results for your job deliverable!
 import subprocess
 import sys
 import shutil
+import time
 from pathlib import Path
+from train_runner import build_command
 
-def main():
+# train.py creates this once the evaluation logs are final, before it
+# finishes saving the recording and model
+DONE_MARKER = Path(".multi_robot_training_done")
+CREATE_MCAP_SCRIPT = Path(__file__).with_name("create_mcap_from_logs.py")
+
+def _run_training(cmd):
+    """Run training; start the MCAP regeneration as soon as its logs are final.
+    
+    Returns the still-running regeneration process, or None if training
+    exited without creating DONE_MARKER. If training fails, raises
+    CalledProcessError once the regeneration (if started) has finished;
+    its own failure is reported separately.
+    """
+    DONE_MARKER.unlink(missing_ok=True)
+    mcap_proc = None
+    with subprocess.Popen(cmd + ["--done_marker", str(DONE_MARKER)]) as train_proc:
+        while train_proc.poll() is None:
+            if DONE_MARKER.exists():
+                print("\n📦 Evaluation logs complete, regenerating MCAP files in parallel...")
+                mcap_proc = subprocess.Popen([sys.executable, str(CREATE_MCAP_SCRIPT)])
+                break
+            time.sleep(1.0)
+    # Popen's context exit has waited for train.py
+    if train_proc.returncode != 0:
+        if mcap_proc is not None:
+            _wait_mcap(mcap_proc)
+        raise subprocess.CalledProcessError(train_proc.returncode, cmd)
+    return mcap_proc
+
+def _wait_mcap(mcap_proc):
+    """Wait for the MCAP regeneration; report and return whether it succeeded"""
+    if mcap_proc.wait() != 0:
+        print()
+        print("=" * 70)
+        print(f"❌ MCAP regeneration failed with error code: {mcap_proc.returncode}")
+        print(f"   Rerun it with: {sys.executable} {CREATE_MCAP_SCRIPT}")
+        print("=" * 70)
+        return False
+    return True
+
+def main(interactive=True):
+    """Back up the old models, retrain and regenerate the MCAP files.
+    
+    With interactive=False the "Press Enter" confirmation is skipped, so
+    other scripts can call this without a terminal.
+    """
+    if interactive:
+        print()
+        input("Press Enter to start improved training (or Ctrl+C to cancel)...")
+        print()
+    
     print("=" * 70)
     print("🚀 IMPROVED MULTI-ROBOT TRAINING")
     print("=" * 70)
@@ -38,20 +90,13 @@ def main():
     print("🏋️ Starting training...")
     print()
     
-    cmd = [
-        sys.executable, "train.py",
-        "--mode", "multi",
-        "--episodes", "40000",  # Double the training!
-        "--num_robots", "3",
-        "--record",
-        "--mcap_output", "multi_robot_training_improved.mcap"
-    ]
+    cmd = build_command('improved')  # Double the training!
     
     print(f"Command: {' '.join(cmd)}")
     print()
     
     try:
-        result = subprocess.run(cmd, check=True)
+        mcap_proc = _run_training(cmd)
         
         print()
         print("=" * 70)
@@ -59,9 +104,12 @@ def main():
         print("=" * 70)
         print()
         
-        # Regenerate MCAP files
+        # Regenerate MCAP files (usually already started during teardown)
         print("📦 Regenerating MCAP files for Foxglove...")
-        subprocess.run([sys.executable, "create_mcap_from_logs.py"], check=True)
+        if mcap_proc is None:
+            mcap_proc = subprocess.Popen([sys.executable, str(CREATE_MCAP_SCRIPT)])
+        if not _wait_mcap(mcap_proc):
+            return False
         
         print()
         print("=" * 70)
@@ -96,9 +144,6 @@ def main():
         return False
 
 if __name__ == "__main__":
-    print()
-    input("Press Enter to start improved training (or Ctrl+C to cancel)...")
-    print()
     success = main()
     sys.exit(0 if success else 1)
 
@@ -3,12 +3,10 @@
 Script to run multi-robot training with MCAP recording and organize deliverables
 """
 
-import subprocess
-import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
-import os
+from fast_copy import copy_file, copytree, dir_nonempty
+from train_runner import run_preset
 
 def run_training():
     """Run multi-robot training with MCAP recording"""
@@ -26,41 +24,7 @@ def run_training():
     print("The training will save checkpoints periodically.")
     print()
     
-    # Ensure directories exist
-    os.makedirs("./models/multi_robot", exist_ok=True)
-    os.makedirs("./logs/multi_robot", exist_ok=True)
-    os.makedirs("./checkpoints/multi_robot", exist_ok=True)
-    
-    # Run training
-    cmd = [
-        sys.executable, "train.py",
-        "--mode", "multi",
-        "--episodes", "20000",
-        "--num_robots", "3",
-        "--record",
-        "--mcap_output", "multi_robot_training.mcap"
-    ]
-    
-    print(f"Running: {' '.join(cmd)}")
-    print()
-    
-    try:
-        result = subprocess.run(cmd, check=True)
-        print()
-        print("=" * 60)
-        print("Training completed successfully!")
-        print("=" * 60)
-        return True
-    except subprocess.CalledProcessError as e:
-        print()
-        print("=" * 60)
-        print(f"Training failed with error code: {e.returncode}")
-        print("=" * 60)
-        return False
-    except KeyboardInterrupt:
-        print()
-        print("Training interrupted by user.")
-        return False
+    return run_preset('std', width=60)
 
 def organize_deliverables():
     """Organize multi-robot training deliverables"""
@@ -72,40 +36,49 @@ def organize_deliverables():
     deliverables_dir = Path('deliverables')
     deliverables_dir.mkdir(exist_ok=True)
     
-    # Copy MCAP file
-    mcap_file = Path('multi_robot_training.mcap.json')
-    if mcap_file.exists():
-        dest = deliverables_dir / 'multi_robot_training.mcap.json'
-        print(f"Copying MCAP file...")
-        shutil.copy2(mcap_file, dest)
-        size_mb = mcap_file.stat().st_size / (1024 * 1024)
-        print(f"✅ Copied multi-robot MCAP: {dest} ({size_mb:.2f} MB)")
-    else:
-        print("⚠️  MCAP file not found. It may still be generating...")
-    
-    # Copy episodes and metrics files
-    episodes_file = Path('multi_robot_training.mcap_episodes.json')
-    metrics_file = Path('multi_robot_training.mcap_metrics.json')
-    
-    if episodes_file.exists():
-        dest = deliverables_dir / 'multi_robot_episodes.json'
-        shutil.copy2(episodes_file, dest)
-        print(f"✅ Copied episodes data: {dest}")
-    
-    if metrics_file.exists():
-        dest = deliverables_dir / 'multi_robot_metrics.json'
-        shutil.copy2(metrics_file, dest)
-        print(f"✅ Copied metrics data: {dest}")
-    
-    # Copy multi-robot logs
     logs_dir = deliverables_dir / 'logs'
     logs_dir.mkdir(exist_ok=True)
     
+    mcap_file = Path('multi_robot_training.mcap.json')
+    episodes_file = Path('multi_robot_training.mcap_episodes.json')
+    metrics_file = Path('multi_robot_training.mcap_metrics.json')
     multi_logs = Path('logs/multi_robot')
-    if multi_logs.exists() and len(list(multi_logs.iterdir())) > 0:
-        dest = logs_dir / 'multi_robot'
-        shutil.copytree(multi_logs, dest, dirs_exist_ok=True)
-        print(f"✅ Copied multi-robot logs to {dest}")
+    
+    # The copies are independent, so they all run at once; results are
+    # reported in the usual order as each one is waited on
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        copies = {}
+        if mcap_file.exists():
+            print(f"Copying MCAP file...")
+            copies['mcap'] = pool.submit(copy_file, mcap_file, deliverables_dir / 'multi_robot_training.mcap.json')
+        if episodes_file.exists():
+            copies['episodes'] = pool.submit(copy_file, episodes_file, deliverables_dir / 'multi_robot_episodes.json')
+        if metrics_file.exists():
+            copies['metrics'] = pool.submit(copy_file, metrics_file, deliverables_dir / 'multi_robot_metrics.json')
+        if dir_nonempty(multi_logs):
+            copies['logs'] = pool.submit(copytree, multi_logs, logs_dir / 'multi_robot')
+        
+        # Copy MCAP file
+        if 'mcap' in copies:
+            copies['mcap'].result()
+            size_mb = mcap_file.stat().st_size / (1024 * 1024)
+            print(f"✅ Copied multi-robot MCAP: {deliverables_dir / 'multi_robot_training.mcap.json'} ({size_mb:.2f} MB)")
+        else:
+            print("⚠️  MCAP file not found. It may still be generating...")
+        
+        # Copy episodes and metrics files
+        if 'episodes' in copies:
+            copies['episodes'].result()
+            print(f"✅ Copied episodes data: {deliverables_dir / 'multi_robot_episodes.json'}")
+        
+        if 'metrics' in copies:
+            copies['metrics'].result()
+            print(f"✅ Copied metrics data: {deliverables_dir / 'multi_robot_metrics.json'}")
+        
+        # Copy multi-robot logs
+        if 'logs' in copies:
+            copies['logs'].result()
+            print(f"✅ Copied multi-robot logs to {logs_dir / 'multi_robot'}")
     
     print()
     print("=" * 60)
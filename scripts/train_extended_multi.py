@@ -3,9 +3,7 @@
 Extended training script for multi-robot - trains for much longer to improve performance
 """
 
-import subprocess
-import sys
-import os
+from train_runner import exec_preset
 
 def main():
     print("=" * 70)
@@ -22,33 +20,7 @@ def main():
     print("You can stop and resume from checkpoints if needed.")
     print()
     
-    os.makedirs("./models/multi_robot", exist_ok=True)
-    os.makedirs("./logs/multi_robot", exist_ok=True)
-    os.makedirs("./checkpoints/multi_robot", exist_ok=True)
-    
-    cmd = [
-        sys.executable, "train.py",
-        "--mode", "multi",
-        "--episodes", "100000",
-        "--num_robots", "3",
-        "--record",
-        "--mcap_output", "multi_robot_training_extended.mcap"
-    ]
-    
-    print(f"Running: {' '.join(cmd)}")
-    print()
-    
-    try:
-        subprocess.run(cmd, check=True)
-        print()
-        print("=" * 70)
-        print("✅ Multi-robot training completed successfully!")
-        print("=" * 70)
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Training failed with error code: {e.returncode}")
-    except KeyboardInterrupt:
-        print("\n⚠️  Training interrupted by user.")
-        print("You can resume from the latest checkpoint in ./checkpoints/multi_robot/")
+    exec_preset('ext_multi')
 
 if __name__ == "__main__":
     main()
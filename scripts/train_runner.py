@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Shared train.py launcher for the training presets
+
+The run/retrain/extended training scripts only differ in these presets, so
+they all build their command line and run it through here. Can also be run
+directly: python scripts/train_runner.py --preset ext_multi
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+PRESETS = {
+    'std': dict(mode='multi', episodes=20000, num_robots=3,
+                mcap='multi_robot_training.mcap'),
+    'improved': dict(mode='multi', episodes=40000, num_robots=3,
+                     mcap='multi_robot_training_improved.mcap'),
+    'ext_multi': dict(mode='multi', episodes=100000, num_robots=3,
+                      mcap='multi_robot_training_extended.mcap'),
+    'ext_single': dict(mode='single', episodes=40000,
+                       mcap='single_robot_training_extended.mcap'),
+}
+
+def build_command(preset):
+    """train.py command line for a preset"""
+    config = PRESETS[preset]
+    cmd = [
+        sys.executable, "train.py",
+        "--mode", config['mode'],
+        "--episodes", str(config['episodes'])
+    ]
+    if 'num_robots' in config:
+        cmd += ["--num_robots", str(config['num_robots'])]
+    cmd += ["--record", "--mcap_output", config['mcap']]
+    return cmd
+
+def make_output_dirs(preset):
+    """Create the model, log and checkpoint directories train.py writes to"""
+    mode = PRESETS[preset]['mode']
+    for parent in ("models", "logs", "checkpoints"):
+        os.makedirs(f"./{parent}/{mode}_robot", exist_ok=True)
+
+def run_preset(preset, width=70):
+    """Run train.py for a preset; returns whether it completed successfully"""
+    make_output_dirs(preset)
+    cmd = build_command(preset)
+
+    print(f"Running: {' '.join(cmd)}")
+    print()
+
+    try:
+        subprocess.run(cmd, check=True)
+        print()
+        print("=" * width)
+        print("✅ Training completed successfully!")
+        print("=" * width)
+        return True
+    except subprocess.CalledProcessError as e:
+        print()
+        print("=" * width)
+        print(f"❌ Training failed with error code: {e.returncode}")
+        print("=" * width)
+        return False
+    except KeyboardInterrupt:
+        print("\n⚠️  Training interrupted by user.")
+        print(f"You can resume from the latest checkpoint in ./checkpoints/{PRESETS[preset]['mode']}_robot/")
+        return False
+
+def exec_preset(preset):
+    """Replace this process with train.py for a preset; does not return.
+    
+    For launchers with nothing to do after training: no idle parent is left
+    holding memory for the hours the run takes, and Ctrl+C / SIGTERM reach
+    train.py directly.
+    """
+    make_output_dirs(preset)
+    cmd = build_command(preset)
+
+    print(f"Running: {' '.join(cmd)}")
+    print()
+    # exec discards anything still sitting in Python's buffers
+    sys.stdout.flush()
+    os.execv(cmd[0], cmd)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Launch train.py with a named preset")
+    parser.add_argument("--preset", choices=sorted(PRESETS), required=True,
+                        help="Training preset to run")
+    args = parser.parse_args(argv)
+    exec_preset(args.preset)
+
+if __name__ == "__main__":
+    main()
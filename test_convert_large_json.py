@@ -0,0 +1,80 @@
+"""
+Test script for the large JSON to MCAP converter
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from mcap.reader import make_reader
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from convert_large_json_to_mcap import _is_jsonl, convert_large_json_to_mcap
+
+
+def sample_log():
+    return {
+        'metadata': {'source': 'test'},
+        'messages': [{'timestamp': 1.0 + i, 'channel': 'markers', 'data': [{'id': i}]}
+                     for i in range(5)],
+        'metrics': [{'timestamp': 10.0, 'reward': 1.5}],
+    }
+
+
+def count_messages(mcap_path):
+    with open(mcap_path, 'rb') as f:
+        return sum(1 for _ in make_reader(f).iter_messages())
+
+
+def test_format_detection():
+    """Test that only record-per-line files are taken for JSON Lines"""
+    print("Testing JSON Lines detection...")
+    log = sample_log()
+    assert not _is_jsonl(json.dumps(log).encode())
+    assert not _is_jsonl(json.dumps(log, indent=2).encode())
+    records = log['messages'] + log['metrics']
+    assert _is_jsonl(b'\n'.join(json.dumps(r).encode() for r in records))
+    assert _is_jsonl(json.dumps(records[0]).encode() + b'\n')
+    print("  Detection test passed\n")
+
+
+def test_convert_compact_single_document():
+    """Test that a one-line MCAP JSON document converts every message"""
+    print("Testing compact single-document conversion...")
+    tmp = Path(tempfile.mkdtemp())
+    for name, text in (('compact', json.dumps(sample_log())),
+                       ('indented', json.dumps(sample_log(), indent=2))):
+        json_path = tmp / f"{name}.json"
+        json_path.write_text(text)
+        mcap_path = tmp / f"{name}.mcap"
+        assert convert_large_json_to_mcap(str(json_path), str(mcap_path)) == str(mcap_path)
+        assert count_messages(mcap_path) == 6, name
+    print("  Compact conversion test passed\n")
+
+
+def test_convert_jsonl():
+    """Test that JSON Lines logs convert one message per record"""
+    print("Testing JSON Lines conversion...")
+    tmp = Path(tempfile.mkdtemp())
+    log = sample_log()
+    json_path = tmp / "log.jsonl"
+    json_path.write_text('\n'.join(json.dumps(r) for r in log['messages'] + log['metrics']) + '\n')
+    mcap_path = tmp / "log.mcap"
+    assert convert_large_json_to_mcap(str(json_path), str(mcap_path)) == str(mcap_path)
+    assert count_messages(mcap_path) == 6
+    print("  JSON Lines conversion test passed\n")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Testing JSON to MCAP Conversion")
+    print("=" * 50 + "\n")
+
+    test_format_detection()
+    test_convert_compact_single_document()
+    test_convert_jsonl()
+
+    print("=" * 50)
+    print("All tests passed!")
+    print("=" * 50)
@@ -3,8 +3,8 @@ Test script for kinematic model
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from robot_kinematics import FourWheelKinematics, RobotParams
+import robot_kinematics_numba
+from robot_kinematics import FourWheelKinematics, BatchedFourWheelKinematics, RobotParams
 
 
 def test_straight_motion():
@@ -14,8 +14,7 @@ def test_straight_motion():
     robot.reset(0, 0, 0)
     
     # Straight motion: curvature = 0
-    for _ in range(50):
-        robot.step(curvature=0.0, velocity=1.0, dt=0.1)
+    robot.rollout(np.zeros(50), 1.0, dt=0.1)
     
     state = robot.get_state()
     print(f"  Final position: ({state.x:.2f}, {state.y:.2f})")
@@ -36,13 +35,7 @@ def test_circular_motion():
     radius = 2.0
     curvature = 1.0 / radius
     
-    positions = []
-    for _ in range(100):
-        robot.step(curvature=curvature, velocity=1.0, dt=0.1)
-        state = robot.get_state()
-        positions.append([state.x, state.y])
-    
-    positions = np.array(positions)
+    positions = robot.rollout(np.full(100, curvature), 1.0, dt=0.1)[:, :2]
     state = robot.get_state()
     
     # Check if we completed approximately a quarter circle
@@ -105,26 +98,131 @@ def test_acceleration_limit():
     print("  Acceleration limit test passed\n")
 
 
+def test_compiled_step_matches_python():
+    """Test that the Numba-compiled step matches the Python implementation"""
+    print("Testing compiled step...")
+    if not robot_kinematics_numba.NUMBA_AVAILABLE:
+        print("  Numba not installed, skipping\n")
+        return
+    
+    trajectories = []
+    for use_numba in (False, True):
+        robot_kinematics_numba.NUMBA_AVAILABLE = use_numba
+        try:
+            robot = FourWheelKinematics()
+            robot.reset(0, 0, 0)
+            states = []
+            for i in range(100):
+                robot.step(curvature=0.8 * np.sin(i * 0.2), velocity=1.5, dt=0.1)
+                s = robot.get_state()
+                states.append([s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr])
+            trajectories.append(np.array(states))
+        finally:
+            robot_kinematics_numba.NUMBA_AVAILABLE = True
+    
+    assert np.allclose(trajectories[0], trajectories[1], atol=1e-9), "Compiled step diverged"
+    print("  Compiled step test passed\n")
+
+
+def test_rollout_matches_step():
+    """Test that rollout reproduces repeated step calls on both code paths"""
+    print("Testing rollout...")
+    curvatures = np.concatenate([0.8 * np.sin(np.arange(60) * 0.2), np.zeros(20), np.full(20, -1.5)])
+    velocities = np.concatenate([np.full(50, 1.5), np.full(50, -0.5)])
+    numba_available = robot_kinematics_numba.NUMBA_AVAILABLE
+    try:
+        for use_numba in {False, numba_available}:
+            robot_kinematics_numba.NUMBA_AVAILABLE = use_numba
+            robot = FourWheelKinematics()
+            robot.reset(1.0, 2.0, 3.0)
+            expected = []
+            for curvature, velocity in zip(curvatures, velocities):
+                robot.step(curvature, velocity, dt=0.1)
+                s = robot.get_state()
+                expected.append([s.x, s.y, s.theta])
+            
+            batch_robot = FourWheelKinematics()
+            batch_robot.reset(1.0, 2.0, 3.0)
+            poses = batch_robot.rollout(curvatures, velocities, dt=0.1)
+            assert np.allclose(poses, expected, atol=1e-9), "Rollout diverged from step"
+            s, b = robot.get_state(), batch_robot.get_state()
+            assert np.allclose([s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr],
+                               [b.x, b.y, b.theta, b.v, b.delta_fl, b.delta_fr, b.delta_rl, b.delta_rr],
+                               atol=1e-9)
+    finally:
+        robot_kinematics_numba.NUMBA_AVAILABLE = numba_available
+    print("  Rollout test passed\n")
+
+
+def test_curvature_table():
+    """Test that table lookups for discrete curvatures match direct steps"""
+    print("Testing curvature lookup table...")
+    bins = np.linspace(-2.0, 2.0, 9)
+    table_robot = FourWheelKinematics(curvature_bins=bins)
+    robot = FourWheelKinematics()
+    for i in range(40):
+        table_robot.step(None, 1.0, dt=0.1, curvature_idx=i % len(bins))
+        robot.step(bins[i % len(bins)], 1.0, dt=0.1)
+    assert table_robot.get_state() == robot.get_state(), "Table lookup diverged"
+    print("  Curvature table test passed\n")
+
+
+def test_batched_matches_single():
+    """Test that the batched kinematics match independent single robots"""
+    print("Testing batched kinematics...")
+    curvatures = np.array([0.0, 0.5, -1.2, 2.0])
+    batch = BatchedFourWheelKinematics(len(curvatures))
+    batch.reset(0.0, 0.0, np.linspace(-1.0, 1.0, len(curvatures)))
+    robots = []
+    for theta in batch.theta:
+        robot = FourWheelKinematics()
+        robot.reset(0, 0, theta)
+        robots.append(robot)
+    
+    for _ in range(50):
+        batch.step(curvatures, 1.0, dt=0.1)
+        for robot, curvature in zip(robots, curvatures):
+            robot.step(curvature, 1.0, dt=0.1)
+    
+    for i, robot in enumerate(robots):
+        s, b = robot.get_state(), batch.get_state(i)
+        assert np.allclose([s.x, s.y, s.theta, s.v, s.delta_fl, s.delta_rr],
+                           [b.x, b.y, b.theta, b.v, b.delta_fl, b.delta_rr], atol=1e-6)
+        assert np.allclose(robot.get_wheel_positions(), batch.get_wheel_positions()[i])
+    print("  Batched kinematics test passed\n")
+
+
+def test_jax_wheel_angles():
+    """Test the JAX wheel-angle kernel against the scalar model"""
+    print("Testing JAX wheel angles...")
+    import robot_kinematics_jax
+    if not robot_kinematics_jax.JAX_AVAILABLE:
+        print("  JAX not installed, skipping\n")
+        return
+    
+    robot = FourWheelKinematics()
+    curvatures = np.array([0.0, 0.5, -1.2, 2.0])
+    angles = np.asarray(robot_kinematics_jax.batched_wheel_angles(
+        curvatures, robot.params.wheelbase / 2, robot.params.track_width / 2))
+    for curvature, row in zip(curvatures, angles):
+        assert np.allclose(row, robot.compute_wheel_steering_angles(curvature), atol=1e-5)
+    print("  JAX wheel angles test passed\n")
+
+
 def visualize_robot():
     """Visualize robot with wheels and ICR"""
+    # Imported here so the kinematics tests don't pay for matplotlib
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
     print("Creating visualization...")
     robot = FourWheelKinematics()
     robot.reset(0, 0, 0)
     
-    # Perform a curved path
-    positions = []
-    wheel_positions_history = []
-    
-    for i in range(50):
-        curvature = 0.3 * np.sin(i * 0.1)  # Varying curvature
-        velocity = 1.0
-        robot.step(curvature, velocity, dt=0.1)
-        
-        state = robot.get_state()
-        positions.append([state.x, state.y])
-        wheel_positions_history.append(robot.get_wheel_positions())
-    
-    positions = np.array(positions)
+    # Perform a curved path with varying curvature
+    curvatures = 0.3 * np.sin(np.arange(50) * 0.1)
+    positions = robot.rollout(curvatures, 1.0, dt=0.1)[:, :2]
     
     # Plot
     fig, ax = plt.subplots(figsize=(10, 10))
@@ -149,26 +247,21 @@ def visualize_robot():
     sin_theta = np.sin(final_state.theta)
     rotation = np.array([[cos_theta, -sin_theta],
                         [sin_theta, cos_theta]])
+    translation = np.array([final_state.x, final_state.y])
     
-    corners_global = (rotation @ corners_robot.T).T
-    corners_global[:, 0] += final_state.x
-    corners_global[:, 1] += final_state.y
-    
-    corners_global = np.vstack([corners_global, corners_global[0]])  # Close polygon
+    corners_global = corners_robot @ rotation.T + translation
+    corners_global = np.concatenate([corners_global, corners_global[:1]])  # Close polygon
     ax.plot(corners_global[:, 0], corners_global[:, 1], 'k-', linewidth=2, label='Robot Body')
     
     # Plot wheels
     colors = ['red', 'green', 'blue', 'yellow']
     wheel_names = ['FL', 'FR', 'RL', 'RR']
-    for i, (wheel_pos, color, name) in enumerate(zip(final_wheels, colors, wheel_names)):
+    # Steering direction of every wheel at once
+    wheel_thetas = final_state.theta + np.array([final_state.delta_fl, final_state.delta_fr,
+                                                 final_state.delta_rl, final_state.delta_rr])
+    arrows = 0.2 * np.stack([np.cos(wheel_thetas), np.sin(wheel_thetas)], axis=1)
+    for wheel_pos, (dx, dy), color, name in zip(final_wheels, arrows, colors, wheel_names):
         ax.plot(wheel_pos[0], wheel_pos[1], 'o', color=color, markersize=8, label=f'Wheel {name}')
-        
-        # Draw steering direction
-        steering_angle = [final_state.delta_fl, final_state.delta_fr, 
-                         final_state.delta_rl, final_state.delta_rr][i]
-        wheel_theta = final_state.theta + steering_angle
-        dx = 0.2 * np.cos(wheel_theta)
-        dy = 0.2 * np.sin(wheel_theta)
         ax.arrow(wheel_pos[0], wheel_pos[1], dx, dy, 
                 head_width=0.05, head_length=0.05, fc=color, ec=color)
     
@@ -203,6 +296,11 @@ if __name__ == "__main__":
     test_circular_motion()
     test_steering_rate_limit()
     test_acceleration_limit()
+    test_compiled_step_matches_python()
+    test_rollout_matches_step()
+    test_curvature_table()
+    test_batched_matches_single()
+    test_jax_wheel_angles()
     visualize_robot()
     
     print("=" * 50)
@@ -0,0 +1,214 @@
+"""
+Test script for the MCAP writer
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import mcap_writer
+from mcap_writer import MCAPWriter, decode_payload, convert_json_to_mcap
+
+
+def sample_markers(i):
+    return [{
+        'id': i,
+        'pose': {'position': {'x': np.float32(0.5 * i), 'y': np.float64(1.0), 'z': 0.0}},
+        'points': np.arange(6, dtype=np.float32).reshape(3, 2),
+        'visible': np.bool_(True),
+    }]
+
+
+def test_encode_numpy_payload():
+    """Test that numpy scalars and arrays encode to plain JSON"""
+    print("Testing message encoding...")
+    writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "encode.mcap"))
+    previous = mcap_writer.orjson
+    try:
+        # Both the orjson path (when installed) and the stdlib fallback
+        for encoder in {previous, None}:
+            mcap_writer.orjson = encoder
+            decoded = json.loads(writer._encode(sample_markers(3)))
+            assert decoded[0]['pose']['position']['x'] == 1.5
+            assert decoded[0]['points'] == [[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]]
+            assert decoded[0]['visible'] is True
+    finally:
+        mcap_writer.orjson = previous
+    print("  Encoding test passed\n")
+
+
+def test_save_roundtrip(encoding='json'):
+    """Test that saved marker and metric messages can be read back"""
+    print(f"Testing MCAP round trip ({encoding})...")
+    writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "roundtrip.mcap"), encoding=encoding)
+    for i in range(5):
+        writer.add_marker_message(sample_markers(i), timestamp=100.0 + i)
+    writer.add_metrics(step=1, reward=np.float32(2.5), distance=1.0, success=False, episode_length=10)
+    output = writer.save()
+    
+    if not writer.use_binary:
+        print("  mcap not installed, checked JSON backup only\n")
+        return
+    
+    from mcap.reader import make_reader
+    with open(output, 'rb') as f:
+        messages = [(channel.topic, decode_payload(message.data, channel.message_encoding))
+                    for _, channel, message in make_reader(f).iter_messages()]
+        f.seek(0)
+        summary = make_reader(f).get_summary()
+    assert all(index.compression in ('zstd', '') for index in summary.chunk_indexes)
+    assert summary.statistics.message_count == 6
+    markers = [data for topic, data in messages if topic == '/visualization_markers']
+    metrics = [data for topic, data in messages if topic == '/training_metrics']
+    assert len(markers) == 5 and markers[4][0]['id'] == 4
+    assert metrics[0]['reward'] == 2.5
+    print("  Round trip test passed\n")
+
+
+def test_save_roundtrip_cbor():
+    """Test the CBOR-encoded channels"""
+    if mcap_writer.cbor2 is None:
+        print("cbor2 not installed, skipping CBOR round trip\n")
+        return
+    test_save_roundtrip(encoding='cbor')
+
+
+def test_stream_matches_buffered():
+    """Test that streaming messages during recording writes the same MCAP"""
+    print("Testing streamed MCAP writing...")
+    results = []
+    for stream in (False, True):
+        writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "stream.mcap"), stream=stream)
+        if not writer.use_binary:
+            print("  mcap not installed, skipping\n")
+            return
+        for i in range(5):
+            writer.add_marker_message(sample_markers(i), timestamp=100.0 + i)
+        writer.add_metrics(step=1, reward=2.5, distance=1.0, success=False, episode_length=10)
+        assert writer.num_messages == 5
+        
+        from mcap.reader import make_reader
+        with open(writer.save(), 'rb') as f:
+            results.append([(channel.topic, message.log_time, message.data)
+                            for _, channel, message in make_reader(f).iter_messages()])
+    # Metrics carry their wall-clock recording time, so compare the markers
+    markers = [[m for m in result if m[0] == '/visualization_markers'] for result in results]
+    assert [len(result) for result in results] == [6, 6]
+    assert markers[0] == markers[1], "Streamed MCAP differs from buffered"
+    print("  Streamed MCAP test passed\n")
+
+
+def test_stream_close_and_failure():
+    """Test that a streamed MCAP is closed on error paths, not backed up empty"""
+    print("Testing streamed MCAP error paths...")
+    from mcap.reader import make_reader
+    tmp = Path(tempfile.mkdtemp())
+    
+    # Leaving the context without save() still finishes the file
+    with MCAPWriter(str(tmp / "closed.mcap"), stream=True) as writer:
+        if not writer.use_binary:
+            print("  mcap not installed, skipping\n")
+            return
+        for i in range(3):
+            writer.add_marker_message(sample_markers(i), timestamp=100.0 + i)
+        writer.add_metrics(step=1, reward=2.5, distance=1.0, success=False, episode_length=10)
+    with open(tmp / "closed.mcap", 'rb') as f:
+        topics = [channel.topic for _, channel, _ in make_reader(f).iter_messages()]
+    assert topics == ['/visualization_markers'] * 3
+    writer.close()  # idempotent
+    
+    # A failing save re-raises instead of writing a marker-less JSON backup
+    writer = MCAPWriter(str(tmp / "failed.mcap"), stream=True)
+    writer.add_marker_message(sample_markers(0), timestamp=100.0)
+    writer.metrics.append({'timestamp': 101.0, 'value': object()})
+    try:
+        writer.save()
+        assert False, "save() should re-raise when streaming"
+    except TypeError:
+        pass
+    assert not (tmp / "failed.json").exists()
+    writer.close()
+    print("  Streamed MCAP error path test passed\n")
+
+
+def test_marker_columns():
+    """Test the columnar view of recorded markers"""
+    print("Testing marker columns...")
+    writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "columns.mcap"))
+    for i in range(4):
+        writer.add_marker_message(sample_markers(i), timestamp=10.0 + i)
+    columns = writer.marker_columns()
+    assert writer.num_messages == 4
+    assert columns['id'].tolist() == [0, 1, 2, 3]
+    assert np.allclose(columns['x'], [0.0, 0.5, 1.0, 1.5])
+    assert columns['timestamp_ns'][3] == 13 * 10**9
+    print("  Marker columns test passed\n")
+
+
+def test_json_backup():
+    """Test that the JSON fallback rebuilds messages from the encoded payloads"""
+    print("Testing JSON backup...")
+    writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "backup.mcap"))
+    writer.use_binary = False
+    writer.add_marker_message(sample_markers(7), timestamp=12.5)
+    with open(writer.save()) as f:
+        data = json.load(f)
+    assert data['messages'][0]['timestamp'] == 12.5
+    assert data['messages'][0]['data'][0]['id'] == 7
+    print("  JSON backup test passed\n")
+
+
+def test_convert_json_streaming():
+    """Test that streamed and loaded JSON conversion produce the same messages"""
+    print("Testing JSON to MCAP conversion...")
+    writer = MCAPWriter(str(Path(tempfile.mkdtemp()) / "convert.mcap"))
+    writer.use_binary = False
+    for i in range(3):
+        writer.add_marker_message(sample_markers(i), timestamp=50.0 + i)
+    writer.add_metrics(step=2, reward=1.5, distance=0.25, success=True, episode_length=4)
+    json_file = writer.save()
+    
+    try:
+        from mcap.reader import make_reader
+    except ImportError:
+        print("  mcap not installed, skipping\n")
+        return
+    
+    previous = mcap_writer.STREAMING_THRESHOLD_BYTES
+    results = []
+    try:
+        # Loaded inline, streamed, and streamed through the worker pool
+        for threshold, workers in ((previous, None), (0, None), (0, 2)):
+            mcap_writer.STREAMING_THRESHOLD_BYTES = threshold
+            output = convert_json_to_mcap(json_file, json_file.replace('.json', f'_{threshold}_{workers}.mcap'),
+                                          workers=workers)
+            with open(output, 'rb') as f:
+                results.append([(message.log_time, json.loads(message.data))
+                                 for _, _, message in make_reader(f).iter_messages()])
+    finally:
+        mcap_writer.STREAMING_THRESHOLD_BYTES = previous
+    
+    assert len(results[0]) == 4
+    assert results[0] == results[1], "Streaming conversion differs from json.load"
+    assert results[0] == results[2], "Pooled conversion differs from inline"
+    print("  Conversion test passed\n")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Testing MCAP Writer")
+    print("=" * 50 + "\n")
+    
+    test_encode_numpy_payload()
+    test_save_roundtrip()
+    test_save_roundtrip_cbor()
+    test_stream_matches_buffered()
+    test_stream_close_and_failure()
+    test_marker_columns()
+    test_json_backup()
+    test_convert_json_streaming()
+    
+    print("=" * 50)
+    print("All tests passed!")
+    print("=" * 50)
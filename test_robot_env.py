@@ -0,0 +1,132 @@
+"""
+Test script for the navigation environment
+"""
+
+import numpy as np
+import robot_env
+from robot_env import RobotNavigationEnv, RobotNavigationVectorEnv, DoubleBufferedRobotEnv
+
+
+def rollout(num_robots, use_numba, steps=200, seed=0):
+    """Run a fixed random rollout and return (observations, rewards)"""
+    previous = robot_env.NUMBA_AVAILABLE
+    robot_env.NUMBA_AVAILABLE = use_numba
+    try:
+        env = RobotNavigationEnv(num_robots=num_robots)
+        obs, _ = env.reset(seed=seed)
+        rng = np.random.default_rng(seed)
+        observations, rewards = [obs], []
+        for _ in range(steps):
+            action = rng.uniform(-2.0, 2.0, size=2 * num_robots).astype(np.float32)
+            obs, reward, terminated, truncated, _ = env.step(action)
+            observations.append(obs)
+            rewards.append(reward)
+            if terminated or truncated:
+                break
+        return np.array(observations), np.array(rewards)
+    finally:
+        robot_env.NUMBA_AVAILABLE = previous
+
+
+def test_numba_matches_numpy():
+    """Test that the Numba kernels reproduce the NumPy code path"""
+    print("Testing Numba kernels against NumPy path...")
+    if not robot_env.NUMBA_AVAILABLE:
+        print("  Numba not installed, skipping\n")
+        return
+    
+    for num_robots in (1, 3):
+        obs_np, rewards_np = rollout(num_robots, use_numba=False)
+        obs_nb, rewards_nb = rollout(num_robots, use_numba=True)
+        assert obs_np.shape == obs_nb.shape, "Rollouts diverged in length"
+        assert np.allclose(obs_np, obs_nb, atol=1e-4), f"Observations differ for {num_robots} robot(s)"
+        assert np.allclose(rewards_np, rewards_nb, atol=1e-4), f"Rewards differ for {num_robots} robot(s)"
+    print("  Numba kernel test passed\n")
+
+
+def test_robot_views_track_state():
+    """Test that env.robots reflects the vectorized state"""
+    print("Testing robot views...")
+    env = RobotNavigationEnv(num_robots=3)
+    env.reset(seed=1)
+    robot = env.robots[1]
+    env.step(np.full(6, 1.0, dtype=np.float32))
+    state = robot.get_state()
+    assert abs(state.v - env._v[1]) < 1e-9, "Robot view out of sync with env state"
+    assert robot.get_wheel_positions().shape == (4, 2)
+    print("  Robot view test passed\n")
+
+
+def test_snapshot_robots_detached():
+    """Test that snapshot_robots copies the state without tracking the env"""
+    print("Testing robot snapshots...")
+    env = RobotNavigationEnv(num_robots=3)
+    env.reset(seed=2)
+    env.step(np.full(6, 1.0, dtype=np.float32))
+    robots, targets = env.snapshot_robots()
+    assert [r.get_state() for r in robots] == [r.get_state() for r in env.robots]
+    assert np.array_equal(targets, env.targets)
+    env.step(np.full(6, 1.0, dtype=np.float32))
+    assert robots[0].get_state() != env.robots[0].get_state(), "Snapshot still tracks the env"
+    print("  Robot snapshot test passed\n")
+
+
+def test_vector_env_autoreset():
+    """Test batched stepping and next-step autoreset of the vector env"""
+    print("Testing vector environment...")
+    env = RobotNavigationVectorEnv(num_envs=4, max_episode_steps=5)
+    obs, _ = env.reset(seed=0)
+    assert obs.shape == (4, 10) and obs.dtype == np.float32
+    
+    actions = env.action_space.sample()
+    for _ in range(5):
+        obs, rewards, terminated, truncated, info = env.step(actions)
+    assert truncated.all(), "All envs should truncate at max_episode_steps"
+    assert rewards.shape == (4,) and np.isfinite(rewards).all()
+    
+    obs, rewards, terminated, truncated, _ = env.step(actions)
+    assert not (terminated | truncated).any(), "Autoreset step should not be terminal"
+    assert np.all(rewards == 0.0) and np.all(env.step_count == 0)
+    assert np.allclose(obs[:, 3], 0.0), "Reset envs should start at rest"
+    print("  Vector env test passed\n")
+
+
+def test_double_buffered_matches_halves():
+    """Test that double-buffered stepping matches stepping each half directly"""
+    print("Testing double-buffered environment...")
+    env = DoubleBufferedRobotEnv(num_envs=4)
+    halves = [RobotNavigationVectorEnv(num_envs=2) for _ in range(2)]
+    obs, info = env.reset(seed=3)
+    assert info['env_half'] == 0
+    assert np.allclose(obs, halves[0].reset(seed=3)[0])
+    halves[1].reset(seed=4)
+    
+    rng = np.random.default_rng(0)
+    for i in range(10):
+        half = i % 2
+        actions = rng.uniform(-2.0, 2.0, size=(2, 2)).astype(np.float32)
+        obs, rewards, _, _, info = env.step(actions)
+        expected_obs, expected_rewards, _, _, _ = halves[half].step(actions)
+        assert info['env_half'] == 1 - half
+        if i >= 1:
+            # obs returned now belong to the half stepped on the previous call
+            assert np.allclose(obs, previous_obs) and np.allclose(rewards, previous_rewards)
+        previous_obs, previous_rewards = expected_obs, expected_rewards
+    env.close()
+    print("  Double-buffered env test passed\n")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Testing Robot Navigation Environment")
+    print("=" * 50 + "\n")
+    
+    test_numba_matches_numpy()
+    test_robot_views_track_state()
+    test_snapshot_robots_detached()
+    test_vector_env_autoreset()
+    test_double_buffered_matches_halves()
+    
+    print("=" * 50)
+    print("All tests passed!")
+    print("=" * 50)
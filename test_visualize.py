@@ -0,0 +1,168 @@
+"""
+Test script for the MCAP marker visualizer
+"""
+
+import json
+import os
+import tempfile
+import numpy as np
+import visualize
+from robot_env import RobotNavigationEnv
+from visualize import MCAPVisualizer
+
+
+def per_robot_markers(visualizer, robots, targets, timestamp):
+    """Markers built one robot at a time with the single-robot methods"""
+    markers = []
+    for i, robot in enumerate(robots):
+        markers.append(visualizer.create_robot_body_marker(robot, i, timestamp))
+        markers.extend(visualizer.create_wheel_markers(robot, i, timestamp))
+        markers.extend(visualizer.create_link_markers(robot, i, timestamp))
+        icr_marker = visualizer.create_icr_marker(robot, i, timestamp)
+        if icr_marker:
+            markers.append(icr_marker)
+    for i, target in enumerate(targets):
+        markers.append(visualizer.create_target_marker(target[0], target[1], i, timestamp))
+    return markers
+
+
+def assert_same(expected, actual, path="markers"):
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys(), f"{path}: keys differ"
+        for key in expected:
+            assert_same(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, (list, tuple, np.ndarray)) and not isinstance(expected, str):
+        assert len(expected) == len(actual), f"{path}: lengths differ"
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            assert_same(e, a, f"{path}[{i}]")
+    elif isinstance(expected, str):
+        assert expected == actual, f"{path}: {expected!r} != {actual!r}"
+    else:
+        assert np.isclose(expected, actual, rtol=0, atol=1e-12), f"{path}: {expected} != {actual}"
+
+
+def test_batched_markers_match_per_robot():
+    """Test that create_all_markers matches the per-robot marker methods"""
+    print("Testing batched markers...")
+    visualizer = MCAPVisualizer()
+    env = RobotNavigationEnv(num_robots=3)
+    env.reset(seed=3)
+    rng = np.random.default_rng(3)
+    saw_icr = saw_no_icr = False
+    for _ in range(20):
+        # Zero curvature now and then so some robots have no ICR
+        action = rng.uniform(-2.0, 2.0, size=6).astype(np.float32)
+        action[::2] *= rng.integers(0, 2, size=3)
+        env.step(action)
+        markers = visualizer.create_all_markers(env.robots, env.targets, timestamp=1.0)
+        assert_same(per_robot_markers(visualizer, env.robots, env.targets, 1.0), markers)
+        icr_count = sum(m['type'] == 'icr' for m in markers)
+        saw_icr |= icr_count > 0
+        saw_no_icr |= icr_count < 3
+    assert saw_icr and saw_no_icr, "Scenario didn't cover both ICR cases"
+    assert visualizer.create_all_markers([], np.zeros((0, 2))) == []
+    print("  Batched marker test passed\n")
+
+
+def test_marker_geometry_numba_matches_numpy():
+    """Test that the compiled marker geometry matches the NumPy version"""
+    print("Testing compiled marker geometry...")
+    if not visualize.NUMBA_AVAILABLE:
+        print("  Numba not installed, skipping\n")
+        return
+    
+    rng = np.random.default_rng(4)
+    n = 5
+    deltas = rng.uniform(-1.0, 1.0, size=(n, 4))
+    deltas[::2, 0] = 0.0  # no ICR for these
+    args = (rng.uniform(-5, 5, n), rng.uniform(-5, 5, n), rng.uniform(-np.pi, np.pi, n),
+            deltas, np.tile([0.25, 0.2], (n, 1)))
+    expected = visualize._marker_geometry(*args)
+    actual = visualize.marker_geometry(*args)
+    has_icr = expected[6]
+    assert np.array_equal(has_icr, actual[6])
+    for e, a in zip(expected[:6], actual[:6]):
+        assert np.allclose(e, a, rtol=0, atol=1e-12)
+    for e, a in zip(expected[7:], actual[7:]):
+        assert np.allclose(e[has_icr], a[has_icr], rtol=0, atol=1e-12)
+    print("  Compiled marker geometry test passed\n")
+
+
+def test_write_markers_json_encoders():
+    """Test that the orjson and stdlib marker JSON writers agree"""
+    print("Testing marker JSON writer...")
+    env = RobotNavigationEnv(num_robots=2)
+    env.reset(seed=5)
+    markers = MCAPVisualizer().create_all_markers(env.robots, env.targets, timestamp=1.0)
+    markers.append({'type': 'extra', 'value': np.float64(0.5), 'points': np.arange(3.0)})
+    
+    previous = visualize.orjson
+    written = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'markers.json')
+            # The orjson path (when installed) with numpy values, then the
+            # stdlib fallback, which needs them as plain Python values
+            for encoder in [previous, None] if previous is not None else [None]:
+                visualize.orjson = encoder
+                if encoder is None:
+                    markers[-1] = {'type': 'extra', 'value': 0.5, 'points': [0.0, 1.0, 2.0]}
+                visualize._write_markers_json(markers, path)
+                with open(path) as f:
+                    written.append(json.load(f))
+    finally:
+        visualize.orjson = previous
+    
+    for decoded in written:
+        assert decoded == written[-1]
+        assert decoded[-1] == {'type': 'extra', 'value': 0.5, 'points': [0.0, 1.0, 2.0]}
+    print("  Marker JSON writer test passed\n")
+
+
+def test_save_markers_to_npz():
+    """Test that the npz dump holds the markers' numbers per type"""
+    print("Testing marker npz dump...")
+    env = RobotNavigationEnv(num_robots=3)
+    env.reset(seed=6)
+    env.step(np.ones(6, dtype=np.float32))
+    visualizer = MCAPVisualizer()
+    markers = visualizer.create_all_markers(env.robots, env.targets, timestamp=1.0)
+    markers += visualizer.create_all_markers(env.robots, env.targets, timestamp=2.0)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'markers.npz')
+        visualize.save_markers_to_npz(markers, path)
+        with np.load(path) as data:
+            arrays = dict(data)
+    
+    wheels = [m for m in markers if m['type'] == 'wheel']
+    assert arrays['wheel/position'].shape == (len(wheels), 2)
+    assert np.array_equal(arrays['wheel/wheel'], [0, 1, 2, 3] * (len(wheels) // 4))
+    assert np.allclose(arrays['wheel/steering_angle'], [m['steering_angle'] for m in wheels])
+    assert arrays['robot_body/corners'].shape == (6, 4, 3)
+    assert np.allclose(arrays['robot_body/corners'][0], markers[0]['corners'])
+    assert arrays['link/points'].shape == (24, 2, 3)
+    assert np.array_equal(arrays['target/timestamp'], [1.0] * 3 + [2.0] * 3)
+    assert np.allclose(arrays['target/position'], np.concatenate([env.targets, env.targets]))
+    
+    try:
+        visualize.save_markers_to_npz([{'type': 'unknown'}], path)
+        assert False, "Unknown marker type should raise"
+    except ValueError:
+        pass
+    print("  Marker npz test passed\n")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Testing MCAP Visualizer")
+    print("=" * 50 + "\n")
+    
+    test_batched_markers_match_per_robot()
+    test_marker_geometry_numba_matches_numpy()
+    test_write_markers_json_encoders()
+    test_save_markers_to_npz()
+    
+    print("=" * 50)
+    print("All tests passed!")
+    print("=" * 50)
@@ -7,16 +7,43 @@ from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback,
 from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from stable_baselines3.common.monitor import Monitor
 from stable_baselines3.common.logger import configure
+import multiprocessing
 import os
+import queue
+import threading
 from typing import List, Optional
 import json
 import time
+from dataclasses import fields
 
 from robot_env import RobotNavigationEnv
-from robot_kinematics import FourWheelKinematics
+from robot_kinematics import FourWheelKinematics, RobotState
 from visualize import MCAPVisualizer, save_markers_to_mcap
 from mcap_writer import MCAPWriter
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Per-robot fields stored for each recorded episode
+_STATE_FIELDS = tuple(f.name for f in fields(RobotState))
+
+# Recorded steps waiting for the MCAP writer thread; record_step only blocks
+# once the writer falls this far behind
+RECORD_QUEUE_SIZE = 1024
+
+
+def _dump_json(obj, path: str):
+    # Compact, and through orjson when installed: these grow with every
+    # episode, and indenting made them several times larger and slower
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, separators=(',', ':'))
+
 
 class TrainingCallback(BaseCallback):
     
@@ -26,44 +53,79 @@ class TrainingCallback(BaseCallback):
         self.env = env
         self.record_every_n_steps = record_every_n_steps
         self.step_count = 0
+        
+        # _on_step runs for every vectorized step, so how to read the recorded
+        # env is resolved once here into a (robots, targets) callable, or None
+        # when there is nothing to record
+        self._snapshot = None
+        if hasattr(env, 'envs'):
+            if len(env.envs) > 0 and hasattr(env.envs[0], 'unwrapped'):
+                env_unwrapped = env.envs[0].unwrapped
+                if isinstance(env_unwrapped, RobotNavigationEnv):
+                    self._snapshot = lambda: (env_unwrapped.robots, env_unwrapped.targets)
+        elif hasattr(env, 'env_method'):
+            # SubprocVecEnv: ask the first worker for a detached copy of its robots
+            self._snapshot = lambda: env.env_method('snapshot_robots', indices=[0])[0]
+        if not recorder.record:
+            self._snapshot = None
     
     def _on_step(self) -> bool:
         self.step_count += 1
         # Record visualization markers during training
-        if self.recorder.record and self.step_count % self.record_every_n_steps == 0:
-            if hasattr(self.env, 'envs') and len(self.env.envs) > 0:
-                if hasattr(self.env.envs[0], 'unwrapped'):
-                    env_unwrapped = self.env.envs[0].unwrapped
-                    if isinstance(env_unwrapped, RobotNavigationEnv):
-                        robots = env_unwrapped.robots
-                        targets = env_unwrapped.targets
-                        self.recorder.record_step(robots, targets)
+        if self._snapshot is not None and self.step_count % self.record_every_n_steps == 0:
+            self.recorder.record_step(*self._snapshot())
         return True
 
 
 class TrainingRecorder:
     
-    def __init__(self, record: bool = False, output_file: str = "training.mcap"):
+    def __init__(self, record: bool = False, output_file: str = "training.mcap",
+                 encoding: str = 'json'):
         self.record = record
         self.output_file = output_file
         self.episodes = []
         self.visualizer = MCAPVisualizer()
-        self.mcap_writer = MCAPWriter(output_file) if record else None
+        # Streamed: marker messages go to disk as they are recorded rather
+        # than accumulating in memory for the whole run
+        self.mcap_writer = MCAPWriter(output_file, encoding=encoding, stream=True) if record else None
         self.metrics = {
             'episode_rewards': [],
             'episode_lengths': [],
             'success_rate': [],
             'distances': []
         }
-        self.current_episode_markers = []
+        
+        # Encoding, compressing and writing the marker messages happens on a
+        # background thread so the training loop never waits on the disk
+        self._queue = None
+        self._writer_thread = None
+        self._writer_error = None
+        if self.mcap_writer is not None:
+            self._queue = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+            self._writer_thread = threading.Thread(target=self._writer_loop, name='mcap-writer',
+                                                   daemon=True)
+            self._writer_thread.start()
+    
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._writer_error is not None:
+                # Keep draining so record_step never blocks; save() reports it
+                continue
+            try:
+                self.mcap_writer.add_marker_message(*item)
+            except Exception as e:
+                self._writer_error = e
     
     def record_step(self, robots: List[FourWheelKinematics], targets: np.ndarray):
         if not self.record or self.mcap_writer is None:
             return
         
-        markers = self.visualizer.create_all_markers(robots, targets)
-        self.mcap_writer.add_marker_message(markers)
-        self.current_episode_markers.append(markers)
+        timestamp = time.time()
+        markers = self.visualizer.create_all_markers(robots, targets, timestamp)
+        self._queue.put((markers, timestamp))
     
     def record_episode(self, robots: List[FourWheelKinematics], 
                       targets: np.ndarray,
@@ -77,26 +139,14 @@ class TrainingRecorder:
         
         episode_data = {
             'timestamp': time.time(),
-            'robots': [],
+            'robots': [{name: getattr(state, name) for name in _STATE_FIELDS}
+                       for state in (robot.get_state() for robot in robots)],
             'targets': targets.tolist(),
             'reward': episode_reward,
             'length': episode_length,
             'success': success
         }
         
-        for robot in robots:
-            state = robot.get_state()
-            episode_data['robots'].append({
-                'x': state.x,
-                'y': state.y,
-                'theta': state.theta,
-                'v': state.v,
-                'delta_fl': state.delta_fl,
-                'delta_fr': state.delta_fr,
-                'delta_rl': state.delta_rl,
-                'delta_rr': state.delta_rr
-            })
-        
         self.episodes.append(episode_data)
         
         if self.mcap_writer:
@@ -107,8 +157,6 @@ class TrainingRecorder:
                 success=success,
                 episode_length=episode_length
             )
-        
-        self.current_episode_markers = []
     
     def record_metrics(self, reward: float, length: int, success: bool, distance: float):
         self.metrics['episode_rewards'].append(reward)
@@ -116,20 +164,39 @@ class TrainingRecorder:
         self.metrics['success_rate'].append(1.0 if success else 0.0)
         self.metrics['distances'].append(distance)
     
+    def _stop_writer(self):
+        if self._writer_thread is not None:
+            self._queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
+    
+    def close(self):
+        """Stop the writer thread and close the streamed MCAP without saving.
+        
+        For error paths where save() is not reached, so the output file is
+        not left open; a no-op after save().
+        """
+        if self.mcap_writer is None:
+            return
+        self._stop_writer()
+        self.mcap_writer.close()
+    
     def save(self):
         if not self.record:
             return
         
         if self.mcap_writer:
+            self._stop_writer()
+            if self._writer_error is not None:
+                self.mcap_writer.close()
+                raise self._writer_error
             self.mcap_writer.save()
         
         output_json = self.output_file.replace('.mcap', '_episodes.json')
-        with open(output_json, 'w') as f:
-            json.dump(self.episodes, f, indent=2)
+        _dump_json(self.episodes, output_json)
         
         metrics_file = self.output_file.replace('.mcap', '_metrics.json')
-        with open(metrics_file, 'w') as f:
-            json.dump(self.metrics, f, indent=2)
+        _dump_json(self.metrics, metrics_file)
         
         print(f"Training data saved:")
         print(f"  MCAP: {self.output_file.replace('.mcap', '.json')}")
@@ -146,14 +213,73 @@ def make_env(num_robots: int = 1, rank: int = 0, seed: int = 0):
     return _init
 
 
+def compile_policy(model: PPO):
+    """torch.compile the policy's MLP forward passes.
+    
+    Only the mlp_extractor methods are wrapped, so parameter names (and with
+    them saved models and checkpoints) are unchanged. Anything dynamo can't
+    compile in these methods falls back to eager execution; the fallback is
+    scoped to their calls, not set for the whole process.
+    """
+    if not hasattr(torch, "compile"):
+        print("torch.compile not available, running the policy eagerly")
+        return
+    import torch._dynamo
+    
+    def fall_back_to_eager(compiled):
+        # Compilation happens lazily on the first calls, so the patch wraps
+        # each call rather than this setup (a fresh one per call, as
+        # forward nests forward_actor/forward_critic)
+        def call(*args, **kwargs):
+            with torch._dynamo.config.patch(suppress_errors=True):
+                return compiled(*args, **kwargs)
+        return call
+    
+    extractor = model.policy.mlp_extractor
+    for name in ("forward", "forward_actor", "forward_critic"):
+        compiled = torch.compile(getattr(extractor, name), dynamic=False)
+        setattr(extractor, name, fall_back_to_eager(compiled))
+
+
+def rollout_steps(rollout_size: int, n_envs: int, batch_size: int) -> int:
+    """PPO n_steps per env so that n_envs envs collect rollout_size steps per update.
+    
+    Raises ValueError for n_envs that can't split rollout_size evenly (into
+    a whole number of batch_size minibatches, at least 2 steps per env).
+    """
+    n_steps = rollout_size // n_envs
+    if n_envs < 1 or n_steps < 2 or n_steps * n_envs != rollout_size or rollout_size % batch_size:
+        raise ValueError(f"n_envs={n_envs} can't split a {rollout_size}-step rollout evenly; "
+                         f"use a divisor of {rollout_size}")
+    return n_steps
+
+
+def make_vec_env(num_robots: int, seed: int, n_envs: int = 1):
+    """One in-process env, or n_envs envs stepped in parallel worker processes"""
+    env_fns = [make_env(num_robots=num_robots, rank=i, seed=seed) for i in range(n_envs)]
+    if n_envs == 1:
+        return DummyVecEnv(env_fns)
+    # The workers only run the numpy/numba env; the learner is the process
+    # using torch, and its default of one thread per core would compete
+    # with them for the same cores, so it gets the cores they leave
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - n_envs))
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    return SubprocVecEnv(env_fns, start_method=start_method)
+
+
 def train_single_robot(total_timesteps: int = 5000000,  # Changed from 100000 to 5000000
                       record: bool = False,
-                      output_file: str = "training.mcap"):
-    print("Training single robot navigation...")
-    
-    env = DummyVecEnv([make_env(num_robots=1, seed=42)])
+                      output_file: str = "training.mcap",
+                      done_marker: Optional[str] = None,
+                      encoding: str = 'json',
+                      n_envs: int = 1,
+                      compile_model: bool = False):
+    print(f"Training single robot navigation ({n_envs} env workers)...")
+    n_steps = rollout_steps(2048, n_envs, batch_size=64)
+    
+    env = make_vec_env(num_robots=1, seed=42, n_envs=n_envs)
     eval_env = DummyVecEnv([make_env(num_robots=1, seed=123)])
-    recorder = TrainingRecorder(record=record, output_file=output_file)
+    recorder = TrainingRecorder(record=record, output_file=output_file, encoding=encoding)
     
     policy_kwargs = dict(
         net_arch=[256, 256, 128],
@@ -165,7 +291,8 @@ def train_single_robot(total_timesteps: int = 5000000,  # Changed from 100000 to
         env,
         policy_kwargs=policy_kwargs,
         learning_rate=3e-4,
-        n_steps=2048,
+        # Same 2048-step rollout per update however many envs collect it
+        n_steps=n_steps,
         batch_size=64,
         n_epochs=10,
         gamma=0.99,
@@ -176,38 +303,53 @@ def train_single_robot(total_timesteps: int = 5000000,  # Changed from 100000 to
         verbose=1,
         tensorboard_log="./tensorboard_logs/"
     )
+    if compile_model:
+        compile_policy(model)
     
     
     eval_callback = EvalCallback(
         eval_env,
         best_model_save_path="./models/single_robot/",
         log_path="./logs/single_robot/",
-        eval_freq=5000,
+        # Callback frequencies count vectorized steps (n_envs timesteps each)
+        eval_freq=max(5000 // n_envs, 1),
         deterministic=True,
         render=False
     )
     
     checkpoint_callback = CheckpointCallback(
-        save_freq=10000,
+        save_freq=max(10000 // n_envs, 1),
         save_path="./checkpoints/single_robot/",
         name_prefix="ppo_single"
     )
     
-    # Record visualization every 10 steps during training to avoid too much data
-    training_callback = TrainingCallback(recorder, env, record_every_n_steps=10)
+    # Record visualization every 10 timesteps during training to avoid too
+    # much data (each callback step is n_envs timesteps)
+    training_callback = TrainingCallback(recorder, env, record_every_n_steps=max(10 // n_envs, 1))
     
     try:
-        model.learn(
-            total_timesteps=total_timesteps,
-            callback=[eval_callback, checkpoint_callback, training_callback],
-            progress_bar=True
-        )
-    except ImportError:
-        model.learn(
-            total_timesteps=total_timesteps,
-            callback=[eval_callback, checkpoint_callback, training_callback],
-            progress_bar=False
-        )
+        try:
+            model.learn(
+                total_timesteps=total_timesteps,
+                callback=[eval_callback, checkpoint_callback, training_callback],
+                progress_bar=True
+            )
+        except ImportError:
+            model.learn(
+                total_timesteps=total_timesteps,
+                callback=[eval_callback, checkpoint_callback, training_callback],
+                progress_bar=False
+            )
+    except BaseException:
+        # Failed or interrupted: close the streamed recording rather than
+        # leaving its file open and unfinished
+        recorder.close()
+        raise
+    
+    # The evaluation logs are final once learn() returns; tell any waiting
+    # post-processing it can start while the recording and model are saved
+    if done_marker:
+        open(done_marker, 'w').close()
     
     if record:
         recorder.save()
@@ -221,12 +363,17 @@ def train_single_robot(total_timesteps: int = 5000000,  # Changed from 100000 to
 def train_multi_robot(num_robots: int = 3,
                      total_timesteps: int = 10000000,  # Changed from 200000 to 10000000
                      record: bool = False,
-                     output_file: str = "training_multi.mcap"):
-    print(f"Training {num_robots} robots with collision avoidance...")
-    
-    env = DummyVecEnv([make_env(num_robots=num_robots, seed=42)])
+                     output_file: str = "training_multi.mcap",
+                     done_marker: Optional[str] = None,
+                     encoding: str = 'json',
+                     n_envs: int = 1,
+                     compile_model: bool = False):
+    print(f"Training {num_robots} robots with collision avoidance ({n_envs} env workers)...")
+    n_steps = rollout_steps(4096, n_envs, batch_size=256)
+    
+    env = make_vec_env(num_robots=num_robots, seed=42, n_envs=n_envs)
     eval_env = DummyVecEnv([make_env(num_robots=num_robots, seed=123)])    
-    recorder = TrainingRecorder(record=record, output_file=output_file)
+    recorder = TrainingRecorder(record=record, output_file=output_file, encoding=encoding)
     
     policy_kwargs = dict(
         net_arch=[512, 512, 256],
@@ -238,7 +385,8 @@ def train_multi_robot(num_robots: int = 3,
         env,
         policy_kwargs=policy_kwargs,
         learning_rate=1e-4,
-        n_steps=4096, 
+        # Same 4096-step rollout per update however many envs collect it
+        n_steps=n_steps,
         batch_size=256,
         n_epochs=15,
         gamma=0.99,
@@ -250,37 +398,52 @@ def train_multi_robot(num_robots: int = 3,
         verbose=1,
         tensorboard_log="./tensorboard_logs/"
     )
+    if compile_model:
+        compile_policy(model)
     
     eval_callback = EvalCallback(
         eval_env,
         best_model_save_path="./models/multi_robot/",
         log_path="./logs/multi_robot/",
-        eval_freq=10000,
+        # Callback frequencies count vectorized steps (n_envs timesteps each)
+        eval_freq=max(10000 // n_envs, 1),
         deterministic=True,
         render=False
     )
     
     checkpoint_callback = CheckpointCallback(
-        save_freq=20000,
+        save_freq=max(20000 // n_envs, 1),
         save_path="./checkpoints/multi_robot/",
         name_prefix="ppo_multi"
     )
     
-    # Record visualization every 10 steps during training to avoid too much data
-    training_callback = TrainingCallback(recorder, env, record_every_n_steps=10)
+    # Record visualization every 10 timesteps during training to avoid too
+    # much data (each callback step is n_envs timesteps)
+    training_callback = TrainingCallback(recorder, env, record_every_n_steps=max(10 // n_envs, 1))
     
     try:
-        model.learn(
-            total_timesteps=total_timesteps,
-            callback=[eval_callback, checkpoint_callback, training_callback],
-            progress_bar=True
-        )
-    except ImportError:
-        model.learn(
-            total_timesteps=total_timesteps,
-            callback=[eval_callback, checkpoint_callback, training_callback],
-            progress_bar=False
-        )
+        try:
+            model.learn(
+                total_timesteps=total_timesteps,
+                callback=[eval_callback, checkpoint_callback, training_callback],
+                progress_bar=True
+            )
+        except ImportError:
+            model.learn(
+                total_timesteps=total_timesteps,
+                callback=[eval_callback, checkpoint_callback, training_callback],
+                progress_bar=False
+            )
+    except BaseException:
+        # Failed or interrupted: close the streamed recording rather than
+        # leaving its file open and unfinished
+        recorder.close()
+        raise
+    
+    # The evaluation logs are final once learn() returns; tell any waiting
+    # post-processing it can start while the recording and model are saved
+    if done_marker:
+        open(done_marker, 'w').close()
     
     if record:
         recorder.save()
@@ -300,40 +463,39 @@ def test_model(model_path: str, num_robots: int = 1, num_episodes: int = 10):
     
     successes = 0
     total_reward = 0
+    # Episode distance: the robot's own, or the worst robot's in multi mode
+    episode_distance = (lambda d: d[0]) if num_robots == 1 else max
     
-    for episode in range(num_episodes):
-        obs, info = env.reset()
-        episode_reward = 0
-        episode_length = 0
-        
-        robots_before = [env.robots[i].get_state() for i in range(num_robots)]
-        
-        done = False
-        while not done:
-            if num_robots == 1:
-                action, _ = model.predict(obs, deterministic=True)
-            else:
+    try:
+        for episode in range(num_episodes):
+            obs, info = env.reset()
+            episode_reward = 0
+            episode_length = 0
+            
+            done = False
+            while not done:
+                # The env takes the flat (2 * num_robots,) action as predicted
                 action, _ = model.predict(obs, deterministic=True)
-                if action.shape == (num_robots * 2,):
-                    action = action.reshape(num_robots, 2)
+                obs, reward, terminated, truncated, info = env.step(action)
+                episode_reward += reward
+                episode_length += 1
+                done = terminated or truncated
             
-            obs, reward, terminated, truncated, info = env.step(action)
-            episode_reward += reward
-            episode_length += 1
-            done = terminated or truncated
-        
-        robots_after = [env.robots[i] for i in range(num_robots)]
-        targets = env.targets
-        success = info.get('success', False)
-        distance = info.get('distances', [float('inf')])[0] if num_robots == 1 else max(info.get('distances', [float('inf')]))
-        
-        recorder.record_episode(robots_after, targets, episode_reward, episode_length, success, distance)
-        
-        if success:
-            successes += 1
-        total_reward += episode_reward
-        
-        print(f"Episode {episode + 1}: Reward={episode_reward:.2f}, Length={episode_length}, Success={success}")
+            robots_after = [env.robots[i] for i in range(num_robots)]
+            targets = env.targets
+            success = info.get('success', False)
+            distance = episode_distance(info.get('distances', [float('inf')]))
+            
+            recorder.record_episode(robots_after, targets, episode_reward, episode_length, success, distance)
+            
+            if success:
+                successes += 1
+            total_reward += episode_reward
+            
+            print(f"Episode {episode + 1}: Reward={episode_reward:.2f}, Length={episode_length}, Success={success}")
+    except BaseException:
+        recorder.close()
+        raise
     
     recorder.save()
     
@@ -354,12 +516,31 @@ def main():
                        help="Record training process to MCAP")
     parser.add_argument("--mcap_output", type=str, default="training.mcap",
                        help="Output MCAP file")
+    parser.add_argument("--mcap_encoding", type=str, choices=["json", "cbor"], default="json",
+                       help="Message encoding for the recorded MCAP (cbor is binary and smaller)")
+    parser.add_argument("--done_marker", type=str, default=None,
+                       help="File to create as soon as training (and the evaluation logs) finish")
+    parser.add_argument("--n_envs", type=int, default=1,
+                       help="Parallel training environments (worker processes when > 1); "
+                            "must divide the rollout size (2048 single, 4096 multi)")
+    parser.add_argument("--compile", action="store_true",
+                       help="torch.compile the policy network (first updates are slower while it compiles)")
     parser.add_argument("--test", type=str, default=None,
                        help="Test a trained model (provide path)")
     parser.add_argument("--test_episodes", type=int, default=10,
                        help="Number of test episodes")
     
     args = parser.parse_args()
+    if not args.test:
+        try:
+            rollout_steps(2048 if args.mode == "single" else 4096, args.n_envs,
+                          64 if args.mode == "single" else 256)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.compile:
+        # TF32 matmuls on GPUs that support them, for the compiled policy
+        torch.set_float32_matmul_precision("high")
     
     os.makedirs("./models/single_robot", exist_ok=True)
     os.makedirs("./models/multi_robot", exist_ok=True)
@@ -372,10 +553,12 @@ def main():
         test_model(args.test, num_robots, args.test_episodes)
     elif args.mode == "single":
         timesteps = args.episodes * 500  
-        train_single_robot(timesteps, args.record, args.mcap_output)
+        train_single_robot(timesteps, args.record, args.mcap_output, args.done_marker,
+                           args.mcap_encoding, args.n_envs, args.compile)
     else:
         timesteps = args.episodes * 1000  
-        train_multi_robot(args.num_robots, timesteps, args.record, args.mcap_output)
+        train_multi_robot(args.num_robots, timesteps, args.record, args.mcap_output,
+                          args.done_marker, args.mcap_encoding, args.n_envs, args.compile)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ This script validates that both MCAP files are properly formatted and readable.
 from mcap.reader import make_reader
 from pathlib import Path
 import json
+from mcap_writer import decode_payload
 
 def verify_mcap_file(mcap_path: str) -> dict:
     """Verify a single MCAP file and return its properties."""
@@ -32,24 +33,22 @@ def verify_mcap_file(mcap_path: str) -> dict:
                     'encoding': channel.message_encoding
                 })
             
-            # Read first few messages to verify content
+            # Read first few messages to verify content, with the same reader
+            # (and the summary it already parsed) rather than a second one
             sample_messages = []
-            f.seek(0)
-            reader = make_reader(f)
-            count = 0
-            for schema, channel, message in reader.iter_messages():
-                if count >= 3:  # Just get 3 sample messages
+            for schema, channel, message in reader.iter_messages(log_time_order=True):
+                if len(sample_messages) >= 3:  # Just get 3 sample messages
                     break
                 try:
-                    msg_data = json.loads(message.data.decode('utf-8'))
-                    sample_messages.append({
-                        'topic': channel.topic,
-                        'timestamp': message.log_time,
-                        'has_data': bool(msg_data)
-                    })
-                    count += 1
-                except:
-                    pass
+                    msg_data = decode_payload(message.data, channel.message_encoding)
+                except ValueError:
+                    # Undecodable payload (JSON, UTF-8 and CBOR errors are all ValueErrors)
+                    continue
+                sample_messages.append({
+                    'topic': channel.topic,
+                    'timestamp': message.log_time,
+                    'has_data': bool(msg_data)
+                })
             
             return {
                 'valid': True,
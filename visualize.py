@@ -1,11 +1,101 @@
+import math
 import numpy as np
+from functools import lru_cache
 from typing import List, Tuple, Optional
-from robot_kinematics import FourWheelKinematics, RobotState
+from robot_kinematics import FourWheelKinematics, RobotParams, RobotState
+from robot_kinematics_numba import NUMBA_AVAILABLE, marker_geometry
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Resolved once here rather than re-attempted on every save_markers_to_mcap
+try:
+    import mcap.writer
+    import mcap_ros2.writer
+    MCAP_ROS2_AVAILABLE = True
+except ImportError:
+    MCAP_ROS2_AVAILABLE = False
+
+
+# Constant sub-dicts shared by every marker create_all_markers builds (the
+# markers are only ever encoded, never modified)
+_IDENTITY_ORIENTATION = {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}
+_BODY_COLOR = {'r': 0.2, 'g': 0.6, 'b': 0.8, 'a': 1.0}
+_WHEEL_COLOR_DICTS = tuple({'r': r, 'g': g, 'b': b, 'a': a} for r, g, b, a in
+                           ((1.0, 0.0, 0.0, 1.0), (0.0, 1.0, 0.0, 1.0),
+                            (0.0, 0.0, 1.0, 1.0), (1.0, 1.0, 0.0, 1.0)))
+_LINK_SCALE = {'x': 0.05, 'y': 0.0, 'z': 0.0}  # Line width
+_LINK_COLOR = {'r': 0.5, 'g': 0.5, 'b': 0.5, 'a': 0.5}
+_ICR_SCALE = {'x': 0.2, 'y': 0.2, 'z': 0.2}
+_ICR_COLOR = {'r': 1.0, 'g': 0.0, 'b': 1.0, 'a': 1.0}
+_TARGET_SCALE = {'x': 0.3, 'y': 0.3, 'z': 0.1}
+_TARGET_COLOR = {'r': 0.0, 'g': 1.0, 'b': 0.0, 'a': 1.0}
+
+# Key layout of each marker type create_all_markers emits, constants filled
+# in. Markers are made by copying these and setting the per-marker fields,
+# which is cheaper than building each dict from a literal; the key order
+# (and so the encoded JSON) is the same as the create_*_marker methods'.
+_BODY_TEMPLATE = {'type': 'robot_body', 'robot_id': None, 'timestamp': None, 'pose': None,
+                  'scale': None, 'corners': None, 'color': _BODY_COLOR}
+_WHEEL_TEMPLATE = {'type': 'wheel', 'robot_id': None, 'wheel_name': None, 'timestamp': None,
+                   'pose': None, 'steering_angle': None, 'scale': None, 'radius': None,
+                   'color': None}
+_LINK_TEMPLATE = {'type': 'link', 'robot_id': None, 'timestamp': None, 'points': None,
+                  'scale': _LINK_SCALE, 'color': _LINK_COLOR}
+_ICR_TEMPLATE = {'type': 'icr', 'robot_id': None, 'timestamp': None, 'pose': None,
+                 'scale': _ICR_SCALE, 'color': _ICR_COLOR}
+_TARGET_TEMPLATE = {'type': 'target', 'target_id': None, 'timestamp': None, 'pose': None,
+                    'scale': _TARGET_SCALE, 'radius': 0.3, 'color': _TARGET_COLOR}
+
+
+@lru_cache(maxsize=64)
+def _robot_size(params: RobotParams) -> Tuple[Tuple[float, float], dict, dict]:
+    # Half wheelbase/track and the body and wheel scale dicts only depend on
+    # the (frozen) params, which robots keep for their lifetime
+    radius = params.wheel_radius
+    return ((params.wheelbase / 2, params.track_width / 2),
+            {'x': params.wheelbase, 'y': params.track_width, 'z': 0.1},
+            {'x': radius * 2, 'y': radius * 2, 'z': 0.1})
+
+
+# Robot-frame body corners and wheel positions as multiples of
+# (wheelbase / 2, track_width / 2), in the order the markers list them
+_CORNER_SIGNS = np.array([[1.0, 1.0], [1.0, -1.0], [-1.0, -1.0], [-1.0, 1.0]])
+_WHEEL_SIGNS = np.array([[1.0, 1.0], [1.0, -1.0], [-1.0, 1.0], [-1.0, -1.0]])
+
+
+def _marker_geometry(x, y, theta, deltas, half_size):
+    # NumPy version of robot_kinematics_numba.marker_geometry, same outputs
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    rotation = np.stack([np.stack([cos_t, -sin_t], axis=-1),
+                         np.stack([sin_t, cos_t], axis=-1)], axis=1)
+    origin = np.stack([x, y], axis=-1)[:, None, :]
+    corners = np.einsum('nij,nkj->nki', rotation, _CORNER_SIGNS * half_size[:, None, :]) + origin
+    corners = np.concatenate([corners, np.zeros(corners.shape[:2] + (1,))], axis=-1)
+    wheels = np.einsum('nij,nkj->nki', rotation, _WHEEL_SIGNS * half_size[:, None, :]) + origin
+    
+    body_z = np.sin(theta / 2.0)
+    body_w = np.cos(theta / 2.0)
+    wheel_theta = theta[:, None] + deltas
+    wheel_z = np.sin(wheel_theta / 2.0)
+    wheel_w = np.cos(wheel_theta / 2.0)
+    
+    # ICR only where the front-left wheel is steered (see get_icr_position)
+    has_icr = np.abs(deltas[:, 0]) >= 1e-3
+    y_icr = half_size[:, 0] / np.tan(np.where(has_icr, deltas[:, 0], 1.0)) + half_size[:, 1]
+    icr_x = -y_icr * sin_t + x
+    icr_y = y_icr * cos_t + y
+    return corners, wheels, body_z, body_w, wheel_z, wheel_w, has_icr, icr_x, icr_y
+
 
 class MCAPVisualizer:
     
+    _WHEEL_NAMES = ('fl', 'fr', 'rl', 'rr')
+    
     def __init__(self):
         self.messages = []
     
@@ -21,22 +111,19 @@ class MCAPVisualizer:
         L = params.wheelbase / 2
         W = params.track_width / 2
         
-        corners_robot = np.array([
-            [L, W, 0.0],   
-            [L, -W, 0.0],  
-            [-L, -W, 0.0], 
-            [-L, W, 0.0]   
-        ])
-        
-        cos_theta = np.cos(state.theta)
-        sin_theta = np.sin(state.theta)
-        rotation = np.array([[cos_theta, -sin_theta, 0],
-                            [sin_theta, cos_theta, 0],
-                            [0, 0, 1]])
-        
-        corners_global = (rotation @ corners_robot.T).T
-        corners_global[:, 0] += state.x
-        corners_global[:, 1] += state.y
+        # Four flat corners rotated by theta, in scalar arithmetic: cheaper
+        # than building arrays for a 4-point rotation
+        cos_theta = math.cos(state.theta)
+        sin_theta = math.sin(state.theta)
+        cL, sL = cos_theta * L, sin_theta * L
+        cW, sW = cos_theta * W, sin_theta * W
+        x, y = state.x, state.y
+        corners = [
+            [cL - sW + x, sL + cW + y, 0.0],
+            [cL + sW + x, sL - cW + y, 0.0],
+            [-cL + sW + x, -sL - cW + y, 0.0],
+            [-cL - sW + x, -sL + cW + y, 0.0]
+        ]
         
         # Format for Foxglove Studio visualization
         marker = {
@@ -48,12 +135,12 @@ class MCAPVisualizer:
                 'orientation': {
                     'x': 0.0,
                     'y': 0.0,
-                    'z': np.sin(state.theta / 2.0),
-                    'w': np.cos(state.theta / 2.0)
+                    'z': math.sin(state.theta / 2.0),
+                    'w': math.cos(state.theta / 2.0)
                 }
             },
             'scale': {'x': params.wheelbase, 'y': params.track_width, 'z': 0.1},
-            'corners': corners_global.tolist(),
+            'corners': corners,
             'color': {'r': 0.2, 'g': 0.6, 'b': 0.8, 'a': 1.0}
         }
         
@@ -69,19 +156,16 @@ class MCAPVisualizer:
         if timestamp is None:
             timestamp = time.time()
         
-        wheel_names = ['fl', 'fr', 'rl', 'rr']
-        wheel_colors = [
-            [1.0, 0.0, 0.0, 1.0],
-            [0.0, 1.0, 0.0, 1.0],
-            [0.0, 0.0, 1.0, 1.0],
-            [1.0, 1.0, 0.0, 1.0]
-        ]
-        
-        steering_angles = [state.delta_fl, state.delta_fr, state.delta_rl, state.delta_rr]
+        # Wheel names and colors are class/module constants; only the pose,
+        # angle and per-robot size change between calls
+        theta = state.theta
+        radius = params.wheel_radius
+        steering_angles = (state.delta_fl, state.delta_fr, state.delta_rl, state.delta_rr)
         
         markers = []
-        for i, (name, pos, angle, color) in enumerate(zip(wheel_names, wheel_positions, steering_angles, wheel_colors)):
-            wheel_theta = state.theta + angle
+        for name, pos, angle, color in zip(self._WHEEL_NAMES, wheel_positions.tolist(),
+                                           steering_angles, _WHEEL_COLOR_DICTS):
+            half_theta = (theta + angle) / 2.0
             
             # Format for Foxglove Studio visualization
             marker = {
@@ -94,14 +178,14 @@ class MCAPVisualizer:
                     'orientation': {
                         'x': 0.0,
                         'y': 0.0,
-                        'z': np.sin(wheel_theta / 2.0),
-                        'w': np.cos(wheel_theta / 2.0)
+                        'z': math.sin(half_theta),
+                        'w': math.cos(half_theta)
                     }
                 },
                 'steering_angle': angle,
-                'scale': {'x': params.wheel_radius * 2, 'y': params.wheel_radius * 2, 'z': 0.1},
-                'radius': params.wheel_radius,
-                'color': {'r': color[0], 'g': color[1], 'b': color[2], 'a': color[3]}
+                'scale': {'x': radius * 2, 'y': radius * 2, 'z': 0.1},
+                'radius': radius,
+                'color': dict(color)
             }
             markers.append(marker)
         
@@ -116,8 +200,9 @@ class MCAPVisualizer:
         if timestamp is None:
             timestamp = time.time()
         
+        # Python floats up front rather than a numpy scalar per coordinate
         markers = []
-        for i, wheel_pos in enumerate(wheel_positions):
+        for wheel_x, wheel_y in wheel_positions.tolist():
             # Format for Foxglove Studio visualization (line marker)
             marker = {
                 'type': 'link',
@@ -125,7 +210,7 @@ class MCAPVisualizer:
                 'timestamp': timestamp,
                 'points': [
                     {'x': state.x, 'y': state.y, 'z': 0.0},
-                    {'x': wheel_pos[0], 'y': wheel_pos[1], 'z': 0.0}
+                    {'x': wheel_x, 'y': wheel_y, 'z': 0.0}
                 ],
                 'scale': {'x': 0.05, 'y': 0.0, 'z': 0.0},  # Line width
                 'color': {'r': 0.5, 'g': 0.5, 'b': 0.5, 'a': 0.5}
@@ -188,38 +273,194 @@ class MCAPVisualizer:
         if timestamp is None:
             timestamp = time.time()
         
-        markers = []
+        markers = self._create_robot_markers(robots, timestamp) if len(robots) > 0 else []
+        
+        # Same dicts as create_target_marker, with the constant parts shared
+        target_template = dict(_TARGET_TEMPLATE, timestamp=timestamp)
+        for i, (target_x, target_y) in enumerate(np.asarray(targets).tolist()):
+            marker = target_template.copy()
+            marker['target_id'] = i
+            marker['pose'] = {
+                'position': {'x': target_x, 'y': target_y, 'z': 0.0},
+                'orientation': _IDENTITY_ORIENTATION
+            }
+            markers.append(marker)
         
-        for i, robot in enumerate(robots):
-            markers.append(self.create_robot_body_marker(robot, i, timestamp))
-            markers.extend(self.create_wheel_markers(robot, i, timestamp))
-            markers.extend(self.create_link_markers(robot, i, timestamp))
-            icr_marker = self.create_icr_marker(robot, i, timestamp)
-            if icr_marker:
-                markers.append(icr_marker)
+        return markers
+    
+    def _create_robot_markers(self, robots: List[FourWheelKinematics], timestamp: float) -> List[dict]:
+        # Same markers as the per-robot create_*_marker methods, but the
+        # geometry for all robots is computed as (N, ...) arrays in one go
+        # (one compiled loop with Numba) and only the final dict
+        # construction loops in Python
+        states = [robot.get_state() for robot in robots]
+        params = [robot.params for robot in robots]
+        sizes = [_robot_size(p) for p in params]
+        x = np.array([s.x for s in states])
+        y = np.array([s.y for s in states])
+        theta = np.array([s.theta for s in states])
+        deltas = np.array([[s.delta_fl, s.delta_fr, s.delta_rl, s.delta_rr] for s in states])
+        half_size = np.array([size[0] for size in sizes])
         
-        for i, target in enumerate(targets):
-            markers.append(self.create_target_marker(target[0], target[1], i, timestamp))
+        geometry = marker_geometry if NUMBA_AVAILABLE else _marker_geometry
+        corners, wheels, body_z, body_w, wheel_z, wheel_w, has_icr, icr_x, icr_y = geometry(
+            x, y, theta, deltas, half_size)
+        
+        body_template = dict(_BODY_TEMPLATE, timestamp=timestamp)
+        wheel_template = dict(_WHEEL_TEMPLATE, timestamp=timestamp)
+        link_template = dict(_LINK_TEMPLATE, timestamp=timestamp)
+        icr_template = dict(_ICR_TEMPLATE, timestamp=timestamp)
+        
+        markers = []
+        rows = zip(states, params, sizes, corners.tolist(), wheels.tolist(), body_z.tolist(), body_w.tolist(),
+                   wheel_z.tolist(), wheel_w.tolist(), has_icr.tolist(), icr_x.tolist(), icr_y.tolist())
+        for i, (state, p, (_, body_scale, wheel_scale), body_corners, wheel_xy, bz, bw, wz, ww, icr, ix, iy) in enumerate(rows):
+            marker = body_template.copy()
+            marker['robot_id'] = i
+            marker['pose'] = {
+                'position': {'x': state.x, 'y': state.y, 'z': 0.0},
+                'orientation': {'x': 0.0, 'y': 0.0, 'z': bz, 'w': bw}
+            }
+            marker['scale'] = body_scale
+            marker['corners'] = body_corners
+            markers.append(marker)
+            
+            # Per-robot wheel fields are shared by its four wheel markers
+            robot_wheel_template = wheel_template.copy()
+            robot_wheel_template['robot_id'] = i
+            robot_wheel_template['scale'] = wheel_scale
+            robot_wheel_template['radius'] = p.wheel_radius
+            robot_link_template = link_template.copy()
+            robot_link_template['robot_id'] = i
+            center = {'x': state.x, 'y': state.y, 'z': 0.0}
+            steering_angles = (state.delta_fl, state.delta_fr, state.delta_rl, state.delta_rr)
+            
+            # Wheel and link markers in one pass over the wheels, sharing the
+            # wheel position dict; links are still emitted after the wheels
+            links = []
+            for name, (wx, wy), angle, z, w, color in zip(self._WHEEL_NAMES, wheel_xy, steering_angles,
+                                                          wz, ww, _WHEEL_COLOR_DICTS):
+                position = {'x': wx, 'y': wy, 'z': 0.0}
+                marker = robot_wheel_template.copy()
+                marker['wheel_name'] = name
+                marker['pose'] = {
+                    'position': position,
+                    'orientation': {'x': 0.0, 'y': 0.0, 'z': z, 'w': w}
+                }
+                marker['steering_angle'] = angle
+                marker['color'] = color
+                markers.append(marker)
+                
+                marker = robot_link_template.copy()
+                marker['points'] = [center, position]
+                links.append(marker)
+            markers.extend(links)
+            
+            if icr:
+                marker = icr_template.copy()
+                marker['robot_id'] = i
+                marker['pose'] = {
+                    'position': {'x': ix, 'y': iy, 'z': 0.0},
+                    'orientation': _IDENTITY_ORIENTATION
+                }
+                markers.append(marker)
         
         return markers
 
 
-def save_markers_to_mcap(markers: List[dict], filename: str):
-    try:
-        from mcap.writer import Writer
-        from mcap_ros2.writer import Writer as Ros2Writer
-        import struct
-        
+def _write_markers_json(markers: List[dict], path: str):
+    # orjson writes the same indented JSON several times faster, numpy
+    # values included
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(markers, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
         import json
-        with open(filename.replace('.mcap', '_markers.json'), 'w') as f:
+        with open(path, 'w') as f:
             json.dump(markers, f, indent=2)
-        
-        print(f"Markers saved to {filename.replace('.mcap', '_markers.json')}")
+
+
+def save_markers_to_mcap(markers: List[dict], filename: str):
+    json_path = filename.replace('.mcap', '_markers.json')
+    _write_markers_json(markers, json_path)
+    
+    if MCAP_ROS2_AVAILABLE:
+        print(f"Markers saved to {json_path}")
         print("Note: Full MCAP implementation requires ROS2 message types")
-        
-    except ImportError:
-        import json
-        with open(filename.replace('.mcap', '_markers.json'), 'w') as f:
-            json.dump(markers, f, indent=2)
-        print(f"Markers saved as JSON (MCAP library not available): {filename.replace('.mcap', '_markers.json')}")
+    else:
+        print(f"Markers saved as JSON (MCAP library not available): {json_path}")
+
+
+
+def _pose_xy(marker: dict) -> Tuple[float, float]:
+    position = marker['pose']['position']
+    return position['x'], position['y']
+
 
+def _yaw_zw(marker: dict) -> Tuple[float, float]:
+    orientation = marker['pose']['orientation']
+    return orientation['z'], orientation['w']
+
+
+# Columns save_markers_to_npz stores per marker type (the constant scale
+# and color fields are left out)
+_NPZ_COLUMNS = {
+    'robot_body': {
+        'robot_id': lambda m: m['robot_id'],
+        'timestamp': lambda m: m['timestamp'],
+        'position': _pose_xy,
+        'orientation': _yaw_zw,
+        'corners': lambda m: m['corners'],
+    },
+    'wheel': {
+        'robot_id': lambda m: m['robot_id'],
+        'timestamp': lambda m: m['timestamp'],
+        'wheel': lambda m: MCAPVisualizer._WHEEL_NAMES.index(m['wheel_name']),
+        'position': _pose_xy,
+        'orientation': _yaw_zw,
+        'steering_angle': lambda m: m['steering_angle'],
+        'radius': lambda m: m['radius'],
+    },
+    'link': {
+        'robot_id': lambda m: m['robot_id'],
+        'timestamp': lambda m: m['timestamp'],
+        'points': lambda m: [(p['x'], p['y'], p['z']) for p in m['points']],
+    },
+    'icr': {
+        'robot_id': lambda m: m['robot_id'],
+        'timestamp': lambda m: m['timestamp'],
+        'position': _pose_xy,
+    },
+    'target': {
+        'target_id': lambda m: m['target_id'],
+        'timestamp': lambda m: m['timestamp'],
+        'position': _pose_xy,
+    },
+}
+
+
+def save_markers_to_npz(markers: List[dict], filename: str):
+    """Save markers as compressed per-type column arrays.
+    
+    Much smaller and faster to load than the JSON dump when only the numbers
+    are needed for playback or analysis. Arrays are keyed '<type>/<column>',
+    e.g. 'wheel/position' is (N, 2) and 'robot_body/corners' is (N, 4, 3);
+    wheel indices follow MCAPVisualizer._WHEEL_NAMES.
+    """
+    by_type = {marker_type: [] for marker_type in _NPZ_COLUMNS}
+    for marker in markers:
+        if marker['type'] not in by_type:
+            raise ValueError(f"Unknown marker type: {marker['type']}")
+        by_type[marker['type']].append(marker)
+    
+    arrays = {}
+    for marker_type, columns in _NPZ_COLUMNS.items():
+        typed = by_type[marker_type]
+        for column, getter in columns.items():
+            values = np.array([getter(m) for m in typed])
+            if not typed:
+                values = values.astype(float)
+            arrays[f"{marker_type}/{column}"] = values
+    
+    np.savez_compressed(filename, **arrays)
+    print(f"Markers saved to {filename}")